@@ -0,0 +1,114 @@
+import base64
+import json
+
+from django.core.exceptions import ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """
+    Keyset (cursor) pagination over `ordering`, e.g. ('-created_at', '-id'); the last field must be
+    unique. The cursor is an opaque token holding the ordering values of the last row on the
+    previous page, so every page is one range scan of an index on those fields no matter how deep
+    the client pages. NULLs in a nullable field sort as the largest value (last ascending, first
+    descending), which is how PostgreSQL orders a default index.
+    """
+    ordering = ()
+    page_size = 50
+    max_page_size = 200
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        fields = [queryset.model._meta.get_field(name.lstrip('-')) for name in self.ordering]
+
+        queryset = queryset.order_by(*[
+            self.order(field, name.startswith('-')) for field, name in zip(fields, self.ordering)
+        ])
+        cursor = self.decode_cursor(request, fields)
+        if cursor is not None:
+            queryset = queryset.filter(self.after(fields, cursor))
+
+        # fetch one extra row to know whether there is a next page
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        results = results[:self.page_size]
+        self.last = results[-1] if results else None
+        return results
+
+    def order(self, field, descending):
+        if not field.null:
+            return '-' + field.name if descending else field.name
+        return F(field.name).desc(nulls_first=True) if descending else F(field.name).asc(nulls_last=True)
+
+    def after(self, fields, values):
+        """Rows ordered after `values`: equal on a prefix of the ordering, then past it on the next field."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, name, value in zip(fields, self.ordering, values):
+            descending, name = name.startswith('-'), field.name
+            if value is None:
+                # NULL is the largest value: only non-NULL rows follow it, and only when descending
+                past = Q(**{f'{name}__isnull': False}) if descending else Q(pk__in=[])
+                same = Q(**{f'{name}__isnull': True})
+            else:
+                past = Q(**{f'{name}__lt' if descending else f'{name}__gt': value})
+                if field.null and not descending:
+                    past |= Q(**{f'{name}__isnull': True})
+                same = Q(**{name: value})
+            condition |= equal & past
+            equal &= same
+        return condition
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request, fields):
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(token.encode()).decode())
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            return [None if value is None else field.to_python(value) for field, value in zip(fields, values)]
+        except (TypeError, ValueError, ValidationError):
+            raise NotFound("Invalid cursor")
+
+    def encode_cursor(self, row):
+        # isoformat() keeps microseconds, so equal timestamps compare equal after the round trip
+        values = [getattr(row, name.lstrip('-')) for name in self.ordering]
+        values = [value.isoformat() if hasattr(value, 'isoformat') else value for value in values]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(url, self.cursor_query_param, self.encode_cursor(self.last))
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,67 @@
+"""
+Tiny in-process scheduler for periodic background jobs.
+
+Jobs are listed in settings.SCHEDULED_JOBS as {name: (dotted_path, interval_seconds)}.
+Every job must be idempotent, because several replicas may run the same job at once.
+
+The scheduler can run in two ways:
+    1. Inside the web process: set RUN_SCHEDULER=true and a daemon thread is started on boot.
+    2. As its own process:     python manage.py run_scheduler
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_started = False
+_lock = threading.Lock()
+
+
+def load_jobs():
+    """Resolve settings.SCHEDULED_JOBS into a list of (name, callable, interval)."""
+    jobs = []
+    for name, (path, interval) in getattr(settings, "SCHEDULED_JOBS", {}).items():
+        jobs.append((name, import_string(path), interval))
+    return jobs
+
+
+def run_job(name, func):
+    """Run one job, logging (not raising) failures so the loop keeps going."""
+    close_old_connections()
+    try:
+        result = func()
+        logger.info("Scheduled job %s finished: %s", name, result)
+        return result
+    except Exception:
+        logger.exception("Scheduled job %s failed", name)
+    finally:
+        close_old_connections()
+
+
+def run_forever(poll_interval=1.0):
+    """Run every job whenever its interval has elapsed. Never returns."""
+    jobs = load_jobs()
+    next_run = {name: 0.0 for name, _, _ in jobs}
+    while True:
+        now = time.monotonic()
+        for name, func, interval in jobs:
+            if now >= next_run[name]:
+                run_job(name, func)
+                next_run[name] = time.monotonic() + interval
+        time.sleep(poll_interval)
+
+
+def start():
+    """Start the scheduler in a daemon thread (once per process)."""
+    global _started
+    with _lock:
+        if _started:
+            return
+        _started = True
+    thread = threading.Thread(target=run_forever, name="motivatchi-scheduler", daemon=True)
+    thread.start()
@@ -37,6 +37,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'users.middleware.AccountMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -137,9 +138,61 @@ CSRF_COOKIE_SECURE = True
 SESSION_COOKIE_NAME = "sessionid"
 
 
+# -----------------------------
+# CACHE & SESSIONS
+# -----------------------------
+# Set REDIS_URL to share one cache between workers / replicas (needed for the ETag tokens
+# and for the "cache" session mode). Without it each process uses its own memory.
+REDIS_URL = os.getenv("REDIS_URL")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        }
+    }
+
+# ETag tokens and cached bodies (users.versioning) are only correct when every process that
+# writes (web workers, replicas, run_scheduler) shares the cache, so conditional GETs are on
+# only with REDIS_URL. Without it the polled endpoints always answer 200 from the database.
+CONDITIONAL_GET = bool(REDIS_URL)
+
+# Carries /api/stream/ pushes between processes (see users.streaming); without Redis, only
+# writes made in the same process (including an in-process scheduler) reach a stream.
+STREAM_BACKEND = "users.streaming.RedisBackend" if REDIS_URL else "users.streaming.LocalBackend"
+
+# SERVER_MODE is set by the Dockerfile: "asgi" (uvicorn workers) or "wsgi" (sync gunicorn workers).
+# Under ASGI, /api/me/, /api/tasks/analytics/ and /api/events/leaderboard/ are served by async
+# variants that run their independent queries concurrently (motivatchi.async_queries).
+SERVER_MODE = os.getenv("SERVER_MODE", "wsgi")
+ASYNC_VIEWS = os.getenv("ASYNC_VIEWS", "true" if SERVER_MODE == "asgi" else "false").lower() == "true"
+
+# SESSION_MODE picks where sessions live:
+#   db              one django_session SELECT per request
+#   cached_db       read from the cache, written through to the database (survives a cache flush)
+#   cache           cache only; needs REDIS_URL when running more than one process
+#   signed_cookies  nothing stored server-side; a logout cannot revoke a copied cookie
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_ENGINE = SESSION_ENGINES[os.getenv("SESSION_MODE", "cached_db")]
+
+
 # -----------------------------
 # REST FRAMEWORK
 # -----------------------------
+# Seconds a hot read-only response (health poll, /api/me/) is cached under its ETag; 0 disables
+READ_CACHE_TTL = int(os.getenv("READ_CACHE_TTL", "30"))
+
 REST_FRAMEWORK = {
     "DEFAULT_RENDERER_CLASSES": [
         "rest_framework.renderers.JSONRenderer",
@@ -149,3 +202,24 @@ REST_FRAMEWORK = {
     ],
 }
 
+
+
+# -----------------------------
+# BACKGROUND JOBS
+# -----------------------------
+# Set RUN_SCHEDULER=true to run the jobs inside the web process,
+# or run `python manage.py run_scheduler` as a separate process.
+RUN_SCHEDULER = os.getenv("RUN_SCHEDULER", "False").lower() == "true"
+
+# name: (dotted path to job, interval in seconds)
+SCHEDULED_JOBS = {
+    "sweep_overdue_tasks": ("tasks.jobs.sweep_overdue_tasks", 60),
+    "compact_task_tombstones": ("tasks.jobs.compact_task_tombstones", 60 * 60),
+    "clear_expired_sessions": ("users.jobs.clear_expired_sessions", 60 * 60),
+    "settle_weekly_challenges": ("tasks.jobs.settle_weekly_challenges", 60),
+    "generate_weekly_challenges": ("tasks.jobs.generate_weekly_challenges", 60 * 60),
+    "update_events": ("tasks.jobs.update_events", 60),
+    "compact_notifications": ("users.jobs.compact_notifications", 60 * 60),
+    "send_task_reminders": ("tasks.jobs.send_task_reminders", 5 * 60),
+    "rebuild_team_labels": ("users.teams.rebuild_team_labels", 60 * 60),
+}
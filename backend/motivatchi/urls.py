@@ -14,6 +14,7 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework import routers
@@ -26,12 +27,20 @@ router = routers.DefaultRouter()
 router.register(r'users', user_views.UserView, 'user')
 router.register(r'tasks', task_views.TaskView, 'task')
 
+# Under ASGI (settings.ASYNC_VIEWS) multi-query endpoints are served by async variants. /api/me/
+# and the leaderboard swap the view at their route; the analytics action lives in the router,
+# so its async variant is matched ahead of it under a name of its own.
+async_urlpatterns = [
+    path('api/tasks/analytics/', task_views.async_task_analytics, name='task-analytics-async'),
+] if settings.ASYNC_VIEWS else []
+
 urlpatterns = [
+    *async_urlpatterns,
     path('admin/', admin.site.urls),
     path('api/', include(router.urls)),
     path('api/login/', LoginView.as_view(), name='login'),
     path('api/logout/', LogoutView.as_view(), name='logout'),
-    path('api/me/', me, name='me'),
+    path('api/me/', user_views.async_me if settings.ASYNC_VIEWS else me, name='me'),
     path('api/tamagotchi/purchase-outfit/', PurchaseOutfitView.as_view(), name='purchase_outfit'),
     path('api/tamagotchi/set-outfit/', SetOutfitView.as_view(), name='set_outfit'),
     path('api/tamagotchi/health/', tamagotchi_views.TamagotchiHealthView.as_view(), name='tamagotchi-health'),
@@ -42,6 +51,9 @@ urlpatterns = [
     path("api/following/<str:target_username>/tamagotchi/", tamagotchi_views.FollowingTamagotchiView.as_view(), name="following_tamagotchi"),
     path("api/following/<str:target_username>/coins/", user_views.FollowingCoinsView.as_view(), name="following_coins"),
     path('api/notifications/', user_views.NotificationsView.as_view(), name='notifications'),
+    path('api/stream/', user_views.stream, name='stream'),
+    path('api/notifications/unread-count/', user_views.UnreadNotificationsCountView.as_view(), name='notifications_unread_count'),
+    path('api/notifications/mark-read/', user_views.MarkNotificationsReadView.as_view(), name='notifications_mark_read'),
     # Community Challenge endpoints
     path('api/challenges/weekly/', task_views.WeeklyChallengeView.as_view(), name='weekly_challenge'),
     path('api/challenges/join/', task_views.JoinChallengeView.as_view(), name='join_challenge'),
@@ -49,7 +61,11 @@ urlpatterns = [
     path('api/challenges/team-members/', task_views.TeamMembersView.as_view(), name='team_members'),
     path('api/challenges/team-progress/', task_views.TeamProgressView.as_view(), name='team_progress'),
     path('api/challenges/debug-team/', task_views.DebugTeamView.as_view(), name='debug_team'),
+    path('api/community/summary/', task_views.CommunitySummaryView.as_view(), name='community_summary'),
     # Global events
     path('api/events/current/', task_views.CurrentEventView.as_view(), name='current_event'),
-    path('api/events/leaderboard/', task_views.EventLeaderboardView.as_view(), name='event_leaderboard'),
+    path('api/events/active/', task_views.ActiveEventsView.as_view(), name='active_events'),
+    path('api/events/leaderboard/',
+         task_views.async_event_leaderboard if settings.ASYNC_VIEWS else task_views.EventLeaderboardView.as_view(),
+         name='event_leaderboard'),
 ]
\ No newline at end of file
@@ -21,8 +21,8 @@ class Tamagotchi(models.Model):
 
     def increase_health(self, amount=1.0):
         self.health = min(self.health + amount, MAX_HEALTH)
-        self.save()
+        self.save(update_fields=['health'])
 
     def decrease_health(self, amount=1.0):
         self.health = max(self.health - amount, 0)
-        self.save()
\ No newline at end of file
+        self.save(update_fields=['health'])
\ No newline at end of file
@@ -2,9 +2,13 @@ from rest_framework.views import APIView, status
 from rest_framework.response import Response
 from rest_framework import permissions
 from rest_framework.exceptions import PermissionDenied
+from django.conf import settings
+from django.utils.decorators import method_decorator
 from tamagotchi.models import Tamagotchi
-from users.models import Account
+from users.models import Account, Follow
+from users.versioning import conditional_get
 
+@method_decorator(conditional_get('health', cache_timeout=settings.READ_CACHE_TTL), name='get')
 class TamagotchiHealthView(APIView):
     permission_classes = [permissions.AllowAny]  # Allow access; we handle session manually
 
@@ -13,13 +17,12 @@ class TamagotchiHealthView(APIView):
         if not user_id:
             raise PermissionDenied("Not authenticated.")
 
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
 
         try:
-            tamagotchi = Tamagotchi.objects.get(user=account)
+            tamagotchi = account.tamagotchi
         except Tamagotchi.DoesNotExist:
             return Response({"detail": "Tamagotchi not found."}, status=404)
 
@@ -30,13 +33,12 @@ class TamagotchiHealthView(APIView):
         if not user_id:
             raise PermissionDenied("Not authenticated.")
 
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
 
         try:
-            tamagotchi = Tamagotchi.objects.get(user=account)
+            tamagotchi = account.tamagotchi
         except Tamagotchi.DoesNotExist:
             return Response({"detail": "Tamagotchi not found."}, status=404)
 
@@ -61,9 +63,8 @@ class FollowingTamagotchiView(APIView):
         if not user_id:
             raise PermissionDenied("Not authenticated.")
 
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             raise PermissionDenied("Account not found.")
 
         # check if target exists
@@ -73,7 +74,7 @@ class FollowingTamagotchiView(APIView):
             return Response({"detail": "Followed account not found."}, status=404)
 
         # check if target is followed by user
-        if target_username not in (user.following or []):
+        if not Follow.is_following(user, target_user):
             return Response({"detail": "You are not following this user."},
                             status=status.HTTP_403_FORBIDDEN)
 
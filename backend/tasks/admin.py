@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Task, Event
+from .models import Task, Event, EventScore
 
 @admin.register(Task)
 class TaskAdmin(admin.ModelAdmin):
@@ -9,3 +9,7 @@ class TaskAdmin(admin.ModelAdmin):
 @admin.register(Event)
 class EventAdmin(admin.ModelAdmin):
     list_display = ("name", "start", "end", "reward_coins", "is_active")
+
+@admin.register(EventScore)
+class EventScoreAdmin(admin.ModelAdmin):
+    list_display = ("event", "user", "completed_count", "last_completed_at")
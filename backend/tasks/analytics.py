@@ -0,0 +1,123 @@
+"""
+The Analytics page payload (GET /api/tasks/analytics/).
+
+Five independent queries: two trend aggregates over the DailyTaskStats rollup (so their cost does
+not depend on task history) and three capped task lists. data() runs them one after another for
+the WSGI view; adata() runs them concurrently through motivatchi.async_queries for the async
+variant served under ASGI.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from motivatchi.async_queries import gather
+from .models import DailyTaskStats, Task
+
+# Max number of tasks returned per list (override with ?limit=)
+ANALYTICS_LIST_LIMIT = 50
+ANALYTICS_LIST_MAX_LIMIT = 200
+
+# Only the columns the page renders
+LIST_FIELDS = ('id', 'name', 'category', 'priority', 'completed_at', 'deadline')
+
+
+class TaskAnalytics:
+    def __init__(self, account_id, period='weekly', limit=None, now=None):
+        self.account_id = account_id
+        self.now = now or timezone.now()
+        days = 30 if period == 'monthly' else 7
+        # One day-aligned window for everything: the trends come from per-day rollup rows, so the
+        # completed list starts at the same local midnight rather than at now - days
+        self.today = timezone.localdate(self.now)
+        self.start_day = self.today - timedelta(days=days)
+        self.start_date = timezone.make_aware(datetime.combine(self.start_day, time.min))
+        self.future_date = self.now + timedelta(days=days)
+        self.limit = ANALYTICS_LIST_LIMIT if limit is None else limit
+
+    @classmethod
+    def from_params(cls, account_id, params):
+        """Build from the ?period= and ?limit= query parameters."""
+        try:
+            limit = min(max(int(params.get('limit', ANALYTICS_LIST_LIMIT)), 0), ANALYTICS_LIST_MAX_LIMIT)
+        except ValueError:
+            limit = ANALYTICS_LIST_LIMIT
+        return cls(account_id, params.get('period', 'weekly'), limit)
+
+    def data(self):
+        return self._build(*[query() for query in self._queries()])
+
+    async def adata(self):
+        return self._build(*await gather(*self._queries()))
+
+    def _queries(self):
+        return [self._totals, self._top_day, self._completed, self._missed, self._due]
+
+    # --- queries ------------------------------------------------------------
+
+    def _stats(self):
+        return DailyTaskStats.objects.filter(user_id=self.account_id, date__gte=self.start_day, date__lte=self.today)
+
+    def _totals(self):
+        """Completed / missed totals per category, most productive first."""
+        return list(
+            self._stats().values('category')
+            .annotate(completed=Sum('completed'), missed=Sum('missed'))
+            .order_by('-completed', 'category')
+        )
+
+    def _top_day(self):
+        """The day with the most completions."""
+        return (
+            self._stats().values('date')
+            .annotate(completed=Sum('completed'))
+            .filter(completed__gt=0)
+            .order_by('-completed', 'date')
+            .first()
+        )
+
+    def _tasks(self, condition, order):
+        tasks = Task.objects.filter(condition, user_id=self.account_id).order_by(order).values(*LIST_FIELDS)
+        return list(tasks[:self.limit])
+
+    def _completed(self):
+        return self._tasks(Q(status='completed', completed_at__gte=self.start_date, completed_at__lte=self.now), '-completed_at')
+
+    def _missed(self):
+        return self._tasks(Q(status='overdue', deadline__lte=self.now), '-deadline')
+
+    def _due(self):
+        return self._tasks(
+            Q(status__in=['in_progress', 'pending'], deadline__gte=self.now, deadline__lte=self.future_date),
+            'deadline',
+        )
+
+    # --- payload ------------------------------------------------------------
+
+    def _build(self, totals, top_day, completed, missed, due):
+        total_completed = sum(row['completed'] for row in totals)
+        total_missed = sum(row['missed'] for row in totals)
+        total_due = total_completed + total_missed
+        completion_rate = (total_completed / total_due * 100) if total_due > 0 else 0.0
+        return {
+            'completed': [_serialize_task(task, completed=True) for task in completed],
+            'missed': [_serialize_task(task) for task in missed],
+            'due': [_serialize_task(task) for task in due],
+            'trends': {
+                'mostProductiveCategory': totals[0]['category'] if total_completed else '',
+                'mostCompletedDay': top_day['date'].strftime('%B %d, %Y') if top_day else '',
+                'totalCompleted': total_completed,
+                'completionRate': round(completion_rate, 1)
+            }
+        }
+
+
+def _serialize_task(task, completed=False):
+    return {
+        'id': task['id'],
+        'name': task['name'],
+        'category': task['category'],
+        'priority': task['priority'],
+        'completedDate': task['completed_at'].strftime('%Y-%m-%d') if completed and task['completed_at'] else None,
+        'dueDate': task['deadline'].strftime('%Y-%m-%d') if task['deadline'] else None,
+    }
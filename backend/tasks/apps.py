@@ -1,6 +1,20 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class TasksConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tasks'
+
+    def ready(self):
+        from django.db.models.signals import post_delete, post_save
+        from .models import WeeklyChallenge
+
+        # Drop this process's cached current challenge when one is edited (e.g. in the admin)
+        post_save.connect(WeeklyChallenge.clear_cache, sender=WeeklyChallenge, dispatch_uid='weekly-challenge-cache-save')
+        post_delete.connect(WeeklyChallenge.clear_cache, sender=WeeklyChallenge, dispatch_uid='weekly-challenge-cache-delete')
+
+        # Background jobs (overdue sweeper, ...) run in-process only when enabled
+        if getattr(settings, "RUN_SCHEDULER", False):
+            from motivatchi import scheduler
+            scheduler.start()
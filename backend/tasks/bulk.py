@@ -0,0 +1,198 @@
+"""
+Apply a batch of task operations in one transaction (POST /api/tasks/bulk/).
+
+Every operation is applied to in-memory objects first; the database is then written with one
+bulk_create, one bulk_update and one DELETE for the tasks, and at most one save each for the
+Account and the Tamagotchi, whatever the number of operations.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.utils import timezone
+
+from tamagotchi.models import Tamagotchi, MAX_HEALTH
+from users.versioning import bump_version
+from .models import REMINDER_NONE, ChallengeParticipation, DailyTaskStats, EventScore, Task, TaskTombstone
+from .serializers import TaskSerializer
+
+OPERATIONS = ('create', 'patch', 'delete', 'complete', 'mark_incomplete')
+MAX_OPERATIONS = 500
+
+# Task fields that bulk_update writes back
+UPDATE_FIELDS = ['name', 'category', 'deadline', 'priority', 'status', 'completed_at', 'notify', 'updated_at', 'version', 'reminder_stage']
+
+
+class TaskBatch:
+    def __init__(self, account):
+        self.account = account
+        self.results = []
+        self.created = []
+        self.updated = {}
+        self.deleted = {}
+        self.stats = defaultdict(lambda: defaultdict(int))
+        self.completions = []
+
+    def apply(self, operations):
+        """Apply the operations and return one result dict per operation, in order."""
+        with transaction.atomic():
+            # lock the account first (same lock order as single task writes), then the rows we touch
+            self.version = Task.lock_and_bump_task_versions([self.account.id])[self.account.id]
+            self.account.refresh_from_db(fields=['coins'])
+            self.tamagotchi = Tamagotchi.objects.select_for_update().filter(user=self.account).first()
+            self.start_coins = self.account.coins
+            self.start_pet = self._pet_state()
+
+            ids = {op.get('id') for op in operations if isinstance(op, dict) and op.get('id') is not None}
+            self.tasks = {
+                task.id: task
+                for task in Task.objects.select_for_update().filter(user=self.account, id__in=[i for i in ids if isinstance(i, int)])
+            }
+
+            for op in operations:
+                self.results.append(self._apply_one(op))
+
+            self._write()
+        return self.results
+
+    # --- operations ---------------------------------------------------------
+
+    def _apply_one(self, op):
+        if not isinstance(op, dict) or op.get('op') not in OPERATIONS:
+            return {"op": op.get('op') if isinstance(op, dict) else None, "status": 400,
+                    "errors": {"op": f"Expected one of: {', '.join(OPERATIONS)}."}}
+
+        if op['op'] == 'create':
+            return self._create(op)
+
+        task = self.tasks.get(op.get('id'))
+        if task is None or task.id in self.deleted:
+            return {"op": op['op'], "id": op.get('id'), "status": 404, "errors": {"detail": "Task not found."}}
+        return getattr(self, f"_{op['op']}")(op, task)
+
+    def _create(self, op):
+        serializer = TaskSerializer(data=op.get('data') or {})
+        if not serializer.is_valid():
+            return {"op": "create", "status": 400, "errors": serializer.errors}
+        task = Task(user=self.account, version=self.version, **serializer.validated_data)
+        self.created.append(task)
+        return {"op": "create", "status": 201, "task": task}
+
+    def _patch(self, op, task):
+        serializer = TaskSerializer(task, data=op.get('data') or {}, partial=True)
+        if not serializer.is_valid():
+            return {"op": "patch", "id": task.id, "status": 400, "errors": serializer.errors}
+        self._track_stats(task, -1)
+        if serializer.validated_data.get('deadline', task.deadline) != task.deadline:
+            # a new deadline gets its own reminders
+            task.reminder_stage = REMINDER_NONE
+        for field, value in serializer.validated_data.items():
+            setattr(task, field, value)
+        self._track_stats(task, 1)
+        self._mark_updated(task)
+        return {"op": "patch", "id": task.id, "status": 200, "task": task}
+
+    def _delete(self, op, task):
+        self._track_stats(task, -1)
+        self.deleted[task.id] = task
+        self.updated.pop(task.id, None)
+        return {"op": "delete", "id": task.id, "status": 204}
+
+    def _complete(self, op, task):
+        if task.status == 'completed':
+            return {"op": "complete", "id": task.id, "status": 400, "errors": {"detail": "Task already completed."}}
+        self._track_stats(task, -1)
+        task.status = 'completed'
+        task.completed_at = timezone.now()
+        self._track_stats(task, 1)
+        self._mark_updated(task)
+
+        xp_gain, coin_gain = task.rewards()
+        self.account.coins += coin_gain
+        if self.tamagotchi:
+            self.tamagotchi.xp += xp_gain
+            self.tamagotchi.level += self.tamagotchi.xp // 100
+            self.tamagotchi.xp %= 100
+            self.tamagotchi.health = min(self.tamagotchi.health + 1.0, MAX_HEALTH)
+        return {"op": "complete", "id": task.id, "status": 200, "task": task}
+
+    def _mark_incomplete(self, op, task):
+        if task.status != 'completed':
+            return {"op": "mark_incomplete", "id": task.id, "status": 400, "errors": {"detail": "Task is not completed."}}
+        self._track_stats(task, -1)
+        task.status = 'in_progress'
+        self._track_stats(task, 1)
+        self._mark_updated(task)
+
+        xp_loss, coin_loss = task.rewards()
+        self.account.coins = max(0, self.account.coins - coin_loss)
+        if self.tamagotchi:
+            self.tamagotchi.xp = max(0, self.tamagotchi.xp - xp_loss)
+        return {"op": "mark_incomplete", "id": task.id, "status": 200, "task": task}
+
+    # --- bookkeeping --------------------------------------------------------
+
+    def _mark_updated(self, task):
+        task.version = self.version
+        task.updated_at = timezone.now()
+        self.updated[task.id] = task
+
+    def _track_stats(self, task, sign):
+        """Accumulate DailyTaskStats, challenge and event deltas for a task in its current state (see record_task)."""
+        if task.created_at:
+            self.stats[(timezone.localdate(task.created_at), task.category, task.priority)]['created'] += sign
+        if task.status == 'completed' and task.completed_at:
+            self.stats[(timezone.localdate(task.completed_at), task.category, task.priority)]['completed'] += sign
+            self.completions.append((task.priority, task.completed_at, sign))
+        elif task.status == 'overdue' and task.deadline:
+            self.stats[(task.deadline, task.category, task.priority)]['missed'] += sign
+
+    def _write(self):
+        now = timezone.now()
+        for task in self.created:
+            task.created_at = now
+            self._track_stats(task, 1)
+
+        if self.created:
+            Task.objects.bulk_create(self.created)
+        if self.updated:
+            Task.objects.bulk_update(list(self.updated.values()), UPDATE_FIELDS)
+        if self.deleted:
+            TaskTombstone.objects.bulk_create([
+                TaskTombstone(user=self.account, task_id=task_id, version=self.version) for task_id in self.deleted
+            ])
+            Task.objects.filter(id__in=list(self.deleted)).delete()
+        if self.created or self.updated:
+            # bulk writes do not send post_save
+            bump_version(self.account.id, 'tasks')
+
+        for (day, category, priority), deltas in self.stats.items():
+            DailyTaskStats.record(self.account.id, day, category, priority, **deltas)
+        ChallengeParticipation.record_completions(self.account.id, self.completions)
+        EventScore.record_completions(self.account.id, self.completions)
+
+        # each row is written at most once per batch
+        if self.account.coins != self.start_coins:
+            self.account.save(update_fields=['coins'])
+        if self.tamagotchi and self._pet_state() != self.start_pet:
+            self.tamagotchi.save(update_fields=['xp', 'level', 'health'])
+
+    def _pet_state(self):
+        if self.tamagotchi is None:
+            return None
+        return (self.tamagotchi.xp, self.tamagotchi.level, self.tamagotchi.health)
+
+    def response_data(self):
+        results = []
+        for result in self.results:
+            result = dict(result)
+            if 'task' in result:
+                result['id'] = result['task'].id
+                result['task'] = TaskSerializer(result['task']).data
+            results.append(result)
+        return {
+            "results": results,
+            "coins": self.account.coins,
+            "xp": self.tamagotchi.xp if self.tamagotchi else None,
+            "level": self.tamagotchi.level if self.tamagotchi else None,
+            "health": self.tamagotchi.health if self.tamagotchi else None,
+        }
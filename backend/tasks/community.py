@@ -0,0 +1,92 @@
+"""
+Everything the Community page shows on load (GET /api/community/summary/).
+
+The page used to call seven endpoints, each of which re-read the session and the Account and
+re-resolved the running challenge. CommunitySummary reads each table once for the account that
+AccountMiddleware already loaded:
+    Follow                 followers and following, one query for both directions
+    ChallengeParticipation the user's own participation, team members and team progress
+                           together, through Account.team_label
+    Event                  the running event, then its standings
+The challenge comes from WeeklyChallenge.current(), which is cached in memory.
+"""
+from django.db.models import Q
+
+from users.models import Follow
+from .models import ChallengeParticipation, Event, WeeklyChallenge, CHALLENGE_REWARD_COINS
+from .serializers import EventSerializer, WeeklyChallengeSerializer
+
+
+class CommunitySummary:
+    def __init__(self, account):
+        self.account = account
+
+    def data(self):
+        challenge = WeeklyChallenge.current()
+        participations = self._team_participations(challenge)
+        own = participations.get(self.account.id)
+        event = self._event()
+        return {
+            **self._connections(),
+            "challenge": WeeklyChallengeSerializer(challenge).data,
+            "has_joined": own is not None,
+            "team_members": self._team_members(participations, own),
+            "team_progress": self._team_progress(challenge, participations, own),
+            "event": EventSerializer(event).data if event else None,
+            "leaderboard": event.standings(self.account.id) if event else None,
+        }
+
+    def _connections(self):
+        following = []
+        followers = []
+        edges = (
+            Follow.objects.filter(Q(follower=self.account) | Q(followee=self.account))
+            .order_by('id')
+            .values_list('follower_id', 'follower__username', 'followee__username')
+        )
+        for follower_id, follower, followee in edges:
+            if follower_id == self.account.id:
+                following.append(followee)
+            else:
+                followers.append(follower)
+        return {"following": following, "followers": followers}
+
+    def _team_participations(self, challenge):
+        """{user_id: (username, completed_count, reward_claimed)} for the user's team, the user included."""
+        if self.account.team_label is None:
+            team = Q(user=self.account)
+        else:
+            team = Q(user__team_label=self.account.team_label)
+        rows = (
+            ChallengeParticipation.objects.filter(team, challenge=challenge)
+            .values_list('user_id', 'user__username', 'completed_count', 'reward_claimed')
+        )
+        return {user_id: (username, count, claimed) for user_id, username, count, claimed in rows}
+
+    def _team_members(self, participations, own):
+        # same as TeamMembersView: teammates who joined, shown only once the user has joined
+        if own is None:
+            return []
+        return [
+            {"username": username}
+            for user_id, (username, _, _) in participations.items()
+            if user_id != self.account.id
+        ]
+
+    def _team_progress(self, challenge, participations, own):
+        # same as TeamProgressView
+        if own is None:
+            return {"completed": 0, "total": challenge.task_count}
+        completed = sum(count for _, count, _ in participations.values())
+        claimed = own[2]
+        return {
+            "completed": completed,
+            "total": challenge.task_count,
+            "challenge_complete": completed >= challenge.task_count,
+            "reward_earned": CHALLENGE_REWARD_COINS if claimed else 0,
+            "reward_claimed": claimed,
+        }
+
+    def _event(self):
+        """The running event that started last (the one CurrentEventView returns)."""
+        return Event.running().first()
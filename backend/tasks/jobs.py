@@ -0,0 +1,398 @@
+"""
+Background jobs for the tasks app.
+Each job is idempotent so it can be run by several replicas (or cron + scheduler) at the same time.
+"""
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import BigIntegerField, Case, Count, F, FloatField, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from django.utils import timezone
+
+from tamagotchi.models import Tamagotchi
+from users.models import Account, Notification
+from users.versioning import bump_versions
+from .models import (
+    CHALLENGE_REWARD_COINS, REMINDER_DUE_SOON, REMINDER_OVERDUE,
+    ChallengeParticipation, DailyTaskStats, Event, Task, TaskTombstone, WeeklyChallenge,
+)
+
+# Tasks in these states are never flipped to overdue
+CLOSED_STATUSES = ('completed', 'overdue')
+
+# Health lost for every task that becomes overdue
+OVERDUE_HEALTH_PENALTY = 1.0
+
+OVERDUE_SWEEP_BATCH_SIZE = 500
+
+
+def sweep_overdue_tasks(today=None, batch_size=OVERDUE_SWEEP_BATCH_SIZE):
+    """
+    Mark every open task whose deadline has passed as 'overdue' and remove one heart per task.
+    Works in batches: each batch is one locked SELECT, one bulk UPDATE of the tasks and one
+    UPDATE of the affected tamagotchis. Rows locked by another replica are skipped, so every
+    task is penalised exactly once.
+    Returns the number of tasks marked overdue.
+    """
+    today = today or timezone.localdate()
+    total = 0
+    overdue = Task.objects.filter(deadline__lt=today).exclude(status__in=CLOSED_STATUSES)
+
+    while True:
+        with transaction.atomic():
+            # Accounts are locked (and given a new task version) before any task row
+            user_ids = set(overdue.values_list('user_id', flat=True)[:batch_size])
+            if not user_ids:
+                break
+            versions = Task.lock_and_bump_task_versions(user_ids)
+
+            rows = list(
+                overdue.filter(user_id__in=user_ids)
+                .select_for_update(skip_locked=True)
+                .values_list('id', 'user_id', 'deadline', 'category', 'priority')[:batch_size]
+            )
+            if not rows:
+                # everything left is being handled by another replica
+                break
+
+            Task.objects.filter(id__in=[row[0] for row in rows]).update(
+                status='overdue',
+                updated_at=timezone.now(),
+                version=Case(*[When(user_id=user_id, then=Value(version)) for user_id, version in versions.items()]),
+            )
+
+            # One heart per overdue task, applied to every tamagotchi in a single UPDATE
+            penalties = Counter(row[1] for row in rows)
+            penalty = Case(
+                *[When(user_id=user_id, then=Value(count * OVERDUE_HEALTH_PENALTY)) for user_id, count in penalties.items()],
+                output_field=FloatField(),
+            )
+            Tamagotchi.objects.filter(user_id__in=penalties).update(
+                health=Greatest(F('health') - penalty, Value(0.0))
+            )
+
+            bump_versions(penalties, 'tasks', 'health')
+
+            missed = Counter((user_id, deadline, category, priority) for _, user_id, deadline, category, priority in rows)
+            for (user_id, deadline, category, priority), count in missed.items():
+                DailyTaskStats.record(user_id, deadline, category, priority, missed=count)
+
+        total += len(rows)
+
+    return total
+
+
+REBUILD_USER_BATCH_SIZE = 200
+
+
+def rebuild_daily_task_stats(user_ids=None, batch_size=REBUILD_USER_BATCH_SIZE):
+    """
+    Recompute DailyTaskStats from the Task table (backfill / drift repair).
+    Works on `batch_size` users at a time, each batch in its own transaction.
+    Returns the number of rollup rows written.
+    """
+    return rebuild_daily_task_stats_with(Account, Task, DailyTaskStats, user_ids, batch_size)
+
+
+def rebuild_daily_task_stats_with(Account, Task, DailyTaskStats, user_ids=None, batch_size=REBUILD_USER_BATCH_SIZE):
+    """rebuild_daily_task_stats() on the given model classes (the 0017 migration passes its historical ones)."""
+    if user_ids is None:
+        user_ids = Account.objects.order_by('id').values_list('id', flat=True)
+    user_ids = list(user_ids)
+    written = 0
+
+    for i in range(0, len(user_ids), batch_size):
+        batch = user_ids[i:i + batch_size]
+        tasks = Task.objects.filter(user_id__in=batch).annotate(bucket_category=Coalesce('category', Value('')))
+        buckets = {}
+
+        def add(rows, field):
+            for row in rows:
+                key = (row['user_id'], row['day'], row['bucket_category'], row['priority'])
+                buckets.setdefault(key, {'completed': 0, 'missed': 0, 'created': 0})[field] += row['count']
+
+        group = ('user_id', 'day', 'bucket_category', 'priority')
+        add(tasks.filter(status='completed', completed_at__isnull=False)
+            .annotate(day=TruncDate('completed_at')).values(*group).annotate(count=Count('id')), 'completed')
+        add(tasks.filter(status='overdue', deadline__isnull=False)
+            .annotate(day=F('deadline')).values(*group).annotate(count=Count('id')), 'missed')
+        add(tasks.filter(created_at__isnull=False)
+            .annotate(day=TruncDate('created_at')).values(*group).annotate(count=Count('id')), 'created')
+
+        with transaction.atomic():
+            DailyTaskStats.objects.filter(user_id__in=batch).delete()
+            DailyTaskStats.objects.bulk_create([
+                DailyTaskStats(user_id=user_id, date=day, category=category, priority=priority, **counts)
+                for (user_id, day, category, priority), counts in buckets.items()
+            ], batch_size=1000)
+        written += len(buckets)
+
+    return written
+
+
+TOMBSTONE_RETENTION = timedelta(days=30)
+TOMBSTONE_COMPACTION_BATCH_SIZE = 1000
+
+
+def compact_task_tombstones(retention=TOMBSTONE_RETENTION, batch_size=TOMBSTONE_COMPACTION_BATCH_SIZE):
+    """
+    Delete task tombstones older than `retention`, in batches.
+    Each user's Account.tasks_purged_version is raised first, so a client syncing from an older
+    token is told to reload everything instead of silently missing a deletion.
+    Returns the number of tombstones deleted.
+    """
+    cutoff = timezone.now() - retention
+    total = 0
+
+    while True:
+        with transaction.atomic():
+            batch = list(
+                TaskTombstone.objects.filter(deleted_at__lt=cutoff)
+                .order_by('id')
+                .values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+
+            purged = TaskTombstone.objects.filter(id__in=batch).values('user_id').annotate(version=Max('version'))
+            for row in purged:
+                Account.objects.filter(id=row['user_id']).update(
+                    tasks_purged_version=Greatest(F('tasks_purged_version'), Value(row['version']))
+                )
+            TaskTombstone.objects.filter(id__in=batch).delete()
+
+        total += len(batch)
+
+    return total
+
+
+def reconcile_challenge_progress(challenge_ids=None):
+    """
+    Recompute ChallengeParticipation.completed_count from the Task table and fix the rows that
+    drifted. Defaults to the challenges that have not ended yet.
+    Returns the number of participations corrected.
+    """
+    challenges = WeeklyChallenge.objects.all()
+    if challenge_ids is None:
+        challenges = challenges.filter(deadline__gte=timezone.now())
+    else:
+        challenges = challenges.filter(id__in=challenge_ids)
+
+    fixed = 0
+    for challenge in challenges:
+        with transaction.atomic():
+            # counter UPDATEs from task writes wait for this and then apply on top of the recount
+            current = dict(
+                ChallengeParticipation.objects.select_for_update().filter(challenge=challenge)
+                .values_list('user_id', 'completed_count')
+            )
+            counts = dict(
+                ChallengeParticipation.matching_tasks(challenge).filter(user_id__in=current)
+                .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+            )
+            for user_id, completed_count in current.items():
+                actual = counts.get(user_id, 0)
+                if actual != completed_count:
+                    ChallengeParticipation.objects.filter(challenge=challenge, user_id=user_id).update(completed_count=actual)
+                    fixed += 1
+    return fixed
+
+
+# Challenges are still settled this long after their deadline (late counter updates, downtime)
+SETTLEMENT_GRACE = timedelta(days=1)
+
+
+def settle_weekly_challenges(challenge_ids=None):
+    """
+    Pay CHALLENGE_REWARD_COINS once to every member of every team that has reached its
+    challenge's task_count. Per challenge: one grouped query finds the winning teams, the
+    members' accounts and participations are locked with skip_locked (rows busy in another
+    transaction are left for the next run), then each team is paid with one UPDATE, every
+    participation is marked claimed with one UPDATE and the notifications are bulk-created.
+    Returns the number of rewards paid.
+    """
+    challenges = WeeklyChallenge.objects.all()
+    if challenge_ids is None:
+        challenges = challenges.filter(start_date__lte=timezone.now(), deadline__gte=timezone.now() - SETTLEMENT_GRACE)
+    else:
+        challenges = challenges.filter(id__in=challenge_ids)
+
+    paid = 0
+    for challenge in challenges:
+        participations = ChallengeParticipation.objects.filter(challenge=challenge).annotate(
+            team=Coalesce('user__team_label', 'user_id', output_field=BigIntegerField())
+        )
+        winning_teams = [
+            row['team'] for row in participations.values('team').annotate(total=Sum('completed_count'))
+            if row['total'] >= challenge.task_count
+        ]
+        if not winning_teams:
+            continue
+        unpaid = dict(
+            participations.filter(team__in=winning_teams, reward_claimed=False).values_list('user_id', 'team')
+        )
+        if not unpaid:
+            continue
+
+        with transaction.atomic():
+            # accounts first (same lock order as task writes), then participations
+            user_ids = list(
+                Account.objects.select_for_update(skip_locked=True)
+                .filter(id__in=unpaid).order_by('id').values_list('id', flat=True)
+            )
+            claimable = list(
+                ChallengeParticipation.objects.select_for_update(skip_locked=True)
+                .filter(challenge=challenge, user_id__in=user_ids, reward_claimed=False)
+                .values_list('id', 'user_id')
+            )
+            if not claimable:
+                continue
+
+            teams = {}
+            for _, user_id in claimable:
+                teams.setdefault(unpaid[user_id], []).append(user_id)
+            for members in teams.values():
+                Account.objects.filter(id__in=members).update(coins=F('coins') + CHALLENGE_REWARD_COINS)
+            ChallengeParticipation.objects.filter(id__in=[pid for pid, _ in claimable]).update(reward_claimed=True)
+            Notification.deliver(
+                Notification(
+                    user_id=user_id,
+                    message=f"Your team completed the weekly challenge! +{CHALLENGE_REWARD_COINS} coins",
+                )
+                for _, user_id in claimable
+            )
+
+            # queryset.update() sends no signals
+            bump_versions([user_id for _, user_id in claimable], 'profile')
+        paid += len(claimable)
+
+    return paid
+
+
+def generate_weekly_challenges(weeks_ahead=1):
+    """
+    Make sure the current week's challenge and the next `weeks_ahead` ones exist.
+    Parameters are derived from the week (WeeklyChallenge.parameters) and start_date is unique,
+    so replicas running this at the same time all end up with the same rows.
+    Returns the number of challenges created.
+    """
+    now = timezone.now()
+    created = 0
+    for week in range(weeks_ahead + 1):
+        start_date, deadline = WeeklyChallenge.week_bounds(now + timedelta(weeks=week))
+        _, was_created = WeeklyChallenge.objects.get_or_create(
+            start_date=start_date,
+            defaults={'deadline': deadline, **WeeklyChallenge.parameters(start_date)},
+        )
+        created += was_created
+    return created
+
+
+def update_events(now=None):
+    """
+    Activate every event whose start has passed and end every active event whose end has passed
+    (Event.activate / Event.end_event). Both lock the event row and re-check its state, so an
+    event is activated and paid out once however many replicas run this.
+    An event missed entirely (scheduler down for its whole window) is activated and ended in
+    the same run, so its winner is still paid.
+    Returns (events activated, events ended).
+    """
+    now = now or timezone.now()
+    activated = ended = 0
+    for event in Event.objects.filter(is_active=False, ended_at__isnull=True, start__lte=now).order_by('start'):
+        activated += event.activate()
+    for event in Event.objects.filter(is_active=True, end__lte=now).order_by('end'):
+        event.end_event()
+        # still active if another replica ended it first
+        ended += not event.is_active
+    return activated, ended
+
+
+# Open tasks are reminded this many days before their deadline (and again once overdue)
+REMINDER_LEAD_DAYS = 1
+
+REMINDER_BATCH_SIZE = 500
+
+# Task names listed in one reminder, each cut to this many characters
+REMINDER_LISTED_TASKS = 3
+REMINDER_NAME_LENGTH = 40
+
+
+def send_task_reminders(today=None, batch_size=REMINDER_BATCH_SIZE):
+    """
+    Remind users of their notify=True tasks that are due within REMINDER_LEAD_DAYS, and once
+    more when they become overdue. Task.reminder_stage records the last reminder sent, so a
+    task is never reminded twice for the same stage.
+    The scan walks task_reminder_scan_idx in (deadline, id) windows of `batch_size` across all
+    users. Each window locks the owners' accounts, then re-checks and locks the tasks, all with
+    skip_locked. Rows busy in another transaction or replica are left for the next run. Each
+    window writes one notification per user and stage, with one bulk insert.
+    Returns the number of tasks reminded.
+    """
+    today = today or timezone.localdate()
+    candidates = Task.objects.filter(
+        notify=True,
+        reminder_stage__lt=REMINDER_OVERDUE,
+        deadline__lte=today + timedelta(days=REMINDER_LEAD_DAYS),
+    ).filter(
+        Q(status='overdue')
+        | (Q(deadline__gte=today, reminder_stage__lt=REMINDER_DUE_SOON) & ~Q(status__in=CLOSED_STATUSES))
+    )
+
+    reminded = 0
+    window = candidates.order_by('deadline', 'id')
+    while True:
+        rows = list(window.values_list('id', 'user_id', 'deadline')[:batch_size])
+        if not rows:
+            break
+        _, _, last_deadline = rows[-1]
+        window = candidates.order_by('deadline', 'id').filter(
+            Q(deadline__gt=last_deadline) | Q(deadline=last_deadline, id__gt=rows[-1][0])
+        )
+
+        with transaction.atomic():
+            # accounts first (same lock order as task writes), then the tasks
+            user_ids = list(
+                Account.objects.select_for_update(skip_locked=True)
+                .filter(id__in={user_id for _, user_id, _ in rows}).order_by('id').values_list('id', flat=True)
+            )
+            tasks = list(
+                candidates.select_for_update(skip_locked=True)
+                .filter(id__in=[task_id for task_id, _, _ in rows], user_id__in=user_ids)
+                .values_list('id', 'user_id', 'name', 'deadline', 'status')
+            )
+            if not tasks:
+                continue
+
+            by_stage = defaultdict(list)
+            grouped = defaultdict(list)
+            for task_id, user_id, name, deadline, task_status in tasks:
+                stage = REMINDER_OVERDUE if task_status == 'overdue' else REMINDER_DUE_SOON
+                by_stage[stage].append(task_id)
+                grouped[(user_id, stage)].append((name, deadline))
+            for stage, task_ids in by_stage.items():
+                Task.objects.filter(id__in=task_ids).update(reminder_stage=stage)
+
+            Notification.deliver(
+                Notification(user_id=user_id, kind=Notification.REMINDER, message=_reminder_message(stage, items, today))
+                for (user_id, stage), items in grouped.items()
+            )
+        reminded += len(tasks)
+
+    return reminded
+
+
+def _reminder_message(stage, items, today):
+    names = [f"'{name[:REMINDER_NAME_LENGTH]}'" for name, _ in items[:REMINDER_LISTED_TASKS]]
+    if len(items) > REMINDER_LISTED_TASKS:
+        names.append(f"{len(items) - REMINDER_LISTED_TASKS} more")
+    listed = ", ".join(names)
+
+    if stage == REMINDER_OVERDUE:
+        return f"{listed} is overdue!" if len(items) == 1 else f"{len(items)} tasks are overdue: {listed}"
+    if len(items) == 1:
+        days = (items[0][1] - today).days
+        when = "today" if days <= 0 else "tomorrow" if days == 1 else f"in {days} days"
+        return f"{listed} is due {when}!"
+    return f"{len(items)} tasks are due soon: {listed}"
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tasks.jobs import rebuild_daily_task_stats
+from users.models import Account
+
+
+class Command(BaseCommand):
+    help = "Recompute the DailyTaskStats rollup from the Task table (all users, or one user)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="Only rebuild this username.")
+
+    def handle(self, *args, **options):
+        user_ids = None
+        if options["user"]:
+            try:
+                user_ids = [Account.objects.get(username=options["user"]).id]
+            except Account.DoesNotExist:
+                raise CommandError(f"User {options['user']} does not exist.")
+
+        count = rebuild_daily_task_stats(user_ids)
+        self.stdout.write(self.style.SUCCESS(f"Wrote {count} daily stats row(s)."))
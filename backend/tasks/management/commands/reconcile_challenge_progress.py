@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import reconcile_challenge_progress
+
+
+class Command(BaseCommand):
+    help = "Recompute weekly challenge progress counters from the tasks (running challenges by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--challenge", type=int, action="append", dest="challenges",
+                            help="Challenge id to reconcile (repeatable).")
+
+    def handle(self, *args, **options):
+        count = reconcile_challenge_progress(options["challenges"])
+        self.stdout.write(self.style.SUCCESS(f"Corrected {count} participation(s)."))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from motivatchi import scheduler
+
+LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+class Command(BaseCommand):
+    help = "Run the scheduled background jobs (settings.SCHEDULED_JOBS) in the foreground."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--once", action="store_true", help="Run every job once and exit.")
+
+    def handle(self, *args, **options):
+        if settings.CACHES["default"]["BACKEND"] in LOCAL_CACHES:
+            # the jobs' writes would bump ETag tokens and wake streams in this process only
+            raise CommandError(
+                "run_scheduler needs a cache shared with the web processes (set REDIS_URL), "
+                "or run the jobs inside the web process with RUN_SCHEDULER=true."
+            )
+        if options["once"]:
+            for name, func, _ in scheduler.load_jobs():
+                result = scheduler.run_job(name, func)
+                self.stdout.write(f"{name}: {result}")
+            return
+
+        self.stdout.write("Scheduler started.")
+        scheduler.run_forever()
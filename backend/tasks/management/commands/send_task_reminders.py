@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import send_task_reminders, REMINDER_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Notify users of their tasks that are due soon or have become overdue (once per stage)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=REMINDER_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = send_task_reminders(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Sent reminders for {count} task(s)."))
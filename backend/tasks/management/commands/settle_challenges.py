@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import settle_weekly_challenges
+
+
+class Command(BaseCommand):
+    help = "Pay weekly challenge rewards to every team that has reached its target (running challenges by default)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--challenge", type=int, action="append", dest="challenges",
+                            help="Challenge id to settle (repeatable).")
+
+    def handle(self, *args, **options):
+        count = settle_weekly_challenges(options["challenges"])
+        self.stdout.write(self.style.SUCCESS(f"Paid {count} reward(s)."))
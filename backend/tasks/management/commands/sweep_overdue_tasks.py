@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import sweep_overdue_tasks, OVERDUE_SWEEP_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = "Mark past-deadline tasks as overdue and apply the tamagotchi health penalties."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=OVERDUE_SWEEP_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        count = sweep_overdue_tasks(batch_size=options["batch_size"])
+        self.stdout.write(self.style.SUCCESS(f"Marked {count} task(s) as overdue."))
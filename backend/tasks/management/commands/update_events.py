@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tasks.jobs import update_events
+
+
+class Command(BaseCommand):
+    help = "Activate events whose start has passed and end (and pay out) events whose end has passed."
+
+    def handle(self, *args, **options):
+        activated, ended = update_events()
+        self.stdout.write(self.style.SUCCESS(f"Activated {activated} event(s), ended {ended} event(s)."))
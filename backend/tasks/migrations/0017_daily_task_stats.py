@@ -0,0 +1,53 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_daily_task_stats(apps, schema_editor):
+    """Roll up the existing tasks, so analytics trends are right from the first deploy."""
+    from tasks.jobs import rebuild_daily_task_stats_with
+
+    rebuild_daily_task_stats_with(
+        apps.get_model('users', 'Account'), apps.get_model('tasks', 'Task'), apps.get_model('tasks', 'DailyTaskStats'),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0016_task_indexes'),
+        ('users', '0008_notification'),
+    ]
+
+    operations = [
+        # Added as a plain nullable column first so existing tasks keep created_at = NULL
+        # instead of being stamped with the migration time.
+        migrations.AddField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='task',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyTaskStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('category', models.CharField(blank=True, default='', max_length=200)),
+                ('priority', models.CharField(max_length=200)),
+                ('completed', models.IntegerField(default=0)),
+                ('missed', models.IntegerField(default=0)),
+                ('created', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_task_stats', to='users.account')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'date', 'category', 'priority'), name='daily_task_stats_key')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_task_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:16
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def backfill_completed_counts(apps, schema_editor):
+    WeeklyChallenge = apps.get_model('tasks', 'WeeklyChallenge')
+    ChallengeParticipation = apps.get_model('tasks', 'ChallengeParticipation')
+    Task = apps.get_model('tasks', 'Task')
+
+    for challenge in WeeklyChallenge.objects.all().iterator():
+        counts = (
+            Task.objects.filter(
+                user__challenge_participations__challenge=challenge,
+                status='completed',
+                priority__iexact=challenge.priority,
+                completed_at__gte=challenge.start_date,
+                completed_at__lte=challenge.deadline,
+            )
+            .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+        )
+        for user_id, count in counts:
+            ChallengeParticipation.objects.filter(challenge=challenge, user_id=user_id).update(completed_count=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0019_task_sync'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='challengeparticipation',
+            name='completed_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_completed_counts, migrations.RunPython.noop),
+    ]
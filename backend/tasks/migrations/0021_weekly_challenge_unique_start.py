@@ -0,0 +1,54 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:18
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def merge_duplicate_weeks(apps, schema_editor):
+    """
+    Keep one challenge per start_date (the one most users joined) and move the other
+    duplicates' participants onto it before deleting them.
+    Run `manage.py reconcile_challenge_progress` afterwards to recount moved participants.
+    """
+    WeeklyChallenge = apps.get_model('tasks', 'WeeklyChallenge')
+    ChallengeParticipation = apps.get_model('tasks', 'ChallengeParticipation')
+
+    duplicated = (
+        WeeklyChallenge.objects.values('start_date').annotate(n=Count('id')).filter(n__gt=1).values_list('start_date', flat=True)
+    )
+    for start_date in list(duplicated):
+        challenges = list(
+            WeeklyChallenge.objects.filter(start_date=start_date)
+            .annotate(joined=Count('participants')).order_by('-joined', 'id')
+        )
+        keep, drop = challenges[0], challenges[1:]
+        kept_users = set(ChallengeParticipation.objects.filter(challenge=keep).values_list('user_id', flat=True))
+        for challenge in drop:
+            for participation in ChallengeParticipation.objects.filter(challenge=challenge):
+                if participation.user_id in kept_users:
+                    if participation.reward_claimed:
+                        ChallengeParticipation.objects.filter(challenge=keep, user_id=participation.user_id).update(reward_claimed=True)
+                    participation.delete()
+                else:
+                    participation.challenge_id = keep.id
+                    participation.save(update_fields=['challenge'])
+                    kept_users.add(participation.user_id)
+            challenge.delete()
+
+
+class Migration(migrations.Migration):
+    # On PostgreSQL the constraint cannot be added in the transaction that deleted the duplicates
+    # ("pending trigger events"), so the merge commits in its own transaction first.
+    atomic = False
+
+    dependencies = [
+        ('tasks', '0020_challenge_completed_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_weeks, migrations.RunPython.noop, atomic=True),
+        migrations.AddConstraint(
+            model_name='weeklychallenge',
+            constraint=models.UniqueConstraint(fields=('start_date',), name='weekly_challenge_unique_start'),
+        ),
+    ]
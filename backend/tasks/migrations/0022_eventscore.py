@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max
+
+
+def backfill_event_scores(apps, schema_editor):
+    """Scores for the events that are running, from the tasks completed in their window so far."""
+    Event = apps.get_model('tasks', 'Event')
+    EventScore = apps.get_model('tasks', 'EventScore')
+    Task = apps.get_model('tasks', 'Task')
+
+    for event in Event.objects.filter(is_active=True).iterator():
+        rows = (
+            Task.objects.filter(status='completed', completed_at__range=(event.start, event.end))
+            .values('user_id').annotate(count=Count('id'), last=Max('completed_at'))
+        )
+        EventScore.objects.bulk_create([
+            EventScore(event=event, user_id=row['user_id'], completed_count=row['count'], last_completed_at=row['last'])
+            for row in rows
+        ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0021_weekly_challenge_unique_start'),
+        ('users', '0011_account_team_label'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('completed_count', models.IntegerField(default=0)),
+                ('last_completed_at', models.DateTimeField(blank=True, null=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scores', to='tasks.event')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='event_scores', to='users.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['event', '-completed_count', 'last_completed_at'], name='event_score_rank_idx')],
+                'constraints': [models.UniqueConstraint(fields=('event', 'user'), name='event_score_unique_user')],
+            },
+        ),
+        migrations.RunPython(backfill_event_scores, migrations.RunPython.noop),
+    ]
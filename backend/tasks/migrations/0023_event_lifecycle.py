@@ -0,0 +1,34 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def mark_past_events_ended(apps, schema_editor):
+    """Inactive events that are over were ended by the old on-read path; never activate them again."""
+    Event = apps.get_model('tasks', 'Event')
+    Event.objects.filter(is_active=False, end__lte=timezone.now()).update(ended_at=F('end'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0022_eventscore'),
+        ('users', '0011_account_team_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='event',
+            name='ended_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='event',
+            name='winner',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.account'),
+        ),
+        migrations.RunPython(mark_past_events_ended, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:29
+
+from django.db import migrations, models
+
+
+def mark_overdue_reminded(apps, schema_editor):
+    """Tasks that are already overdue were never reminded; don't send a backlog on deploy."""
+    Task = apps.get_model('tasks', 'Task')
+    Task.objects.filter(status='overdue').update(reminder_stage=2)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tasks', '0023_event_lifecycle'),
+        ('users', '0013_notification_digests'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='reminder_stage',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('notify', True), ('reminder_stage__lt', 2)), fields=['deadline', 'status'], name='task_reminder_scan_idx'),
+        ),
+        migrations.RunPython(mark_overdue_reminded, migrations.RunPython.noop),
+    ]
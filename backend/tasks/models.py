@@ -1,10 +1,30 @@
-from django.db import models
+from collections import defaultdict
+from asgiref.sync import sync_to_async
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Greatest
+from motivatchi.async_queries import gather
 from users.models import Account, Notification
-from datetime import datetime, time
+from users.streaming import publish
+from users.versioning import bump_versions
+from datetime import datetime, time, timedelta
+import random
 from django.utils import timezone
 
 # Create your models here.
 
+# XP and coins gained for completing a task (and lost when it is marked incomplete), by priority
+TASK_REWARDS = {
+    'low': (3, 10),
+    'medium': (5, 20),
+    'high': (10, 30),
+}
+
+# Task.reminder_stage: the last deadline reminder sent for the task (see tasks.jobs.send_task_reminders)
+REMINDER_NONE = 0
+REMINDER_DUE_SOON = 1
+REMINDER_OVERDUE = 2
+
+
 class Task(models.Model):
     user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="tasks")
     name = models.CharField(max_length=200)
@@ -14,6 +34,155 @@ class Task(models.Model):
     status = models.CharField(max_length=200, default='in_progress') #'completed', 'overdue', or 'in_progress'
     completed_at = models.DateTimeField(blank=True, null=True)
     notify = models.BooleanField(default=True) # New field: whether the user wants notifications for this task (default: enabled)
+    created_at = models.DateTimeField(auto_now_add=True, null=True) # null for tasks created before this field existed
+    updated_at = models.DateTimeField(auto_now=True, null=True)
+    # Value of the owner's Account.tasks_version when this task was last written
+    version = models.BigIntegerField(default=0)
+    # Last reminder sent (REMINDER_*); reset when the deadline changes
+    reminder_stage = models.PositiveSmallIntegerField(default=REMINDER_NONE)
+
+    class Meta:
+        indexes = [
+            # A user's completed tasks in a time window (analytics, team progress)
+            models.Index(
+                fields=['user', 'completed_at'],
+                condition=models.Q(status='completed'),
+                name='task_user_completed_idx',
+            ),
+            # Everyone's completed tasks in a time window (event leaderboard, end_event)
+            models.Index(
+                fields=['completed_at', 'user'],
+                condition=models.Q(status='completed'),
+                name='task_completed_idx',
+            ),
+            # A user's missed / upcoming tasks by deadline
+            models.Index(fields=['user', 'status', 'deadline'], name='task_user_status_deadline_idx'),
+            # Task list pages, ordered by (deadline, id), optionally filtered by priority / category
+            models.Index(fields=['user', 'deadline', 'id'], name='task_user_deadline_idx'),
+            models.Index(fields=['user', 'priority', 'deadline'], name='task_user_priority_idx'),
+            models.Index(fields=['user', 'category', 'deadline'], name='task_user_category_idx'),
+            # Change feed: a user's tasks written after a given version
+            models.Index(fields=['user', 'version'], name='task_user_version_idx'),
+            # Reminder scan: tasks that opted in and still have a reminder to get, by deadline
+            models.Index(
+                fields=['deadline', 'status'],
+                condition=models.Q(notify=True, reminder_stage__lt=REMINDER_OVERDUE),
+                name='task_reminder_scan_idx',
+            ),
+        ]
+
+    def rewards(self):
+        """Return (xp, coins) for completing this task."""
+        return TASK_REWARDS.get((self.priority or '').lower(), (0, 0))
+
+    @staticmethod
+    def lock_and_bump_task_versions(user_ids):
+        """
+        Give each user the next task version and return {user_id: version}.
+        Must run inside a transaction. The Account rows stay locked until commit, so versions
+        become visible in order and /api/tasks/changes/ never skips a write, whatever the
+        clocks of the replicas say. Accounts are always locked before task rows.
+        """
+        user_ids = sorted(set(user_ids))
+        if len(user_ids) > 1:
+            # lock in id order so two batch writers can never deadlock
+            list(Account.objects.select_for_update().filter(id__in=user_ids).order_by('id').values_list('id', flat=True))
+        Account.objects.filter(id__in=user_ids).update(tasks_version=models.F('tasks_version') + 1)
+        return dict(Account.objects.filter(id__in=user_ids).values_list('id', 'tasks_version'))
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            self.version = Task.lock_and_bump_task_versions([self.user_id])[self.user_id]
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'version', 'updated_at'}
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        # Leave a tombstone so syncing clients learn about the deletion
+        with transaction.atomic():
+            version = Task.lock_and_bump_task_versions([self.user_id])[self.user_id]
+            TaskTombstone.objects.create(user_id=self.user_id, task_id=self.id, version=version)
+            return super().delete(*args, **kwargs)
+
+
+class TaskTombstone(models.Model):
+    """
+    Marks a deleted task for the /api/tasks/changes/ feed.
+    Old tombstones are compacted by tasks.jobs.compact_task_tombstones.
+    """
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="task_tombstones")
+    task_id = models.BigIntegerField()
+    version = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'version'], name='tombstone_user_version_idx'),
+            models.Index(fields=['deleted_at'], name='tombstone_deleted_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"Deleted task {self.task_id} ({self.user})"
+
+
+class DailyTaskStats(models.Model):
+    """
+    Per-user daily rollup of task activity, keyed by (user, date, category, priority).
+    - completed: tasks completed on `date`
+    - missed: overdue tasks whose deadline was `date`
+    - created: tasks created on `date`
+    Kept current incrementally by the task endpoints and the overdue sweeper, so analytics
+    never has to scan Task rows. `manage.py rebuild_task_stats` recomputes it from scratch.
+    """
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="daily_task_stats")
+    date = models.DateField()
+    category = models.CharField(max_length=200, blank=True, default='')  # '' when the task has no category
+    priority = models.CharField(max_length=200)
+    completed = models.IntegerField(default=0)
+    missed = models.IntegerField(default=0)
+    created = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'date', 'category', 'priority'], name='daily_task_stats_key'),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.date} {self.category}/{self.priority}"
+
+    @classmethod
+    def record(cls, user_id, date, category, priority, **deltas):
+        """
+        Add deltas to one bucket, e.g. record(user.id, today, "Study", "Low", completed=1).
+        Uses an F() UPDATE, creating the row on first use.
+        """
+        deltas = {field: delta for field, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        key = {'user_id': user_id, 'date': date, 'category': category or '', 'priority': priority or ''}
+        updates = {field: models.F(field) + delta for field, delta in deltas.items()}
+        if cls.objects.filter(**key).update(**updates):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, **deltas)
+        except IntegrityError:
+            # another request created the bucket first
+            cls.objects.filter(**key).update(**updates)
+
+    @classmethod
+    def record_task(cls, task, sign=1):
+        """Add (sign=1) or remove (sign=-1) a task's contribution in its current state."""
+        if task.created_at:
+            cls.record(task.user_id, timezone.localdate(task.created_at), task.category, task.priority, created=sign)
+        if task.status == 'completed' and task.completed_at:
+            cls.record(task.user_id, timezone.localdate(task.completed_at), task.category, task.priority, completed=sign)
+        elif task.status == 'overdue' and task.deadline:
+            cls.record(task.user_id, task.deadline, task.category, task.priority, missed=sign)
+
+
+# Coins paid to every member of a team that completes the weekly challenge
+CHALLENGE_REWARD_COINS = 20
 
 
 class WeeklyChallenge(models.Model):
@@ -31,13 +200,66 @@ class WeeklyChallenge(models.Model):
     start_date = models.DateTimeField(help_text="Challenge start date (Sunday 12:00 AM)")
     deadline = models.DateTimeField(help_text="Challenge deadline (Saturday 11:59 PM)")
     created_at = models.DateTimeField(auto_now_add=True)
+
+    # In-process cache of the running challenge, valid until its deadline (see current())
+    _current = None
     
     class Meta:
         ordering = ['-start_date']
+        constraints = [
+            # one challenge per week, however many replicas try to create it
+            models.UniqueConstraint(fields=['start_date'], name='weekly_challenge_unique_start'),
+        ]
     
     def __str__(self):
         return f"{self.description} ({self.start_date.date()} - {self.deadline.date()})"
 
+    @staticmethod
+    def week_bounds(now):
+        """(Sunday 12:00 AM, Saturday 11:59:59 PM) of the week containing `now`."""
+        last_sunday = now - timedelta(days=(now.weekday() + 1) % 7)
+        last_sunday = last_sunday.replace(hour=0, minute=0, second=0, microsecond=0)
+        return last_sunday, last_sunday + timedelta(days=6, hours=23, minutes=59, seconds=59)
+
+    @staticmethod
+    def parameters(start_date):
+        """
+        Task count (15-30) and priority for the week starting at `start_date`.
+        Seeded by the week, so every replica derives the same challenge.
+        """
+        rng = random.Random(f"weekly-challenge:{start_date.date().isoformat()}")
+        task_count = rng.randint(15, 30)
+        priority = rng.choice(['Low', 'Medium', 'High'])
+        return {
+            'task_count': task_count,
+            'priority': priority,
+            'description': f"Complete {task_count} {priority} priority tasks",
+        }
+
+    @classmethod
+    def for_week(cls, now):
+        """Return the challenge of the week containing `now`, creating it if needed."""
+        start_date, deadline = cls.week_bounds(now)
+        challenge, _ = cls.objects.get_or_create(
+            start_date=start_date,
+            defaults={'deadline': deadline, **cls.parameters(start_date)},
+        )
+        return challenge
+
+    @classmethod
+    def current(cls):
+        """The running challenge, served from memory until its deadline."""
+        now = timezone.now()
+        challenge = cls._current
+        if challenge is None or not (challenge.start_date <= now <= challenge.deadline):
+            challenge = cls.objects.filter(start_date__lte=now, deadline__gte=now).first() or cls.for_week(now)
+            cls._current = challenge
+        return challenge
+
+    @classmethod
+    def clear_cache(cls, **kwargs):
+        cls._current = None
+
 
 class ChallengeParticipation(models.Model):
     """
@@ -49,6 +271,9 @@ class ChallengeParticipation(models.Model):
     joined_at = models.DateTimeField(auto_now_add=True)
     # Track if the user has received their reward for completing this challenge
     reward_claimed = models.BooleanField(default=False)
+    # The user's completed tasks that count towards the challenge; kept in step with task
+    # writes by record_task() / record_completions() (repair: `manage.py reconcile_challenge_progress`)
+    completed_count = models.IntegerField(default=0)
     
     class Meta:
         # Ensure a user can only join a challenge once
@@ -57,13 +282,76 @@ class ChallengeParticipation(models.Model):
     
     def __str__(self):
         return f"{self.user.username} - {self.challenge.description}"
+
+    @staticmethod
+    def matching_tasks(challenge):
+        """Completed tasks that count towards `challenge`."""
+        return Task.objects.filter(
+            status='completed',
+            priority__iexact=challenge.priority,
+            completed_at__gte=challenge.start_date,
+            completed_at__lte=challenge.deadline,
+        )
+
+    @classmethod
+    def record_task(cls, task, sign=1):
+        """Add (sign=1) or remove (sign=-1) a task's contribution in its current state."""
+        if task.status == 'completed' and task.completed_at and task.priority:
+            cls.record_completion(task.user_id, task.priority, task.completed_at, sign)
+
+    @classmethod
+    def record_completion(cls, user_id, priority, completed_at, sign=1):
+        """Count one completion at `completed_at` for the challenge (if any) it falls in, in one UPDATE."""
+        cls.objects.filter(
+            user_id=user_id,
+            challenge__start_date__lte=completed_at,
+            challenge__deadline__gte=completed_at,
+            challenge__priority__iexact=priority,
+        ).update(completed_count=models.F('completed_count') + sign)
+
+    @classmethod
+    def record_completions(cls, user_id, completions):
+        """
+        record_completion() for many (priority, completed_at, sign) at once: one SELECT for the
+        user's participations in the covered period, then one UPDATE per participation that moved.
+        """
+        completions = [c for c in completions if c[0] and c[1]]
+        if not completions:
+            return
+        times = [completed_at for _, completed_at, _ in completions]
+        participations = cls.objects.filter(
+            user_id=user_id,
+            challenge__start_date__lte=max(times),
+            challenge__deadline__gte=min(times),
+        ).values_list('id', 'challenge__priority', 'challenge__start_date', 'challenge__deadline')
+
+        deltas = defaultdict(int)
+        for participation_id, priority, start, deadline in participations:
+            for task_priority, completed_at, sign in completions:
+                if task_priority.lower() == priority.lower() and start <= completed_at <= deadline:
+                    deltas[participation_id] += sign
+        for participation_id, delta in deltas.items():
+            if delta:
+                cls.objects.filter(id=participation_id).update(completed_count=models.F('completed_count') + delta)
     
+# Users notified of their final place when an event ends (the first one also gets reward_coins)
+EVENT_NOTIFIED_PLACES = 3
+
+
 class Event(models.Model):
+    """
+    A global event. Several can run at once, each with its own leaderboard.
+    tasks.jobs.update_events activates an event when its start passes and ends it (paying the
+    winner) when its end passes; is_active is only true in between.
+    """
     name = models.CharField(max_length=200)
     start = models.DateTimeField(default=timezone.now)  # event start datetime
     end = models.DateTimeField(default=timezone.now)    # event end datetime
     reward_coins = models.IntegerField(default=100)
     is_active = models.BooleanField(default=False)
+    # set once by end_event(); an ended event is never activated again
+    ended_at = models.DateTimeField(null=True, blank=True)
+    winner = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
 
     def __str__(self):
         return self.name
@@ -71,37 +359,217 @@ class Event(models.Model):
     def has_ended(self):
         return timezone.now() >= self.end
 
+    @classmethod
+    def running(cls, now=None):
+        """Active events whose window contains `now`, latest start first."""
+        now = now or timezone.now()
+        return cls.objects.filter(is_active=True, start__lte=now, end__gt=now).order_by('-start', '-id')
+
+    def rebuild_scores(self):
+        """Recount the EventScores from the tasks completed in the event window."""
+        rows = (
+            Task.objects.filter(status="completed", completed_at__range=(self.start, self.end))
+            .values('user_id').annotate(count=models.Count('id'), last=models.Max('completed_at'))
+        )
+        EventScore.objects.filter(event=self).delete()
+        EventScore.objects.bulk_create([
+            EventScore(event=self, user_id=row['user_id'], completed_count=row['count'], last_completed_at=row['last'])
+            for row in rows
+        ], batch_size=1000)
+
+    def activate(self):
+        """
+        Start counting completions for the event. Completions made between `start` and now
+        are counted from the Task table. Returns False if the event was already active or ended.
+        """
+        with transaction.atomic():
+            event = Event.objects.select_for_update().get(pk=self.pk)
+            if event.is_active or event.ended_at:
+                return False
+            Event.objects.filter(pk=self.pk).update(is_active=True)
+            self.is_active = True
+            self.rebuild_scores()
+        return True
+
+    def ranked_scores(self):
+        """EventScore rows with at least one completion, best first (ties: see EventScore)."""
+        return (
+            EventScore.objects.filter(event=self, completed_count__gt=0)
+            .select_related('user')
+            .order_by('-completed_count', 'last_completed_at', 'user_id')
+        )
+
+    def rank_of(self, user_id):
+        """(rank, score) of the user, or (None, None) if they completed nothing; two indexed queries."""
+        scores = self.ranked_scores()
+        mine = scores.filter(user_id=user_id).first()
+        if not mine:
+            return None, None
+        ahead = scores.filter(
+            models.Q(completed_count__gt=mine.completed_count)
+            | models.Q(completed_count=mine.completed_count, last_completed_at__lt=mine.last_completed_at)
+            | models.Q(completed_count=mine.completed_count, last_completed_at=mine.last_completed_at, user_id__lt=user_id)
+        ).count()
+        return ahead + 1, mine
+
+    def standings(self, user_id=None, top=3, around=0):
+        """
+        Top `top` users by tasks completed during the event, the rank and count of `user_id`,
+        and the `around` users ranked just above and below them.
+        The rank is counted in the database; only the rows shown are fetched.
+        """
+        leaders = list(self.ranked_scores()[:top])
+        user_rank, mine = self.rank_of(user_id) if user_id else (None, None)
+        return self._standings(leaders, user_rank, mine, self._around(user_rank, around))
+
+    async def astandings(self, user_id=None, top=3, around=0):
+        """standings(), reading the top rows and the caller's rank concurrently (motivatchi.async_queries)."""
+        leaders, (user_rank, mine) = await gather(
+            lambda: list(self.ranked_scores()[:top]),
+            lambda: self.rank_of(user_id) if user_id else (None, None),
+        )
+        # needs the rank, so it comes after
+        around_rows = await sync_to_async(self._around)(user_rank, around)
+        return self._standings(leaders, user_rank, mine, around_rows)
+
+    def _around(self, user_rank, around):
+        """(first rank, rows) of the `around` users above and below `user_rank`."""
+        if not (user_rank and around):
+            return None, []
+        first = max(user_rank - around, 1)
+        return first, list(self.ranked_scores()[first - 1:user_rank + around])
+
+    def _standings(self, leaders, user_rank, mine, around_rows):
+        from .serializers import LeaderboardEntrySerializer
+
+        def entries(scores, first):
+            for rank, score in enumerate(scores, start=first):
+                score.rank = rank
+            return LeaderboardEntrySerializer(scores, many=True).data
+
+        first, around_me = around_rows
+        return {
+            "event_name": self.name,
+            "leaderboard": entries(leaders, 1),
+            "your_rank": user_rank,
+            "your_completed_tasks": mine.completed_count if mine else 0,
+            "around_me": entries(around_me, first) if around_me else [],
+        }
+
     def end_event(self):
-        if not self.is_active:
-            return None  # already ended
-
-        # Count completed tasks during event period
-        task_counts = (
-            Task.objects.filter(
-                status="completed",
-                completed_at__range=(self.start, self.end)
+        """
+        End the event exactly once: pay reward_coins to the winner and notify the top
+        EVENT_NOTIFIED_PLACES with one bulk insert (Notification.deliver). Returns the winner,
+        or None if nobody scored or the event had already ended.
+        """
+        with transaction.atomic():
+            event = Event.objects.select_for_update().get(pk=self.pk)
+            if not event.is_active:
+                return None  # already ended
+
+            # The winner is the top EventScore (most completions, reached first)
+            places = list(self.ranked_scores()[:EVENT_NOTIFIED_PLACES])
+            winner = places[0].user if places else None
+            if winner:
+                Account.objects.filter(id=winner.id).update(coins=models.F('coins') + self.reward_coins)
+
+            Notification.deliver(
+                Notification(
+                    user=score.user,
+                    message=(
+                        f"Congratulations! You won the event '{self.name}' and earned {self.reward_coins} coins!"
+                        if rank == 1 else
+                        f"You finished #{rank} in the event '{self.name}' with {score.completed_count} tasks!"
+                    ),
+                )
+                for rank, score in enumerate(places, start=1)
             )
-            .values('user')
-            .annotate(count=models.Count('id'))
-            .order_by('-count', 'user')  # break ties consistently
-        )
 
-        if not task_counts:
             self.is_active = False
-            self.save()
-            return None
-
-        winner_id = task_counts[0]['user']
-        winner = Account.objects.get(id=winner_id)
-        winner.coins += self.reward_coins
-        winner.save()
-
-        # Notification
-        Notification.objects.create(
-            user=winner,
-            message=f"Congratulations! You won the event '{self.name}' and earned {self.reward_coins} coins!"
-        )
+            self.ended_at = timezone.now()
+            self.winner = winner
+            Event.objects.filter(pk=self.pk).update(is_active=False, ended_at=self.ended_at, winner=winner)
+
+            # queryset.update() sends no signals
+            if winner:
+                bump_versions([winner.id], 'profile')
+            transaction.on_commit(lambda: publish(None, ['leaderboard']))
+        return winner
+
+class EventScore(models.Model):
+    """
+    A user's completed tasks during an active Event, kept in step with task writes by
+    record_task() / record_completions() so leaderboards never re-aggregate the Task table.
+    Ties are broken by who reached the count first (last_completed_at), then by user id.
+    """
+    event = models.ForeignKey(Event, on_delete=models.CASCADE, related_name="scores")
+    user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="event_scores")
+    completed_count = models.IntegerField(default=0)
+    last_completed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['event', 'user'], name='event_score_unique_user'),
+        ]
+        indexes = [
+            # leaderboard order: top-k, rank counts and around-me slices are index range scans
+            models.Index(fields=['event', '-completed_count', 'last_completed_at'], name='event_score_rank_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.event.name}: {self.completed_count}"
+
+    @classmethod
+    def record_task(cls, task, sign=1):
+        """Add (sign=1) or remove (sign=-1) a task's contribution in its current state."""
+        if task.status == 'completed' and task.completed_at:
+            cls.record_completion(task.user_id, task.completed_at, sign)
+
+    @classmethod
+    def record_completion(cls, user_id, completed_at, sign=1):
+        cls.record_completions(user_id, [(None, completed_at, sign)])
+
+    @classmethod
+    def record_completions(cls, user_id, completions):
+        """
+        Count (priority, completed_at, sign) completions towards every active event whose window
+        contains them: one SELECT for the events, then one UPDATE (or INSERT) per event that moved.
+        """
+        times = [completed_at for _, completed_at, _ in completions if completed_at]
+        if not times:
+            return
+        events = Event.objects.filter(
+            is_active=True, start__lte=max(times), end__gte=min(times)
+        ).values_list('id', 'start', 'end')
 
-        self.is_active = False
-        self.save()
-        return winner
\ No newline at end of file
+        moved = False
+        for event_id, start, end in events:
+            counted = [(completed_at, sign) for _, completed_at, sign in completions
+                       if completed_at and start <= completed_at <= end]
+            if not counted:
+                continue
+            delta = sum(sign for _, sign in counted)
+            added = [completed_at for completed_at, sign in counted if sign > 0]
+            if len(added) < len(counted):
+                # a maximum cannot be taken back: re-read it from the tasks still completed in the
+                # window (callers record removals after writing the task)
+                last = models.Subquery(
+                    Task.objects.filter(user_id=user_id, status='completed', completed_at__range=(start, end))
+                    .order_by('-completed_at').values('completed_at')[:1]
+                )
+                moved = True
+            else:
+                last = Greatest(Coalesce('last_completed_at', max(added)), max(added))
+                moved = moved or bool(delta)
+            updates = {'completed_count': Greatest(models.F('completed_count') + delta, 0), 'last_completed_at': last}
+            if cls.objects.filter(event_id=event_id, user_id=user_id).update(**updates) or delta <= 0:
+                continue
+            try:
+                with transaction.atomic():
+                    cls.objects.create(event_id=event_id, user_id=user_id, completed_count=delta, last_completed_at=max(added))
+            except IntegrityError:
+                # another request created the row first
+                cls.objects.filter(event_id=event_id, user_id=user_id).update(**updates)
+        if moved:
+            # ranks moved: wake every open stream's leaderboard (users.streaming throttles it)
+            transaction.on_commit(lambda: publish(None, ['leaderboard']))
@@ -0,0 +1,8 @@
+from motivatchi.pagination import KeysetCursorPagination
+
+
+class TaskCursorPagination(KeysetCursorPagination):
+    """Tasks ordered by (deadline, id), tasks without a deadline last."""
+    ordering = ('deadline', 'id')
+    page_size = 50
+    max_page_size = 200
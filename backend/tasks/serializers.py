@@ -55,6 +55,7 @@ class EventSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 class LeaderboardEntrySerializer(serializers.Serializer):
-    username = serializers.CharField()
+    rank = serializers.IntegerField()
+    username = serializers.CharField(source='user.username')
     completed_count = serializers.IntegerField()
     last_completed_at = serializers.DateTimeField(allow_null=True)
\ No newline at end of file
@@ -1,10 +1,25 @@
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.utils import timezone
-from users.models import Account, Notification
-from tasks.models import Task, WeeklyChallenge, ChallengeParticipation, Event
+from users import teams
+from users.models import Account, Follow, Notification
+from tasks.models import Task, TaskTombstone, DailyTaskStats, WeeklyChallenge, ChallengeParticipation, Event, EventScore
 from datetime import date, timedelta
-from django.db import models
+from io import StringIO
+import json
+import threading
+from asgiref.sync import async_to_sync
+from unittest import mock
+from django.core.management import call_command
+from django.db import IntegrityError, connection, models, transaction
+from django.db.migrations.executor import MigrationExecutor
+from django.test import AsyncRequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from tamagotchi.models import Tamagotchi
+from motivatchi.async_queries import gather
+from tasks.analytics import TaskAnalytics
+from tasks.views import async_event_leaderboard, async_task_analytics
+from tasks.jobs import sweep_overdue_tasks, rebuild_daily_task_stats, compact_task_tombstones, reconcile_challenge_progress, settle_weekly_challenges, generate_weekly_challenges, update_events, send_task_reminders
 
 class TaskViewTests(APITestCase):
     def setUp(self):
@@ -73,7 +88,7 @@ class TaskViewTests(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
 
         # check database result (should only have current user's task)
-        data = response.json()
+        data = response.json()["results"]
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["name"], "Task")
 
@@ -129,6 +144,265 @@ class TaskViewTests(APITestCase):
         self.assertEqual(Task.objects.count(), 0)
 
 
+class CompleteTaskTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="finisher", hashed_password="pw", coins=5)
+        self.tamagotchi = Tamagotchi.objects.create(user=self.user, xp=95, level=2, health=4.5)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.task = Task.objects.create(user=self.user, name="report", priority="High")
+
+    def complete(self, task=None):
+        return self.client.post(f"/api/tasks/{(task or self.task).id}/complete/")
+
+    def test_complete_rewards_and_levels_up_in_closed_form(self):
+        """xp wraps into the next level, health is capped and coins are added"""
+        response = self.complete()
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        # xp 95 + 10 -> level 3 with 5 xp; health 4.5 + 1 capped at 5
+        self.assertEqual((data["xp"], data["level"], data["health"], data["coins"]), (5, 3, 5.0, 35))
+        self.assertTrue(data["leveled_up"])
+        self.assertEqual(data["task_status"], "completed")
+
+        self.tamagotchi.refresh_from_db()
+        self.user.refresh_from_db()
+        self.task.refresh_from_db()
+        self.assertEqual((self.tamagotchi.xp, self.tamagotchi.level), (5, 3))
+        self.assertEqual(self.user.coins, 35)
+        self.assertEqual(self.task.status, "completed")
+        self.assertIsNotNone(self.task.completed_at)
+        self.assertEqual(self.task.version, self.user.tasks_version)
+
+    def test_double_complete_rewards_once(self):
+        """A replayed complete is rejected and does not pay out twice"""
+        self.assertEqual(self.complete().status_code, 200)
+        response = self.complete()
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.tamagotchi.refresh_from_db()
+        self.assertEqual(self.user.coins, 35)
+        self.assertEqual((self.tamagotchi.xp, self.tamagotchi.level), (5, 3))
+
+    def test_stale_read_is_retried(self):
+        """A task completed between the read and the locked UPDATE is not rewarded again"""
+        rewards = Task.rewards
+
+        def complete_concurrently(task):
+            # another request completes the task right after this one read it
+            Task.objects.filter(pk=task.pk).update(status="completed", completed_at=timezone.now())
+            return rewards(task)
+
+        with mock.patch.object(Task, "rewards", complete_concurrently):
+            response = self.complete()
+        self.assertEqual(response.status_code, 400)
+        self.user.refresh_from_db()
+        self.tamagotchi.refresh_from_db()
+        self.assertEqual(self.user.coins, 5)
+        self.assertEqual((self.tamagotchi.xp, self.tamagotchi.level), (95, 2))
+
+    def test_mark_incomplete_takes_rewards_back_without_going_negative(self):
+        self.task.status = "completed"
+        self.task.completed_at = timezone.now()
+        self.task.save()
+        self.user.coins = 10
+        self.user.save()
+        self.tamagotchi.xp = 4
+        self.tamagotchi.save()
+
+        response = self.client.post(f"/api/tasks/{self.task.id}/mark_incomplete/")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual((data["coins"], data["xp"], data["level"]), (0, 0, 2))
+        self.assertFalse(data["remove_heart"])
+        self.task.refresh_from_db()
+        self.assertEqual(self.task.status, "in_progress")
+        self.assertEqual(self.client.post(f"/api/tasks/{self.task.id}/mark_incomplete/").status_code, 400)
+
+    def test_missing_tamagotchi_rolls_back(self):
+        self.tamagotchi.delete()
+        self.assertEqual(self.complete().status_code, 404)
+        self.task.refresh_from_db()
+        self.user.refresh_from_db()
+        self.assertEqual(self.task.status, "in_progress")
+        self.assertEqual(self.user.coins, 5)
+
+
+class BulkTaskTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="bulker", hashed_password="pw", coins=5)
+        self.tamagotchi = Tamagotchi.objects.create(user=self.user, xp=95, health=3.0)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.url = "/api/tasks/bulk/"
+
+    def test_mixed_operations_apply_in_one_batch(self):
+        """Every kind of operation is applied and rewards are aggregated"""
+        high = Task.objects.create(user=self.user, name="high", priority="High")
+        low = Task.objects.create(user=self.user, name="low", priority="Low")
+        done = Task.objects.create(user=self.user, name="done", priority="Medium",
+                                   status="completed", completed_at=timezone.now())
+        doomed = Task.objects.create(user=self.user, name="doomed", priority="Low")
+
+        response = self.client.post(self.url, {"operations": [
+            {"op": "create", "data": {"name": "new", "priority": "Low", "category": "Import"}},
+            {"op": "patch", "id": low.id, "data": {"name": "renamed"}},
+            {"op": "complete", "id": high.id},
+            {"op": "complete", "id": low.id},
+            {"op": "mark_incomplete", "id": done.id},
+            {"op": "delete", "id": doomed.id},
+        ]}, format="json")
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual([r["status"] for r in data["results"]], [201, 200, 200, 200, 200, 204])
+
+        # coins: 5 + 30 + 10 - 20; xp: 95 + 10 + 3 - 5 = 103 -> level up
+        self.assertEqual(data["coins"], 25)
+        self.assertEqual((data["level"], data["xp"]), (2, 3))
+        self.assertEqual(data["health"], 5.0)
+
+        self.assertTrue(Task.objects.filter(user=self.user, name="new").exists())
+        self.assertFalse(Task.objects.filter(id=doomed.id).exists())
+        low.refresh_from_db()
+        self.assertEqual((low.name, low.status), ("renamed", "completed"))
+        done.refresh_from_db()
+        self.assertEqual(done.status, "in_progress")
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.coins, 25)
+
+    def test_failed_operations_are_reported_and_skipped(self):
+        """Invalid operations get their own error status; valid ones still apply"""
+        task = Task.objects.create(user=self.user, name="t", priority="Low")
+        other = Task.objects.create(user=Account.objects.create(username="x", hashed_password="pw"),
+                                    name="not mine", priority="Low")
+        response = self.client.post(self.url, {"operations": [
+            {"op": "create", "data": {"priority": "Low"}},
+            {"op": "complete", "id": other.id},
+            {"op": "explode", "id": task.id},
+            {"op": "complete", "id": task.id},
+            {"op": "complete", "id": task.id},
+        ]}, format="json")
+        self.assertEqual([r["status"] for r in response.json()["results"]], [400, 404, 400, 200, 400])
+        self.assertEqual(self.client.post(self.url, {"operations": []}, format="json").status_code, 400)
+
+    def test_writes_are_batched(self):
+        """Completing many tasks costs a constant number of queries"""
+        def run(n):
+            tasks = Task.objects.bulk_create([Task(user=self.user, name=f"t{i}", priority="Low") for i in range(n)])
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(self.url, {"operations": [{"op": "complete", "id": t.id} for t in tasks]}, format="json")
+            return len(ctx)
+        run(1)  # creates today's rollup bucket
+        self.assertEqual(run(3), run(30))
+
+
+class TaskListPaginationTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="pager", hashed_password="pw")
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.url = "/api/tasks/"
+
+        today = date(2025, 1, 1)
+        self.tasks = []
+        for i in range(7):
+            self.tasks.append(Task.objects.create(
+                user=self.user, name=f"t{i}", priority="High" if i % 2 else "Low",
+                status="overdue" if i < 2 else "in_progress",
+                deadline=None if i == 3 else today + timedelta(days=i % 3),
+            ))
+
+    def _walk(self, params):
+        names, url = [], self.url
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            page = response.json()
+            self.assertLessEqual(len(page["results"]), params.get("page_size", 50))
+            names += [t["name"] for t in page["results"]]
+            url, params = page["next"], {}
+        return names
+
+    def test_pages_follow_deadline_then_id_order(self):
+        """Walking the cursors returns every task once, ordered by (deadline, id), no-deadline tasks last"""
+        expected = [t.name for t in sorted(self.tasks, key=lambda t: (t.deadline is None, t.deadline or date.min, t.id))]
+        self.assertEqual(self._walk({"page_size": 2}), expected)
+
+    def test_filters(self):
+        """status, priority and deadline range filters are applied server-side"""
+        self.assertEqual(set(self._walk({"status": "overdue"})), {"t0", "t1"})
+        self.assertEqual(set(self._walk({"priority": "High", "status": "in_progress,overdue"})), {"t1", "t3", "t5"})
+        self.assertEqual(set(self._walk({"deadline_after": "2025-01-02", "deadline_before": "2025-01-02"})), {"t1", "t4"})
+
+        response = self.client.get(self.url, {"deadline_after": "tomorrow"})
+        self.assertEqual(response.status_code, 400)
+
+    def test_opt_out_returns_full_list(self):
+        """?paginate=false keeps the old unpaginated response"""
+        response = self.client.get(self.url, {"paginate": "false"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(self.url, {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 404)
+
+
+class TaskChangesFeedTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="syncer", hashed_password="pw")
+        Tamagotchi.objects.create(user=self.user)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.url = "/api/tasks/changes/"
+
+    def _changes(self, since=None):
+        response = self.client.get(self.url, {"since": since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def test_feed_returns_only_changes_since_token(self):
+        """Writes, deletions and sweeper updates after the token are returned, nothing else"""
+        keep = Task.objects.create(user=self.user, name="keep", priority="Low")
+        edit = Task.objects.create(user=self.user, name="edit", priority="Low")
+        gone = Task.objects.create(user=self.user, name="gone", priority="Low",
+                                   deadline=timezone.localdate() - timedelta(days=1))
+
+        first = self._changes()
+        self.assertTrue(first["reset"])
+        self.assertEqual({t["name"] for t in first["tasks"]}, {"keep", "edit", "gone"})
+
+        self.client.patch(f"/api/tasks/{edit.id}/", {"name": "edited"}, format="json")
+        sweep_overdue_tasks()
+        late = self._changes(first["token"])
+        self.assertFalse(late["reset"])
+        self.assertEqual({t["name"]: t["status"] for t in late["tasks"]}, {"edited": "in_progress", "gone": "overdue"})
+
+        self.client.delete(f"/api/tasks/{gone.id}/")
+        latest = self._changes(late["token"])
+        self.assertEqual(latest["tasks"], [])
+        self.assertEqual(latest["deleted"], [gone.id])
+
+        self.assertEqual(self._changes(latest["token"]), {"token": latest["token"], "reset": False, "tasks": [], "deleted": []})
+        self.assertNotIn(keep.id, [t["id"] for t in latest["tasks"]])
+
+    def test_compacted_tombstones_force_reset(self):
+        """A token older than compacted tombstones gets the full list instead of a partial delta"""
+        task = Task.objects.create(user=self.user, name="old", priority="Low")
+        token = self._changes()["token"]
+        task.delete()
+        TaskTombstone.objects.update(deleted_at=timezone.now() - timedelta(days=60))
+
+        self.assertEqual(compact_task_tombstones(), 1)
+        data = self._changes(token)
+        self.assertTrue(data["reset"])
+        self.assertEqual(data["tasks"], [])
+
+
 class ChallengeFlowTests(APITestCase):
     """End-to-end tests for weekly community challenges."""
 
@@ -137,14 +411,15 @@ class ChallengeFlowTests(APITestCase):
         self.alice = Account.objects.create(username="alice", hashed_password="pw")
         self.bob = Account.objects.create(username="bob", hashed_password="pw")
         self.charlie = Account.objects.create(username="charlie", hashed_password="pw")
+        for user in (self.alice, self.bob, self.charlie):
+            Tamagotchi.objects.create(user=user)
+        # the running challenge is cached per process; each test has its own database rows
+        WeeklyChallenge.clear_cache()
 
         # Alice and Bob are mutual followers (they follow each other)
-        self.alice.following = ["bob"]
-        self.alice.followers = ["bob"]
-        self.alice.save()
-        self.bob.following = ["alice"]
-        self.bob.followers = ["alice"]
-        self.bob.save()
+        Follow.objects.create(follower=self.alice, followee=self.bob)
+        Follow.objects.create(follower=self.bob, followee=self.alice)
+        teams.link(self.alice.id, self.bob.id)
 
         # helper: set session as a specific user
         self.base_urls = {
@@ -160,6 +435,13 @@ class ChallengeFlowTests(APITestCase):
         session["user_id"] = user.id
         session.save()
 
+    def _complete_tasks(self, user, n, priority):
+        # Create N tasks and complete them through the API, as that user
+        self._as_user(user)
+        for i in range(n):
+            task = Task.objects.create(user=user, name=f"task-{user.username}-{i}", category="Challenge", priority=priority)
+            self.assertEqual(self.client.post(f"/api/tasks/{task.id}/complete/").status_code, 200)
+
     def _get_weekly_challenge(self):
         # Ensures a weekly challenge exists and returns it
         resp = self.client.get(self.base_urls["weekly"])  # creates one if needed
@@ -231,12 +513,9 @@ class ChallengeFlowTests(APITestCase):
         dave = Account.objects.create(username="dave", hashed_password="pw")
         
         # Alice and Dave mutually follow each other
-        self.alice.following.append("dave")
-        self.alice.followers.append("dave")
-        self.alice.save()
-        dave.following = ["alice"]
-        dave.followers = ["alice"]
-        dave.save()
+        Follow.objects.create(follower=self.alice, followee=dave)
+        Follow.objects.create(follower=dave, followee=self.alice)
+        teams.link(self.alice.id, dave.id)
         
         # Now: Alice <-> Bob, Alice <-> Dave, but Bob and Dave don't follow each other
         # With transitive logic, Alice's team should include both Bob and Dave
@@ -282,10 +561,7 @@ class ChallengeFlowTests(APITestCase):
         self._as_user(self.bob)
         self.client.post(self.base_urls["join"], {})
 
-        # Determine matching priority and window
         priority = challenge.priority
-        start_dt = challenge.start_date
-        end_dt = challenge.deadline
 
         # Create completed tasks within window for Alice and Bob to reach target
         # Split evenly; if odd, Alice will do the remainder
@@ -293,24 +569,13 @@ class ChallengeFlowTests(APITestCase):
         bob_count = total_needed // 2
         alice_count = total_needed - bob_count
 
-        # Helper to create N completed tasks
-        def make_completed_tasks(user, n):
-            for i in range(n):
-                t = Task.objects.create(
-                    user=user,
-                    name=f"task-{user.username}-{i}",
-                    category="Challenge",
-                    priority=priority,
-                    status="completed",
-                    deadline=None,
-                    completed_at=start_dt + (end_dt - start_dt) / (total_needed + 1)  # inside window
-                )
-
-        make_completed_tasks(self.alice, alice_count)
-        make_completed_tasks(self.bob, bob_count)
-
-        # Act: Alice requests team progress; should be complete and award 20 coins exactly once
+        make_completed_tasks = self._complete_tasks
+        make_completed_tasks(self.alice, alice_count, priority)
+        make_completed_tasks(self.bob, bob_count, priority)
+
+        # Act: Alice requests team progress; complete, but GET pays nothing
         self._as_user(self.alice)
+        self.alice.refresh_from_db()
         coins_before = self.alice.coins
         resp = self.client.get(self.base_urls["team_progress"])
         self.assertEqual(resp.status_code, 200)
@@ -318,16 +583,35 @@ class ChallengeFlowTests(APITestCase):
         self.assertTrue(data["challenge_complete"])
         self.assertEqual(data["total"], total_needed)
         self.assertGreaterEqual(data["completed"], total_needed)
-        self.assertEqual(data["reward_earned"], 20)
+        self.assertEqual(data["reward_earned"], 0)
+        self.alice.refresh_from_db()
+        self.assertEqual(self.alice.coins, coins_before)
 
-        # Reload Alice to check coin change
+        # Settlement pays both team members exactly once and notifies them
+        self.assertEqual(settle_weekly_challenges(), 2)
+        self.assertEqual(settle_weekly_challenges(), 0)
         self.alice.refresh_from_db()
         self.assertEqual(self.alice.coins, coins_before + 20)
+        self.assertEqual(Notification.objects.filter(user__in=[self.alice, self.bob], message__contains="weekly challenge").count(), 2)
 
-        # Second call should not award again
         resp2 = self.client.get(self.base_urls["team_progress"])
         self.assertEqual(resp2.status_code, 200)
-        self.assertEqual(resp2.json()["reward_earned"], 0)
+        self.assertEqual(resp2.json()["reward_earned"], 20)
+        self.assertTrue(resp2.json()["reward_claimed"])
+
+    def test_settlement_skips_teams_below_target(self):
+        """Charlie alone is far from the target: nothing is paid"""
+        self._as_user(self.charlie)
+        challenge = self._get_weekly_challenge()
+        self.client.post(self.base_urls["join"], {})
+        self._complete_tasks(self.charlie, 1, challenge.priority)
+        self.charlie.refresh_from_db()
+        coins = self.charlie.coins
+
+        self.assertEqual(settle_weekly_challenges(), 0)
+        self.charlie.refresh_from_db()
+        self.assertEqual(self.charlie.coins, coins)
+        self.assertFalse(ChallengeParticipation.objects.get(user=self.charlie).reward_claimed)
 
     def test_non_friend_progress_is_separate(self):
         # Charlie joins and completes tasks alone
@@ -337,15 +621,7 @@ class ChallengeFlowTests(APITestCase):
 
         # Charlie completes some tasks (but Alice will not see them)
         n = min(5, challenge.task_count)
-        for i in range(n):
-            Task.objects.create(
-                user=self.charlie,
-                name=f"charlie-{i}",
-                category="Challenge",
-                priority=challenge.priority,
-                status="completed",
-                completed_at=challenge.start_date + (challenge.deadline - challenge.start_date) / (challenge.task_count + 2)
-            )
+        self._complete_tasks(self.charlie, n, challenge.priority)
 
         # Alice joins but has no team members yet; progress should not include Charlie's tasks
         self._as_user(self.alice)
@@ -356,6 +632,123 @@ class ChallengeFlowTests(APITestCase):
         # completed should be 0 or less than Charlie's count because Alice's team excludes Charlie
         self.assertEqual(data["completed"], 0)
 
+    def test_progress_counters_follow_task_writes(self):
+        """complete / mark_incomplete / delete keep completed_count in step; reconcile repairs drift"""
+        self._as_user(self.alice)
+        challenge = self._get_weekly_challenge()
+        other = next(p for p in ("Low", "Medium", "High") if p != challenge.priority)
+        # completed before joining: counted at join
+        self._complete_tasks(self.alice, 2, challenge.priority)
+        self.client.post(self.base_urls["join"], {})
+        participation = ChallengeParticipation.objects.get(user=self.alice, challenge=challenge)
+        self.assertEqual(participation.completed_count, 2)
+
+        self._complete_tasks(self.alice, 1, other)
+        task = Task.objects.create(user=self.alice, name="counted", priority=challenge.priority.lower())
+        self.client.post(f"/api/tasks/{task.id}/complete/")
+        participation.refresh_from_db()
+        self.assertEqual(participation.completed_count, 3)
+
+        self.client.post(f"/api/tasks/{task.id}/mark_incomplete/")
+        participation.refresh_from_db()
+        self.assertEqual(participation.completed_count, 2)
+
+        done = Task.objects.filter(user=self.alice, status="completed", priority=challenge.priority).first()
+        self.client.delete(f"/api/tasks/{done.id}/")
+        participation.refresh_from_db()
+        self.assertEqual(participation.completed_count, 1)
+
+        with self.assertNumQueries(4):  # account, participation, team, team counters (challenge is cached)
+            self.assertEqual(self.client.get(self.base_urls["team_progress"]).json()["completed"], 1)
+
+        ChallengeParticipation.objects.filter(id=participation.id).update(completed_count=7)
+        self.assertEqual(reconcile_challenge_progress(), 1)
+        participation.refresh_from_db()
+        self.assertEqual(participation.completed_count, 1)
+
+    def test_community_summary(self):
+        challenge = self._get_weekly_challenge()
+        self._as_user(self.charlie)
+        self.client.post(self.base_urls["join"])
+        Event.objects.create(
+            name="Spring Sprint",
+            start=timezone.now() - timedelta(days=1),
+            end=timezone.now() + timedelta(days=1),
+            is_active=True,
+        )
+        self._as_user(self.bob)
+        self.client.post(self.base_urls["join"])
+        self._complete_tasks(self.bob, 2, challenge.priority.lower())
+        Follow.objects.create(follower=self.charlie, followee=self.alice)
+
+        self._as_user(self.alice)
+        self.client.post(self.base_urls["join"])
+        # account, connections, team participations, event, event top 3, own event score (challenge is cached)
+        with self.assertNumQueries(6):
+            response = self.client.get("/api/community/summary/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+
+        self.assertEqual(data["following"], ["bob"])
+        self.assertEqual(sorted(data["followers"]), ["bob", "charlie"])
+        self.assertEqual(data["challenge"]["id"], challenge.id)
+        self.assertTrue(data["has_joined"])
+        self.assertEqual(data["team_members"], [{"username": "bob"}])
+        self.assertEqual(data["team_progress"]["completed"], 2)
+        self.assertEqual(data["team_progress"]["total"], challenge.task_count)
+        self.assertEqual(data["event"]["name"], "Spring Sprint")
+        self.assertEqual(data["leaderboard"]["leaderboard"][0]["username"], "bob")
+        self.assertIsNone(data["leaderboard"]["your_rank"])
+
+        # the summary agrees with the endpoints it replaces
+        self.assertEqual(self.client.get(self.base_urls["team_progress"]).json(), data["team_progress"])
+        self.assertEqual(self.client.get(self.base_urls["team_members"]).json()["team_members"], data["team_members"])
+
+    def test_community_summary_before_joining(self):
+        self._get_weekly_challenge()
+        self._as_user(self.alice)
+        response = self.client.get("/api/community/summary/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertFalse(data["has_joined"])
+        self.assertEqual(data["team_members"], [])
+        self.assertEqual(data["team_progress"]["completed"], 0)
+        self.assertIsNone(data["event"])
+        self.assertIsNone(data["leaderboard"])
+
+        self.client.logout()
+        self.assertEqual(self.client.get("/api/community/summary/").status_code, status.HTTP_401_UNAUTHORIZED)
+
+class WeeklyChallengeGenerationTests(TestCase):
+    def setUp(self):
+        WeeklyChallenge.clear_cache()
+
+    def test_parameters_are_derived_from_the_week(self):
+        start, deadline = WeeklyChallenge.week_bounds(timezone.now())
+        self.assertEqual(start.weekday(), 6)  # Sunday
+        self.assertEqual((deadline - start).days, 6)
+        self.assertEqual(WeeklyChallenge.parameters(start), WeeklyChallenge.parameters(start + timedelta(hours=5)))
+        params = WeeklyChallenge.parameters(start)
+        self.assertTrue(15 <= params["task_count"] <= 30)
+        self.assertIn(params["priority"], ("Low", "Medium", "High"))
+
+    def test_job_pregenerates_once(self):
+        self.assertEqual(generate_weekly_challenges(weeks_ahead=1), 2)
+        self.assertEqual(generate_weekly_challenges(weeks_ahead=1), 0)
+        start, _ = WeeklyChallenge.week_bounds(timezone.now())
+        self.assertEqual(WeeklyChallenge.for_week(timezone.now()).start_date, start)
+        self.assertEqual(WeeklyChallenge.objects.count(), 2)
+
+    def test_current_is_cached_until_deadline(self):
+        challenge = WeeklyChallenge.current()
+        with self.assertNumQueries(0):
+            self.assertEqual(WeeklyChallenge.current().id, challenge.id)
+        # edits drop the cached copy
+        challenge.description = "edited"
+        challenge.save()
+        self.assertEqual(WeeklyChallenge.current().description, "edited")
+
+
 class EventTests(APITestCase):
     def setUp(self):
         # Users
@@ -379,6 +772,12 @@ class EventTests(APITestCase):
         # URL
         self.url = "/api/events/leaderboard/"
 
+    def _completed(self, user, name, completed_at=None):
+        # a completed task, counted towards the event as the task views do
+        task = Task.objects.create(user=user, name=name, status="completed", completed_at=completed_at or timezone.now())
+        EventScore.record_task(task)
+        return task
+
     def test_leaderboard_empty(self):
         """Leaderboard empty if no tasks completed"""
         response = self.client.get(self.url)
@@ -390,9 +789,9 @@ class EventTests(APITestCase):
     def test_leaderboard_with_tasks(self):
         """Leaderboard shows tasks completed by multiple users"""
         # Tasks
-        Task.objects.create(user=self.user1, name="Task1", status="completed", completed_at=timezone.now())
-        Task.objects.create(user=self.user2, name="Task1", status="completed", completed_at=timezone.now())
-        Task.objects.create(user=self.user2, name="Task2", status="completed", completed_at=timezone.now())
+        self._completed(self.user1, "Task1")
+        self._completed(self.user2, "Task1")
+        self._completed(self.user2, "Task2")
 
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 200)
@@ -404,16 +803,35 @@ class EventTests(APITestCase):
         self.assertEqual(leaderboard[1]["username"], "user1")  # 1 task
         self.assertEqual(data["your_rank"], 2)  # user1 rank
 
+    def test_async_leaderboard_matches_sync(self):
+        """The ASGI variant answers what EventLeaderboardView answers"""
+        self._completed(self.user1, "Task1")
+        self._completed(self.user2, "Task1")
+        self._completed(self.user2, "Task2")
+
+        expected = self.client.get(self.url, {"around": 1}).json()
+        response = _async_get(self.client, async_event_leaderboard, self.url, {"around": 1})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected)
+
+        response = _async_get(self.client, async_event_leaderboard, self.url, {"event": "x"})
+        self.assertEqual(response.status_code, 400)
+
     def test_event_end_winner(self):
-        """Event ends automatically, awards winner coins and notification"""
+        """The scheduled job ends the event, awards winner coins and notification"""
         # End event in the past
         self.event.end = timezone.now() - timedelta(hours=1)
         self.event.save()
 
         # Tasks
-        Task.objects.create(user=self.user1, name="Task1", status="completed", completed_at=self.event.start + timedelta(hours=1))
-        Task.objects.create(user=self.user2, name="Task1", status="completed", completed_at=self.event.start + timedelta(hours=2))
-        Task.objects.create(user=self.user2, name="Task2", status="completed", completed_at=self.event.start + timedelta(hours=3))
+        self._completed(self.user1, "Task1", self.event.start + timedelta(hours=1))
+        self._completed(self.user2, "Task1", self.event.start + timedelta(hours=2))
+        self._completed(self.user2, "Task2", self.event.start + timedelta(hours=3))
+
+        # reading the leaderboard no longer ends the event
+        self.assertEqual(self.client.get(self.url).json(), {"detail": "Event has ended", "winner": None})
+        self.assertEqual(update_events(), (0, 1))
+        self.assertEqual(update_events(), (0, 0))
 
         response = self.client.get(self.url)
         data = response.json()
@@ -431,9 +849,14 @@ class EventTests(APITestCase):
         self.assertIsNotNone(notif)
         self.assertIn("won the event", notif.message)
 
+        # Runner-up is told their place; the reward is paid once
+        self.assertIn("finished #2", Notification.objects.get(user=self.user1).message)
+        self.assertEqual(Notification.objects.filter(user=self.user2).count(), 1)
+
         # Event inactive
         self.event.refresh_from_db()
         self.assertFalse(self.event.is_active)
+        self.assertIsNotNone(self.event.ended_at)
 
     def test_no_active_event(self):
         """Response when no active event exists"""
@@ -442,4 +865,484 @@ class EventTests(APITestCase):
         response = self.client.get(self.url)
         self.assertEqual(response.status_code, 404)
         self.assertIn("detail", response.json())
-        self.assertEqual(response.json()["detail"], "No active event")
\ No newline at end of file
+        self.assertEqual(response.json()["detail"], "No active event")
+
+    def test_scheduled_activation_counts_earlier_completions(self):
+        """A pending event is activated once, with completions since its start already counted"""
+        pending = Event.objects.create(
+            name="Pending", start=timezone.now() - timedelta(hours=2), end=timezone.now() + timedelta(days=1)
+        )
+        Task.objects.create(user=self.user2, name="early", status="completed", completed_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(self.client.get(self.url, {"event": pending.id}).status_code, 404)
+
+        self.assertEqual(update_events(), (1, 0))
+        self.assertEqual(update_events(), (0, 0))
+
+        # both events run, each with its own leaderboard
+        self.assertEqual(self.client.get("/api/events/current/").json()["id"], pending.id)
+        self.assertEqual(len(self.client.get("/api/events/active/").json()), 2)
+        self.assertEqual(self.client.get(self.url, {"event": pending.id}).json()["leaderboard"][0]["username"], "user2")
+        self.assertEqual(self.client.get(self.url, {"event": self.event.id}).json()["leaderboard"], [])
+
+    def test_expired_event_is_not_current(self):
+        self.event.end = timezone.now() - timedelta(minutes=1)
+        self.event.save()
+        self.assertIsNone(self.client.get("/api/events/current/").data)
+
+    def test_missed_event_is_still_paid(self):
+        """An event whose whole window passed while the scheduler was down is activated and ended"""
+        self.event.is_active = False
+        self.event.start = timezone.now() - timedelta(days=3)
+        self.event.end = timezone.now() - timedelta(days=2)
+        self.event.save()
+        Task.objects.create(user=self.user1, name="done", status="completed", completed_at=self.event.start + timedelta(hours=1))
+
+        self.assertEqual(update_events(), (1, 1))
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.winner, self.user1)
+        self.user1.refresh_from_db()
+        self.assertEqual(self.user1.coins, self.event.reward_coins)
+
+    def test_scores_follow_task_writes(self):
+        """Completing, un-completing, bulk-completing and deleting tasks move the user's EventScore"""
+        Tamagotchi.objects.create(user=self.user1)
+        first = Task.objects.create(user=self.user1, name="first")
+        second = Task.objects.create(user=self.user1, name="second")
+        score = lambda: EventScore.objects.filter(event=self.event, user=self.user1).values_list("completed_count", flat=True).first()
+
+        self.client.post(f"/api/tasks/{first.id}/complete/")
+        self.assertEqual(score(), 1)
+        self.client.post("/api/tasks/bulk/", {"operations": [{"op": "complete", "id": second.id}]}, format="json")
+        self.assertEqual(score(), 2)
+        self.client.post(f"/api/tasks/{first.id}/mark_incomplete/")
+        self.assertEqual(score(), 1)
+        self.client.delete(f"/api/tasks/{second.id}/")
+        self.assertEqual(score(), 0)
+
+        # inactive events are not scored
+        self.event.is_active = False
+        self.event.save()
+        self.client.post(f"/api/tasks/{first.id}/complete/")
+        self.assertEqual(score(), 0)
+
+    def test_last_completion_follows_removals(self):
+        """Un-completing or deleting the latest completion moves last_completed_at back to the one before"""
+        Tamagotchi.objects.create(user=self.user1)
+        first = Task.objects.create(user=self.user1, name="first")
+        second = Task.objects.create(user=self.user1, name="second")
+        last = lambda: EventScore.objects.filter(event=self.event, user=self.user1).values_list("last_completed_at", flat=True).first()
+
+        self.client.post(f"/api/tasks/{first.id}/complete/")
+        self.client.post(f"/api/tasks/{second.id}/complete/")
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(last(), second.completed_at)
+
+        self.client.post(f"/api/tasks/{second.id}/mark_incomplete/")
+        self.assertEqual(last(), first.completed_at)
+        self.client.post(f"/api/tasks/{second.id}/complete/")
+        self.client.delete(f"/api/tasks/{second.id}/")
+        self.assertEqual(last(), first.completed_at)
+        self.client.patch(f"/api/tasks/{first.id}/", {"status": "in_progress"}, format="json")
+        self.assertIsNone(last())
+
+    def test_rank_and_around_me(self):
+        """The caller's rank is counted in the database; around_me lists the neighbouring ranks"""
+        users = [self.user2] + [Account.objects.create(username=f"runner{i}", hashed_password="pw") for i in range(5)]
+        # runner4: 7, runner3: 6, ..., user2: 2 tasks; user1: 4 tasks (tied with runner1, who got there first)
+        for count, user in enumerate(users, start=2):
+            for i in range(count):
+                self._completed(user, f"t{i}")
+        for i in range(4):
+            self._completed(self.user1, f"t{i}")
+
+        with self.assertNumQueries(5):  # event, top 3, own count, users ahead, neighbours
+            data = self.client.get(self.url, {"around": 1}).json()
+        self.assertEqual([e["username"] for e in data["leaderboard"]], ["runner4", "runner3", "runner2"])
+        self.assertEqual(data["your_rank"], 5)
+        self.assertEqual(data["your_completed_tasks"], 4)
+        self.assertEqual(
+            [(e["rank"], e["username"], e["completed_count"]) for e in data["around_me"]],
+            [(4, "runner1", 4), (5, "user1", 4), (6, "runner0", 3)],
+        )
+        self.assertEqual(len(self.client.get(self.url).json()["around_me"]), 5)
+
+class OverdueSweepTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="sweeper", hashed_password="pw")
+        self.tamagotchi = Tamagotchi.objects.create(user=self.user, health=5.0)
+        self.yesterday = timezone.localdate() - timedelta(days=1)
+
+    def _task(self, **kwargs):
+        defaults = {"user": self.user, "name": "Task", "priority": "Low", "status": "in_progress"}
+        defaults.update(kwargs)
+        return Task.objects.create(**defaults)
+
+    def test_sweep_marks_overdue_and_removes_hearts(self):
+        """Every past-deadline open task becomes overdue and costs one heart"""
+        late1 = self._task(deadline=self.yesterday)
+        late2 = self._task(deadline=self.yesterday - timedelta(days=3))
+        on_time = self._task(deadline=timezone.localdate())
+        done = self._task(deadline=self.yesterday, status="completed", completed_at=timezone.now())
+
+        self.assertEqual(sweep_overdue_tasks(), 2)
+
+        for task, expected in ((late1, "overdue"), (late2, "overdue"), (on_time, "in_progress"), (done, "completed")):
+            task.refresh_from_db()
+            self.assertEqual(task.status, expected)
+        self.tamagotchi.refresh_from_db()
+        self.assertEqual(self.tamagotchi.health, 3.0)
+
+    def test_sweep_is_idempotent(self):
+        """Running the sweeper again does not penalise the same task twice"""
+        self._task(deadline=self.yesterday)
+        sweep_overdue_tasks()
+        self.assertEqual(sweep_overdue_tasks(), 0)
+        self.tamagotchi.refresh_from_db()
+        self.assertEqual(self.tamagotchi.health, 4.0)
+
+    def test_sweep_batches_and_floors_health(self):
+        """Health never drops below 0, even across several batches"""
+        for _ in range(7):
+            self._task(deadline=self.yesterday)
+        out = StringIO()
+        call_command("sweep_overdue_tasks", "--batch-size", "3", stdout=out)
+        self.assertIn("Marked 7 task(s)", out.getvalue())
+        self.assertEqual(Task.objects.filter(status="overdue").count(), 7)
+        self.tamagotchi.refresh_from_db()
+        self.assertEqual(self.tamagotchi.health, 0.0)
+
+
+class TaskReminderTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="forgetful", hashed_password="pw")
+        self.today = timezone.localdate()
+
+    def _task(self, **kwargs):
+        defaults = {"user": self.user, "name": "Task", "priority": "Low", "status": "in_progress"}
+        defaults.update(kwargs)
+        return Task.objects.create(**defaults)
+
+    def test_due_soon_then_overdue_once_each(self):
+        task = self._task(name="Essay", deadline=self.today + timedelta(days=1))
+        self._task(name="Later", deadline=self.today + timedelta(days=5))
+        self._task(name="Quiet", deadline=self.today, notify=False)
+        self._task(name="Done", deadline=self.today, status="completed")
+
+        self.assertEqual(send_task_reminders(today=self.today), 1)
+        self.assertEqual(send_task_reminders(today=self.today), 0)
+        self.assertEqual(
+            list(Notification.objects.values_list("message", flat=True)),
+            ["'Essay' is due tomorrow!"],
+        )
+
+        sweep_overdue_tasks(today=self.today + timedelta(days=2))
+        self.assertEqual(send_task_reminders(today=self.today + timedelta(days=2)), 1)
+        self.assertEqual(send_task_reminders(today=self.today + timedelta(days=2)), 0)
+        self.assertEqual(Notification.objects.latest("id").message, "'Essay' is overdue!")
+        task.refresh_from_db()
+        self.assertEqual(task.reminder_stage, 2)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.unread_notifications, 2)
+
+    def test_one_notification_per_user_and_stage(self):
+        for i in range(5):
+            self._task(name=f"t{i}", deadline=self.today)
+        other = Account.objects.create(username="other", hashed_password="pw")
+        self._task(user=other, name="theirs", deadline=self.today)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(send_task_reminders(today=self.today, batch_size=10), 6)
+        self.assertEqual(
+            Notification.objects.get(user=self.user).message,
+            "5 tasks are due soon: 't0', 't1', 't2', 2 more",
+        )
+        self.assertEqual(Notification.objects.get(user=other).message, "'theirs' is due today!")
+        self.assertEqual(Notification.objects.filter(kind=Notification.REMINDER).count(), 2)
+
+    def test_new_deadline_is_reminded_again(self):
+        task = self._task(name="Moved", deadline=self.today)
+        send_task_reminders(today=self.today)
+
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.client.patch(f"/api/tasks/{task.id}/", {"deadline": str(self.today + timedelta(days=1))}, format="json")
+        self.assertEqual(send_task_reminders(today=self.today), 1)
+        self.assertEqual(Notification.objects.latest("id").message, "'Moved' is due tomorrow!")
+
+
+class TaskIndexPlanTests(TestCase):
+    """
+    The hot Task query shapes should be answered from the composite / partial indexes.
+    Each user gets enough rows, mostly outside the queried window / statuses, that the indexes
+    are selective. On PostgreSQL the table is analyzed, sequential scans are disabled and the
+    single-column user_id index is dropped (inside the test's transaction), so the plans fall
+    back to a seq scan, and the assertions fail, if an index under test is removed.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [Account.objects.create(username=f"plan{i}", hashed_password="pw") for i in range(10)]
+        now = timezone.now()
+        today = timezone.localdate()
+        tasks = []
+        for user in cls.users:
+            for i in range(400):
+                tasks.append(Task(user=user, name=f"done-{i}", priority="Low", status="completed",
+                                  completed_at=now - timedelta(days=i)))
+            for i in range(200):
+                tasks.append(Task(user=user, name=f"missed-{i}", priority="Low", status="overdue",
+                                  deadline=today - timedelta(days=i + 1)))
+            for i in range(40):
+                tasks.append(Task(user=user, name=f"open-{i}", priority="Low", status="in_progress",
+                                  deadline=today + timedelta(days=i * 10)))
+        Task.objects.bulk_create(tasks, batch_size=1000)
+        if connection.vendor == "postgresql":
+            # fresh statistics, so the planner costs the seeded rows rather than an empty table
+            with connection.cursor() as cursor:
+                cursor.execute(f"ANALYZE {Task._meta.db_table}")
+
+    def assertUsesIndex(self, queryset, index_name):
+        with connection.cursor() as cursor:
+            if connection.vendor == "postgresql":
+                cursor.execute("SET LOCAL enable_seqscan = off")
+                # the FK index on user_id alone would otherwise serve every user-scoped query
+                constraints = connection.introspection.get_constraints(cursor, Task._meta.db_table)
+                for name, info in constraints.items():
+                    if info["index"] and info["columns"] == ["user_id"] and not info["primary_key"]:
+                        cursor.execute(f'DROP INDEX "{name}"')
+            plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_user_completed_window_uses_partial_index(self):
+        now = timezone.now()
+        qs = Task.objects.filter(user=self.users[0], status="completed",
+                                 completed_at__gte=now - timedelta(days=7), completed_at__lte=now)
+        self.assertUsesIndex(qs, "task_user_completed_idx")
+
+    def test_event_window_uses_partial_index(self):
+        now = timezone.now()
+        qs = (Task.objects.filter(status="completed", completed_at__range=(now - timedelta(days=2), now))
+              .values("user").annotate(count=models.Count("id")))
+        self.assertUsesIndex(qs, "task_completed_idx")
+
+    def test_user_status_deadline_uses_composite_index(self):
+        today = timezone.localdate()
+        qs = Task.objects.filter(user=self.users[0], status__in=["in_progress", "pending"],
+                                 deadline__gte=today, deadline__lte=today + timedelta(days=7))
+        self.assertUsesIndex(qs, "task_user_status_deadline_idx")
+
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.db")
+class AnalyticsTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="analyst", hashed_password="pw")
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.url = "/api/tasks/analytics/"
+
+    def test_trends_are_aggregated(self):
+        """Trends count completions per category / day and include missed tasks in the rate"""
+        now = timezone.now()
+        for i in range(3):
+            Task.objects.create(user=self.user, name=f"study-{i}", category="Study", priority="Low",
+                                status="completed", completed_at=now - timedelta(days=1))
+        Task.objects.create(user=self.user, name="gym", category="Health", priority="Low",
+                            status="completed", completed_at=now - timedelta(days=2))
+        Task.objects.create(user=self.user, name="old", category="Health", priority="Low",
+                            status="completed", completed_at=now - timedelta(days=20))
+        Task.objects.create(user=self.user, name="missed", category="Health", priority="Low",
+                            status="overdue", deadline=timezone.localdate() - timedelta(days=1))
+        call_command("rebuild_task_stats", stdout=StringIO())
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data["trends"]["totalCompleted"], 4)
+        self.assertEqual(data["trends"]["mostProductiveCategory"], "Study")
+        self.assertEqual(data["trends"]["mostCompletedDay"], (now - timedelta(days=1)).strftime('%B %d, %Y'))
+        self.assertEqual(data["trends"]["completionRate"], 80.0)
+        self.assertEqual(len(data["completed"]), 4)
+        self.assertEqual(len(data["missed"]), 1)
+
+    def test_query_count_is_constant_and_lists_are_capped(self):
+        """The number of queries does not grow with the number of tasks, and lists honour ?limit="""
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(user=self.user, name=f"t-{i}", category="Study", priority="Low",
+                 status="completed", completed_at=now - timedelta(hours=i))
+            for i in range(30)
+        ])
+        rebuild_daily_task_stats()
+        # session + account + 2 trend queries + 3 lists
+        with self.assertNumQueries(7):
+            response = self.client.get(self.url, {"limit": 10})
+        self.assertEqual(len(response.json()["completed"]), 10)
+        self.assertEqual(response.json()["trends"]["totalCompleted"], 30)
+
+    def test_boundary_day_counted_in_list_and_trends_alike(self):
+        """A completion early on the window's first day is in both the totals and the list"""
+        now = timezone.now().replace(hour=18)
+        first_day = timezone.localtime(now - timedelta(days=7)).replace(hour=0, minute=5)
+        Task.objects.create(user=self.user, name="early", status="completed", completed_at=first_day)
+        rebuild_daily_task_stats()
+
+        data = TaskAnalytics(self.user.id, now=now).data()
+        self.assertEqual(data["trends"]["totalCompleted"], 1)
+        self.assertEqual([task["name"] for task in data["completed"]], ["early"])
+
+    def test_async_variant_matches_sync(self):
+        """The ASGI variant returns the same payload"""
+        now = timezone.now()
+        Task.objects.create(user=self.user, name="done", category="Study", status="completed", completed_at=now)
+        Task.objects.create(user=self.user, name="missed", status="overdue", deadline=timezone.localdate() - timedelta(days=1))
+        Task.objects.create(user=self.user, name="due", status="pending", deadline=timezone.localdate() + timedelta(days=2))
+        rebuild_daily_task_stats()
+
+        expected = self.client.get(self.url, {"period": "monthly"}).json()
+        response = _async_get(self.client, async_task_analytics, self.url, {"period": "monthly"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content), expected)
+
+        self.user.delete()
+        response = _async_get(self.client, async_task_analytics, self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+def _async_get(client, view, path, params=None):
+    """Call an async view directly with the test client's session (async views are only routed under ASGI)."""
+    request = AsyncRequestFactory().get(path, params or {})
+    request.session = client.session
+    return async_to_sync(view)(request)
+
+
+class AsyncQueriesTests(TransactionTestCase):
+    def test_gather_runs_calls_concurrently_on_their_own_connections(self):
+        user = Account.objects.create(username="probe", hashed_password="pw")
+        Task.objects.create(user=user, name="a")
+        # both calls must be waiting at the barrier at once, or it breaks
+        barrier = threading.Barrier(2, timeout=5)
+
+        def probe():
+            barrier.wait()
+            return threading.get_ident(), Task.objects.filter(user=user).count()
+
+        results = async_to_sync(gather)(probe, probe)
+        self.assertEqual([count for _, count in results], [1, 1])
+        self.assertNotIn(threading.get_ident(), {ident for ident, _ in results})
+
+    def test_gather_in_a_transaction_stays_on_its_connection(self):
+        """Uncommitted rows are only visible to the connection that wrote them"""
+        user = Account.objects.create(username="probe", hashed_password="pw")
+        with transaction.atomic():
+            Task.objects.create(user=user, name="a")
+            results = async_to_sync(gather)(
+                lambda: (threading.get_ident(), Task.objects.filter(user=user).count()),
+                lambda: (threading.get_ident(), Task.objects.count()),
+            )
+        self.assertEqual(results, [(threading.get_ident(), 1), (threading.get_ident(), 1)])
+
+
+class DailyTaskStatsTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="roller", hashed_password="pw")
+        Tamagotchi.objects.create(user=self.user)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+
+    def _stats(self):
+        return {
+            (row.date, row.category, row.priority): (row.completed, row.missed, row.created)
+            for row in DailyTaskStats.objects.filter(user=self.user)
+        }
+
+    def test_rollup_follows_task_lifecycle(self):
+        """Create, complete, un-complete, miss and delete keep the rollup equal to a full rebuild"""
+        today = timezone.localdate()
+        yesterday = today - timedelta(days=1)
+        ids = []
+        for name, priority in (("a", "Low"), ("b", "High"), ("c", "Low")):
+            resp = self.client.post("/api/tasks/", {"name": name, "category": "Study", "priority": priority,
+                                                    "deadline": str(yesterday)}, format="json")
+            ids.append(resp.json()["id"])
+
+        self.client.post(f"/api/tasks/{ids[0]}/complete/")
+        self.client.post(f"/api/tasks/{ids[1]}/complete/")
+        self.client.post(f"/api/tasks/{ids[1]}/mark_incomplete/")
+        sweep_overdue_tasks()   # b and c become overdue
+        self.client.post(f"/api/tasks/{ids[2]}/complete/")   # c: overdue -> completed
+        self.client.delete(f"/api/tasks/{ids[0]}/")
+
+        incremental = self._stats()
+        self.assertEqual(incremental[(today, "Study", "Low")], (1, 0, 1))
+        self.assertEqual(incremental[(yesterday, "Study", "High")], (0, 1, 0))
+
+        rebuild_daily_task_stats([self.user.id])
+        rebuilt = self._stats()
+        # rebuild drops empty buckets, the incremental path keeps them at zero
+        self.assertEqual({k: v for k, v in incremental.items() if any(v)}, rebuilt)
+
+
+class MigrationTests(TransactionTestCase):
+    """Data migrations, run on rows seeded in the schema they migrate from."""
+
+    def migrate(self, target):
+        """Move the tasks app to `target`, leaving the other apps at their latest migration."""
+        executor = MigrationExecutor(connection)
+        targets = [target] + [node for node in executor.loader.graph.leaf_nodes() if node[0] != 'tasks']
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_weeks_are_merged_before_the_unique_constraint(self):
+        apps = self.migrate(('tasks', '0020_challenge_completed_count'))
+        Account = apps.get_model('users', 'Account')
+        WeeklyChallenge = apps.get_model('tasks', 'WeeklyChallenge')
+        ChallengeParticipation = apps.get_model('tasks', 'ChallengeParticipation')
+        start = timezone.now()
+        first, second, third = (
+            WeeklyChallenge.objects.create(task_count=3, priority="Low", description=f"dup {i}",
+                                           start_date=start, deadline=start + timedelta(days=7))
+            for i in range(3)
+        )
+        a, b, c = (Account.objects.create(username=name, hashed_password="pw") for name in "abc")
+        # second has the most participants, so it is kept
+        ChallengeParticipation.objects.create(user=a, challenge=second)
+        ChallengeParticipation.objects.create(user=b, challenge=second)
+        ChallengeParticipation.objects.create(user=a, challenge=first, reward_claimed=True)
+        ChallengeParticipation.objects.create(user=c, challenge=third)
+
+        apps = self.migrate(('tasks', '0021_weekly_challenge_unique_start'))
+        WeeklyChallenge = apps.get_model('tasks', 'WeeklyChallenge')
+        ChallengeParticipation = apps.get_model('tasks', 'ChallengeParticipation')
+        self.assertEqual(list(WeeklyChallenge.objects.values_list('id', flat=True)), [second.id])
+        self.assertEqual(
+            set(ChallengeParticipation.objects.values_list('user_id', 'challenge_id', 'reward_claimed')),
+            {(a.id, second.id, True), (b.id, second.id, False), (c.id, second.id, False)},
+        )
+        with self.assertRaises(IntegrityError):
+            WeeklyChallenge.objects.create(task_count=3, priority="Low", description="again",
+                                           start_date=start, deadline=start + timedelta(days=7))
+
+    def test_daily_task_stats_are_backfilled(self):
+        apps = self.migrate(('tasks', '0016_task_indexes'))
+        Account = apps.get_model('users', 'Account')
+        Task = apps.get_model('tasks', 'Task')
+        user = Account.objects.create(username="history", hashed_password="pw")
+        now = timezone.now()
+        Task.objects.create(user=user, name="a", category="Study", priority="Low", status="completed", completed_at=now)
+        Task.objects.create(user=user, name="b", category="Study", priority="Low", status="completed", completed_at=now)
+        Task.objects.create(user=user, name="c", priority="High", status="overdue", deadline=timezone.localdate())
+
+        apps = self.migrate(('tasks', '0017_daily_task_stats'))
+        DailyTaskStats = apps.get_model('tasks', 'DailyTaskStats')
+        self.assertEqual(
+            set(DailyTaskStats.objects.values_list('category', 'priority', 'completed', 'missed')),
+            {("Study", "Low", 2, 0), ("", "High", 0, 1)},
+        )
@@ -1,21 +1,45 @@
 
 from rest_framework import viewsets, permissions
-from .models import Task, WeeklyChallenge, ChallengeParticipation, Event
+from .models import Task, TaskTombstone, DailyTaskStats, WeeklyChallenge, ChallengeParticipation, Event, EventScore, CHALLENGE_REWARD_COINS, REMINDER_NONE
+from .bulk import TaskBatch, MAX_OPERATIONS
+from .analytics import TaskAnalytics
+from .community import CommunitySummary
+from .pagination import TaskCursorPagination
 from .serializers import TaskSerializer, WeeklyChallengeSerializer, ChallengeParticipationSerializer, EventSerializer, LeaderboardEntrySerializer
-from users.models import Account, Notification
-from rest_framework.exceptions import PermissionDenied
+from users.models import Account, Follow, Notification
+from users import teams
+from users.versioning import bump_version, conditional_get
+from django.utils.decorators import method_decorator
+from django.http import JsonResponse
+from django.views.decorators.http import require_GET
+from asgiref.sync import sync_to_async
+from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework import status
-from tamagotchi.models import Tamagotchi
+from tamagotchi.models import Tamagotchi, MAX_HEALTH
 from django.utils import timezone
+from django.utils.dateparse import parse_date
+from copy import copy
 from datetime import timedelta, datetime
-from collections import Counter
-import random
-from django.db import models
+import asyncio
+from django.db import transaction
+from django.db.models import F, Q, Subquery, Value
+from django.db.models.functions import Greatest, Least
 
+# Users shown above and below the caller in the event leaderboard's around_me slice (override with ?around=)
+EVENT_AROUND_ME = 2
+EVENT_AROUND_ME_MAX = 10
 
+# How long the leaderboard keeps answering "Event has ended" (with the winner) after an event ends
+EVENT_RESULTS_WINDOW = timedelta(days=1)
+
+# How many times complete / mark_incomplete re-read a task that changed under them
+TASK_STATE_RETRIES = 3
+
+
+@method_decorator(conditional_get('tasks'), name='list')
 class TaskView(viewsets.ModelViewSet):
 
 
@@ -24,228 +48,281 @@ class TaskView(viewsets.ModelViewSet):
         user_id = self.request.session.get("user_id")
         if not user_id:
             raise PermissionDenied("Not authenticated.")
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = self.request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
 
-        period = request.query_params.get('period', 'weekly')
-        now = timezone.now()
-        if period == 'monthly':
-            start_date = now - timedelta(days=30)
-            future_date = now + timedelta(days=30)
-        else:
-            start_date = now - timedelta(days=7)
-            future_date = now + timedelta(days=7)
-
-        completed_tasks = Task.objects.filter(
-            user=account,
-            status='completed',
-            completed_at__gte=start_date,
-            completed_at__lte=now
-        )
-        missed_tasks = Task.objects.filter(
-            user=account,
-            status='overdue',
-            deadline__lte=now
-        )
-        upcoming_tasks = Task.objects.filter(
-            user=account,
-            status__in=['in_progress', 'pending'],
-            deadline__gte=now,
-            deadline__lte=future_date
-        )
+        return Response(TaskAnalytics.from_params(account.id, request.query_params).data())
 
-        categories = [t.category for t in completed_tasks]
-        most_productive_category = Counter(categories).most_common(1)
-        most_productive_category = most_productive_category[0][0] if most_productive_category else ''
-
-        days = [t.completed_at.date() for t in completed_tasks if t.completed_at]
-        most_completed_day = Counter(days).most_common(1)
-        most_completed_day = most_completed_day[0][0].strftime('%B %d, %Y') if most_completed_day else ''
-
-        total_completed = completed_tasks.count()
-        total_due = completed_tasks.count() + missed_tasks.count()
-        completion_rate = (total_completed / total_due * 100) if total_due > 0 else 0.0
-
-        def serialize_task(task, completed=False):
-            return {
-                'id': task.id,
-                'name': task.name,
-                'category': task.category,
-                'priority': task.priority,
-                'completedDate': task.completed_at.strftime('%Y-%m-%d') if completed and task.completed_at else None,
-                'dueDate': task.deadline.strftime('%Y-%m-%d') if task.deadline else None,
-            }
-        completed_list = [serialize_task(t, completed=True) for t in completed_tasks]
-        missed_list = [serialize_task(t) for t in missed_tasks]
-        upcoming_list = [serialize_task(t) for t in upcoming_tasks]
-
-        return Response({
-            'completed': completed_list,
-            'missed': missed_list,
-            'due': upcoming_list,
-            'trends': {
-                'mostProductiveCategory': most_productive_category,
-                'mostCompletedDay': most_completed_day,
-                'totalCompleted': total_completed,
-                'completionRate': round(completion_rate, 1)
-            }
-        })
     serializer_class = TaskSerializer
     queryset = Task.objects.all()
     permission_classes = [permissions.AllowAny]
+    pagination_class = TaskCursorPagination
 
     def get_queryset(self):
         user_id = self.request.session.get("user_id")
         if not user_id:
             raise PermissionDenied("Not authenticated.")
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = self.request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
         return Task.objects.filter(user=account)
 
-    def perform_create(self, serializer):
-        user_id = self.request.session.get("user_id")
+    def filter_queryset(self, queryset):
+        """
+        Optional list filters:
+        ?status=in_progress,overdue  ?category=Study  ?priority=High
+        ?deadline_after=YYYY-MM-DD  ?deadline_before=YYYY-MM-DD (both inclusive)
+        """
+        params = self.request.query_params
+        if params.get('status'):
+            queryset = queryset.filter(status__in=params['status'].split(','))
+        if params.get('category'):
+            queryset = queryset.filter(category=params['category'])
+        if params.get('priority'):
+            queryset = queryset.filter(priority=params['priority'])
+        for param, lookup in (('deadline_after', 'deadline__gte'), ('deadline_before', 'deadline__lte')):
+            if params.get(param):
+                try:
+                    value = parse_date(params[param])
+                except ValueError:
+                    value = None
+                if value is None:
+                    raise ValidationError({param: "Expected a date in YYYY-MM-DD format."})
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def paginate_queryset(self, queryset):
+        # Old clients can still fetch every task in one unpaginated list with ?paginate=false
+        if self.request.query_params.get('paginate', '').lower() == 'false':
+            return None
+        return super().paginate_queryset(queryset)
+
+    @action(detail=False, methods=['get'], url_path='changes')
+    @method_decorator(conditional_get('tasks'))
+    def changes(self, request):
+        """
+        Delta sync: GET /api/tasks/changes/?since=<token>
+        Returns the tasks written and the ids of tasks deleted after `since`, plus a new token.
+        Tokens are per-user version numbers, not timestamps, so replica clock skew cannot drop
+        a change. Without a token, or when the token predates compacted tombstones, the full
+        task list is returned with "reset": true.
+        """
+        user_id = request.session.get("user_id")
         if not user_id:
             raise PermissionDenied("Not authenticated.")
         try:
-            account = Account.objects.get(id=user_id)
+            # read the token before the tasks: anything written later is sent again next time
+            token, purged = Account.objects.filter(id=user_id).values_list('tasks_version', 'tasks_purged_version').get()
         except Account.DoesNotExist:
             raise PermissionDenied("Account does not exist.")
-        serializer.save(user=account)
 
-    @action(detail=True, methods=['post'])
-    def complete(self, request, pk=None):
+        try:
+            since = int(request.query_params.get('since') or 0)
+        except ValueError:
+            raise ValidationError({"since": "Expected a sync token."})
+
+        tasks = Task.objects.filter(user_id=user_id)
+        reset = since <= 0 or since < purged or since > token
+        if reset:
+            deleted = []
+        else:
+            tasks = tasks.filter(version__gt=since)
+            deleted = list(
+                TaskTombstone.objects.filter(user_id=user_id, version__gt=since).values_list('task_id', flat=True)
+            )
+
+        return Response({
+            "token": str(token),
+            "reset": reset,
+            "tasks": TaskSerializer(tasks.order_by('version', 'id'), many=True).data,
+            "deleted": deleted,
+        })
+
+    @action(detail=False, methods=['post'], url_path='bulk')
+    def bulk(self, request):
         """
-        Mark a task as completed and reward user with XP and coins based on priority.
+        Apply many task operations in one transaction.
+        POST {"operations": [
+            {"op": "create", "data": {...}},
+            {"op": "patch", "id": 1, "data": {...}},
+            {"op": "delete", "id": 2},
+            {"op": "complete", "id": 3},
+            {"op": "mark_incomplete", "id": 4}
+        ]}
+        Returns one result per operation (with its own status code) and the final coins / xp / level / health.
+        Operations that fail are reported and skipped; the others are applied.
         """
         user_id = request.session.get("user_id")
         if not user_id:
             raise PermissionDenied("Not authenticated.")
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
 
-        try:
-            task = Task.objects.get(pk=pk, user=account)
-        except Task.DoesNotExist:
-            return Response({"detail": "Task not found."}, status=404)
-
-        if task.status == "completed":
-            return Response({"detail": "Task already completed."}, status=400)
-
-        # Set task as completed
-        task.status = "completed"
-        task.completed_at = timezone.now()
-        task.save()
-
-        # Determine rewards
-        priority = task.priority.lower()
-        if priority == "low":
-            xp_gain, coin_gain = 3, 10
-        elif priority == "medium":
-            xp_gain, coin_gain = 5, 20
-        elif priority == "high":
-            xp_gain, coin_gain = 10, 30
-        else:
-            xp_gain, coin_gain = 0, 0
+        operations = request.data.get('operations') if isinstance(request.data, dict) else None
+        if not isinstance(operations, list) or not operations:
+            return Response({"detail": "operations must be a non-empty list."}, status=400)
+        if len(operations) > MAX_OPERATIONS:
+            return Response({"detail": f"At most {MAX_OPERATIONS} operations per request."}, status=400)
 
-        # Update coins
-        account.coins += coin_gain
-        account.save()
+        batch = TaskBatch(account)
+        batch.apply(operations)
+        return Response(batch.response_data())
 
-        # Update tamagotchi XP and level
-        try:
-            tamagotchi = Tamagotchi.objects.get(user=account)
-        except Tamagotchi.DoesNotExist:
-            return Response({"detail": "Tamagotchi not found."}, status=404)
-
-        tamagotchi.xp += xp_gain
-        leveled_up = False
-        while tamagotchi.xp >= 100:
-            tamagotchi.xp -= 100
-            tamagotchi.level += 1
-            leveled_up = True
-        # Increase health by 1 (max 5)
-        tamagotchi.increase_health(1.0)
-        tamagotchi.save()
+    def perform_create(self, serializer):
+        user_id = self.request.session.get("user_id")
+        if not user_id:
+            raise PermissionDenied("Not authenticated.")
+        account = self.request.account
+        if not account:
+            raise PermissionDenied("Account does not exist.")
+        task = serializer.save(user=account)
+        DailyTaskStats.record_task(task)
+        ChallengeParticipation.record_task(task)
+        EventScore.record_task(task)
+
+    def perform_update(self, serializer):
+        # Only edits that move the task between rollup buckets need to touch DailyTaskStats
+        rollup_fields = {'status', 'completed_at', 'deadline', 'category', 'priority'}
+        moves_bucket = bool(rollup_fields & set(serializer.validated_data))
+        # the task as it was; its contribution is taken back after the write (see EventScore.record_completions)
+        previous = copy(serializer.instance)
+        # a new deadline gets its own reminders
+        reminders = {}
+        if serializer.validated_data.get('deadline', serializer.instance.deadline) != serializer.instance.deadline:
+            reminders['reminder_stage'] = REMINDER_NONE
+        task = serializer.save(**reminders)
+        if moves_bucket:
+            DailyTaskStats.record_task(previous, sign=-1)
+            ChallengeParticipation.record_task(previous, sign=-1)
+            EventScore.record_task(previous, sign=-1)
+            DailyTaskStats.record_task(task)
+            ChallengeParticipation.record_task(task)
+            EventScore.record_task(task)
+
+    def perform_destroy(self, instance):
+        instance.delete()
+        DailyTaskStats.record_task(instance, sign=-1)
+        ChallengeParticipation.record_task(instance, sign=-1)
+        EventScore.record_task(instance, sign=-1)
 
-        return Response({
-            "xp": tamagotchi.xp,
-            "level": tamagotchi.level,
-            "coins": account.coins,
-            "health": tamagotchi.health,
-            "leveled_up": leveled_up,
-            "task_id": task.id,
-            "task_status": task.status
-        })
+    @action(detail=True, methods=['post'])
+    def complete(self, request, pk=None):
+        """
+        Mark a task as completed and reward user with XP and coins based on priority.
+        """
+        return self._set_completed(request, pk, completed=True)
 
     @action(detail=True, methods=['post'])
     def mark_incomplete(self, request, pk=None):
         """
-        Mark a task as incomplete, decrease coins and xp, and remove a heart if overdue.
+        Mark a task as incomplete and take back the coins and xp it earned.
+        """
+        return self._set_completed(request, pk, completed=False)
+
+    def _set_completed(self, request, pk, completed):
+        """
+        Flip a task to completed / in_progress and apply its rewards in one transaction:
+        one UPDATE each for the account, the task and the tamagotchi, all F() expressions.
+
+        The account row is locked first (same lock order as every other task write), and the
+        task only flips if it is still in the state we read. A double-click or replayed request
+        therefore waits for the first one, finds the task already flipped and gets a 400:
+        rewards are applied exactly once and never lost to a read-modify-write race.
         """
         user_id = request.session.get("user_id")
         if not user_id:
             raise PermissionDenied("Not authenticated.")
-        try:
-            account = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        account = request.account
+        if not account:
             raise PermissionDenied("Account does not exist.")
 
-        try:
-            task = Task.objects.get(pk=pk, user=account)
-        except Task.DoesNotExist:
-            return Response({"detail": "Task not found."}, status=404)
-
-        if task.status != "completed":
-            return Response({"detail": "Task is not completed."}, status=400)
-
-        # Set task as in_progress
-        task.status = "in_progress"
-        task.save()
-
-        # Determine penalty
-        priority = task.priority.lower()
-        if priority == "low":
-            xp_loss, coin_loss = 3, 10
-        elif priority == "medium":
-            xp_loss, coin_loss = 5, 20
-        elif priority == "high":
-            xp_loss, coin_loss = 10, 30
-        else:
-            xp_loss, coin_loss = 0, 0
-
-        # Update coins (don't go below 0)
-        account.coins = max(0, account.coins - coin_loss)
-        account.save()
-
-        # Update tamagotchi XP and level (don't go below 0 XP)
-        try:
-            tamagotchi = Tamagotchi.objects.get(user=account)
-        except Tamagotchi.DoesNotExist:
-            return Response({"detail": "Tamagotchi not found."}, status=404)
-
-        tamagotchi.xp = max(0, tamagotchi.xp - xp_loss)
-        # If task is overdue, decrease health by 1
-        remove_heart = False
-        if task.status == "overdue":
-            tamagotchi.decrease_health(1.0)
-            remove_heart = True
-        tamagotchi.save()
+        for _ in range(TASK_STATE_RETRIES):
+            task = Task.objects.filter(pk=pk, user=account).only(
+                'id', 'status', 'priority', 'category', 'deadline', 'completed_at'
+            ).first()
+            if task is None:
+                return Response({"detail": "Task not found."}, status=404)
+            if completed and task.status == "completed":
+                return Response({"detail": "Task already completed."}, status=400)
+            if not completed and task.status != "completed":
+                return Response({"detail": "Task is not completed."}, status=400)
+
+            xp_change, coin_change = task.rewards()
+            now = timezone.now()
+
+            with transaction.atomic():
+                # Lock the account and give it the next task version
+                if completed:
+                    coins = F('coins') + coin_change
+                else:
+                    coins = Greatest(F('coins') - coin_change, Value(0))
+                Account.objects.filter(id=account.id).update(coins=coins, tasks_version=F('tasks_version') + 1)
+
+                changes = {
+                    'status': "completed" if completed else "in_progress",
+                    'updated_at': now,
+                    'version': Subquery(Account.objects.filter(id=account.id).values('tasks_version')),
+                }
+                if completed:
+                    changes['completed_at'] = now
+                flipped = Task.objects.filter(
+                    pk=task.pk, status=task.status, priority=task.priority
+                ).update(**changes)
+                if not flipped:
+                    # Changed since we read it (concurrent request, sweeper, edit): undo and re-read
+                    transaction.set_rollback(True)
+                    continue
+
+                if completed:
+                    # closed-form level up; every expression sees the row's old xp
+                    pet_changes = {
+                        'xp': (F('xp') + xp_change) % 100,
+                        'level': F('level') + (F('xp') + xp_change) / 100,
+                        'health': Least(F('health') + 1.0, Value(MAX_HEALTH)),
+                    }
+                else:
+                    pet_changes = {'xp': Greatest(F('xp') - xp_change, Value(0))}
+                if not Tamagotchi.objects.filter(user=account).update(**pet_changes):
+                    transaction.set_rollback(True)
+                    return Response({"detail": "Tamagotchi not found."}, status=404)
+
+                if completed:
+                    # A missed task that gets completed no longer counts as missed
+                    if task.status == "overdue" and task.deadline:
+                        DailyTaskStats.record(account.id, task.deadline, task.category, task.priority, missed=-1)
+                    DailyTaskStats.record(account.id, timezone.localdate(now), task.category, task.priority, completed=1)
+                    ChallengeParticipation.record_completion(account.id, task.priority, now)
+                    EventScore.record_completion(account.id, now)
+                elif task.completed_at:
+                    DailyTaskStats.record(account.id, timezone.localdate(task.completed_at), task.category, task.priority, completed=-1)
+                    ChallengeParticipation.record_completion(account.id, task.priority, task.completed_at, sign=-1)
+                    EventScore.record_completion(account.id, task.completed_at, sign=-1)
+
+                # queryset.update() sends no post_save
+                bump_version(account.id, 'tasks', 'health', 'profile')
+
+                xp, level, health, coins = Tamagotchi.objects.filter(user=account).values_list(
+                    'xp', 'level', 'health', 'user__coins'
+                ).get()
+
+            response = {
+                "xp": xp,
+                "level": level,
+                "coins": coins,
+                "health": health,
+                "task_id": task.id,
+                "task_status": changes['status'],
+            }
+            if completed:
+                # xp stays below 100, so the pet levelled up exactly when the new xp wrapped around
+                response["leveled_up"] = xp < xp_change
+            else:
+                response["remove_heart"] = False
+            return Response(response)
 
-        return Response({
-            "xp": tamagotchi.xp,
-            "level": tamagotchi.level,
-            "coins": account.coins,
-            "health": tamagotchi.health,
-            "remove_heart": remove_heart,
-            "task_id": task.id,
-            "task_status": task.status
-        })
+        return Response({"detail": "Task is being updated, please retry."}, status=409)
 
 
 class WeeklyChallengeView(APIView):
@@ -259,48 +336,11 @@ class WeeklyChallengeView(APIView):
         GET the current weekly challenge. If one doesn't exist for this week, create it.
         Returns: Challenge details (task_count, priority, description, start_date, deadline)
         """
-        now = timezone.now()
-        
-        # Calculate the current week's Sunday 12:00 AM
-        last_sunday = now - timedelta(days=now.weekday() + 1 if now.weekday() != 6 else 0)
-        if now.weekday() == 6:  # Sunday
-            last_sunday = now
-        last_sunday = last_sunday.replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Calculate next Saturday 11:59 PM
-        next_saturday = last_sunday + timedelta(days=6, hours=23, minutes=59, seconds=59)
-        
-        # Try to get existing challenge for this week
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
-        
-        # If no challenge exists for current week, create one
-        if not challenge:
-            challenge = self._generate_weekly_challenge(last_sunday, next_saturday)
+        # Pre-generated by tasks.jobs.generate_weekly_challenges; created here only as a fallback
+        challenge = WeeklyChallenge.current()
         
         serializer = WeeklyChallengeSerializer(challenge)
         return Response(serializer.data, status=status.HTTP_200_OK)
-    
-    def _generate_weekly_challenge(self, start_date, deadline):
-        """
-        Helper method to generate a random weekly challenge.
-        Randomly selects task count (15-30) and priority (Low/Medium/High).
-        """
-        task_count = random.randint(15, 30)
-        priorities = ['Low', 'Medium', 'High']
-        priority = random.choice(priorities)
-        description = f"Complete {task_count} {priority} priority tasks"
-        
-        challenge = WeeklyChallenge.objects.create(
-            task_count=task_count,
-            priority=priority,
-            description=description,
-            start_date=start_date,
-            deadline=deadline
-        )
-        return challenge
 
 
 class JoinChallengeView(APIView):
@@ -318,25 +358,23 @@ class JoinChallengeView(APIView):
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get current week's challenge
-        now = timezone.now()
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
+        challenge = WeeklyChallenge.current()
         
         if not challenge:
             return Response({"error": "No active challenge found"}, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if user already joined this challenge
+        # Check if user already joined this challenge; tasks completed earlier this week count too
         participation, created = ChallengeParticipation.objects.get_or_create(
             user=user,
-            challenge=challenge
+            challenge=challenge,
+            defaults={
+                "completed_count": ChallengeParticipation.matching_tasks(challenge).filter(user=user).count(),
+            },
         )
         
         if not created:
@@ -366,17 +404,12 @@ class ChallengeStatusView(APIView):
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get current week's challenge
-        now = timezone.now()
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
+        challenge = WeeklyChallenge.current()
         
         if not challenge:
             return Response({"has_joined": False}, status=status.HTTP_200_OK)
@@ -405,17 +438,12 @@ class TeamMembersView(APIView):
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get current week's challenge
-        now = timezone.now()
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
+        challenge = WeeklyChallenge.current()
         
         if not challenge:
             return Response({"team_members": []}, status=status.HTTP_200_OK)
@@ -429,44 +457,13 @@ class TeamMembersView(APIView):
         if not user_joined:
             return Response({"team_members": []}, status=status.HTTP_200_OK)
         
-        # Get user's following and followers lists
-        following_usernames = set(user.following or [])
-        follower_usernames = set(user.followers or [])
-        
-        # Find mutual followers (users who follow each other with current user)
-        mutual_usernames = following_usernames & follower_usernames
-
-        # Build transitive team: start with current user + direct mutual followers
-        team_usernames = set([user.username]) | set(mutual_usernames)
-        
-        # Expand team to include mutual followers of team members (transitive)
-        expanded = True
-        while expanded:
-            expanded = False
-            current_team_size = len(team_usernames)
-            
-            # Get all team member accounts
-            team_accounts = Account.objects.filter(username__in=team_usernames)
-            
-            for member in team_accounts:
-                member_following = set(member.following or [])
-                member_followers = set(member.followers or [])
-                member_mutual = member_following & member_followers
-                
-                # Add mutual followers of this team member to the team
-                new_members = member_mutual - team_usernames
-                if new_members:
-                    team_usernames.update(new_members)
-                    expanded = True
-            
-            # Break if no new members were added
-            if len(team_usernames) == current_team_size:
-                break
+        # Team = everyone connected to the user through chains of mutual follows
+        team_ids = teams.team_member_ids(user)
 
         # Get all team members who have joined the challenge (excluding current user)
         team_participations = ChallengeParticipation.objects.filter(
             challenge=challenge,
-            user__username__in=team_usernames
+            user_id__in=team_ids
         ).select_related('user').exclude(user=user)
 
         team_members = [
@@ -486,23 +483,18 @@ class TeamProgressView(APIView):
     def get(self, request):
         """
         GET team progress for current weekly challenge.
-        Returns: completed (tasks done), total (target), and checks if reward should be given
+        Returns: completed (tasks done), total (target), and whether the user's reward has been paid
         """
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get current week's challenge
-        now = timezone.now()
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
+        challenge = WeeklyChallenge.current()
         
         if not challenge:
             return Response({
@@ -522,45 +514,14 @@ class TeamProgressView(APIView):
                 "total": challenge.task_count
             }, status=status.HTTP_200_OK)
         
-        # Get user's following and followers lists
-        following_usernames = set(user.following or [])
-        follower_usernames = set(user.followers or [])
-        
-        # Find mutual followers (users who follow each other with current user)
-        mutual_usernames = following_usernames & follower_usernames
-
-        # Build transitive team: start with current user + direct mutual followers
-        team_usernames = set([user.username]) | set(mutual_usernames)
-        
-        # Expand team to include mutual followers of team members (transitive)
-        expanded = True
-        while expanded:
-            expanded = False
-            current_team_size = len(team_usernames)
-            
-            # Get all team member accounts
-            team_accounts = Account.objects.filter(username__in=team_usernames)
-            
-            for member in team_accounts:
-                member_following = set(member.following or [])
-                member_followers = set(member.followers or [])
-                member_mutual = member_following & member_followers
-                
-                # Add mutual followers of this team member to the team
-                new_members = member_mutual - team_usernames
-                if new_members:
-                    team_usernames.update(new_members)
-                    expanded = True
-            
-            # Break if no new members were added
-            if len(team_usernames) == current_team_size:
-                break
-        
-        # Get all team members who have joined the challenge
+        # Team = everyone connected to the user through chains of mutual follows
+        team_ids = teams.team_member_ids(user)
+        
+        # Team members who joined, with their progress counters
         team_participations = list(ChallengeParticipation.objects.filter(
             challenge=challenge,
-            user__username__in=team_usernames
-        ).select_related('user'))
+            user_id__in=team_ids
+        ).values_list('user_id', 'completed_count'))
         
         if not team_participations:
             # No team members joined
@@ -571,52 +532,19 @@ class TeamProgressView(APIView):
                 "reward_earned": 0
             }, status=status.HTTP_200_OK)
         
-        # Build team from all team members who joined (including current user)
-        valid_team_members = [p.user for p in team_participations]
+        # Tasks completed by the team that match the challenge
+        completed_count = sum(count for _, count in team_participations)
         
-        # Get IDs of all valid team members
-        team_user_ids = [member.id for member in valid_team_members]
-        
-        # Count completed tasks matching challenge criteria
-        # Tasks must be completed during the challenge period and match the priority
-        completed_count = Task.objects.filter(
-            user_id__in=team_user_ids,
-            status='completed',
-            priority__iexact=challenge.priority,
-            completed_at__gte=challenge.start_date,
-            completed_at__lte=challenge.deadline
-        ).count()
-        
-        # Check if challenge is complete and reward hasn't been claimed
+        # Rewards are paid by the settlement job (tasks.jobs.settle_weekly_challenges)
         challenge_complete = completed_count >= challenge.task_count
-        reward_amount = 0
-        
-        if challenge_complete:
-            # Award 20 coins to ALL team members who haven't claimed yet
-            team_participations_to_reward = ChallengeParticipation.objects.filter(
-                challenge=challenge,
-                user_id__in=team_user_ids,
-                reward_claimed=False
-            ).select_related('user')
-            
-            for participation in team_participations_to_reward:
-                # Award coins to each team member
-                participation.user.coins += 20
-                participation.user.save()
-                
-                # Mark reward as claimed
-                participation.reward_claimed = True
-                participation.save()
-            
-            # Check if current user just got rewarded
-            if not user_participation.reward_claimed:
-                reward_amount = 20
+        reward_amount = CHALLENGE_REWARD_COINS if user_participation.reward_claimed else 0
         
         return Response({
             "completed": completed_count,
             "total": challenge.task_count,
             "challenge_complete": challenge_complete,
-            "reward_earned": reward_amount
+            "reward_earned": reward_amount,
+            "reward_claimed": user_participation.reward_claimed
         }, status=status.HTTP_200_OK)
 
 
@@ -633,17 +561,12 @@ class DebugTeamView(APIView):
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
         
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
         
         # Get current week's challenge
-        now = timezone.now()
-        challenge = WeeklyChallenge.objects.filter(
-            start_date__lte=now,
-            deadline__gte=now
-        ).first()
+        challenge = WeeklyChallenge.current()
         
         if not challenge:
             return Response({"error": "No active challenge"}, status=status.HTTP_404_NOT_FOUND)
@@ -655,34 +578,27 @@ class DebugTeamView(APIView):
         ).exists()
         
         # Get following/followers
-        following = user.following or []
-        followers = user.followers or []
-        mutual = list(set(following) & set(followers))
-        
+        following = list(Follow.objects.filter(follower=user).values_list('followee__username', flat=True))
+        followers = list(Follow.objects.filter(followee=user).values_list('follower__username', flat=True))
+        mutual_ids = Follow.mutual_ids([user.id])
+        mutual = list(Account.objects.filter(id__in=mutual_ids).values_list('username', flat=True))
+
         # Check each mutual follower's data
-        mutual_details = []
-        for username in mutual:
-            try:
-                other_user = Account.objects.get(username=username)
-                other_joined = ChallengeParticipation.objects.filter(
-                    user=other_user,
-                    challenge=challenge
-                ).exists()
-                
-                mutual_details.append({
-                    "username": username,
-                    "joined_challenge": other_joined,
-                    "their_following": other_user.following or [],
-                    "their_followers": other_user.followers or [],
-                    "they_follow_you": user.username in (other_user.following or []),
-                    "they_are_followed_by_you": user.username in (other_user.followers or [])
-                })
-            except Account.DoesNotExist:
-                mutual_details.append({
-                    "username": username,
-                    "error": "User not found"
-                })
-        
+        joined_ids = set(ChallengeParticipation.objects.filter(
+            challenge=challenge,
+            user_id__in=mutual_ids
+        ).values_list('user_id', flat=True))
+        mutual_details = [
+            {
+                "username": other_user.username,
+                "joined_challenge": other_user.id in joined_ids,
+                # mutual by definition
+                "they_follow_you": True,
+                "they_are_followed_by_you": True,
+            }
+            for other_user in Account.objects.filter(id__in=mutual_ids)
+        ]
+
         return Response({
             "current_user": user.username,
             "joined_challenge": user_joined,
@@ -692,74 +608,123 @@ class DebugTeamView(APIView):
             "mutual_details": mutual_details
         }, status=status.HTTP_200_OK)
 
+class CommunitySummaryView(APIView):
+    """
+    Everything the Community page needs on load, in one response:
+    connections, the weekly challenge with the user's status, team and team progress,
+    and the running event with its leaderboard (null when no event is running).
+    """
+
+    def get(self, request):
+        user_id = request.session.get("user_id")
+        if not user_id:
+            return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        user = request.account
+        if not user:
+            return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(CommunitySummary(user).data(), status=status.HTTP_200_OK)
+
+
 class CurrentEventView(APIView):
     """
-    Returns the currently active event, or null.
+    Returns the running event that started last, or null.
     """
     permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        event = Event.objects.filter(is_active=True).order_by('-start').first()
+        event = Event.running().first()
         if not event:
             return Response(None, status=status.HTTP_200_OK)
         serializer = EventSerializer(event)
         return Response(serializer.data, status=status.HTTP_200_OK)
 
-class EventLeaderboardView(APIView):
+class ActiveEventsView(APIView):
     """
-    Returns the leaderboard for the current active event.
-    Ends the event automatically if the end datetime has passed.
+    Returns every running event (several can overlap), latest start first.
     """
+    permission_classes = [permissions.AllowAny]
 
     def get(self, request):
-        now = timezone.now()
-        try:
-            event = Event.objects.get(start__lte=now, end__gte=now)
-        except Event.DoesNotExist:
-            return Response({"detail": "No active event"}, status=status.HTTP_404_NOT_FOUND)
+        serializer = EventSerializer(Event.running(), many=True)
+        return Response(serializer.data, status=status.HTTP_200_OK)
 
-        # Automatically end event if it has ended
-        if event.has_ended():
-            winner = event.end_event()
-            return Response({
-                "detail": "Event has ended",
-                "winner": winner.username if winner else None
-            })
-
-        # Get completed tasks counts for this event
-        task_counts = (
-            Task.objects.filter(
-                status="completed",
-                completed_at__range=(event.start, event.end)
-            )
-            .values('user__username', 'user')
-            .annotate(count=models.Count('id'))
-            .order_by('-count', 'user')
-        )
+class EventLeaderboardView(APIView):
+    """
+    Returns the leaderboard of a running event (?event=<id>, default the one that started last):
+    the top 3, the caller's rank and the users ranked around the caller (?around=, default 2
+    above and below). Events are started and ended by tasks.jobs.update_events; an event that
+    has just ended answers "Event has ended" with its winner.
+    """
 
-        # Top 3 leaderboard
-        leaderboard = []
-        for rank, item in enumerate(task_counts[:3], start=1):
-            leaderboard.append({
-                "rank": rank,
-                "username": item['user__username'],
-                "tasks_completed": item['count']
-            })
-
-        # Get current user rank
-        user_rank = None
-        user_completed_tasks = 0
-        user_id = request.session.get("user_id")
-        if user_id:
-            for idx, item in enumerate(task_counts, start=1):
-                if item['user'] == user_id:
-                    user_rank = idx
-                    user_completed_tasks = item['count']
-                    break
+    def get(self, request):
+        event, answer = _leaderboard_event(request.query_params)
+        if not event:
+            data, code = answer
+            return Response(data, status=code)
+        return Response(event.standings(request.session.get("user_id"), around=_around_param(request.query_params)))
 
-        return Response({
-            "event_name": event.name,
-            "leaderboard": leaderboard,
-            "your_rank": user_rank,
-            "your_completed_tasks": user_completed_tasks
-        })
\ No newline at end of file
+
+def _leaderboard_event(params):
+    """(event, None) for the running event a leaderboard request names, else (None, (data, status)) to answer with."""
+    now = timezone.now()
+    events = Event.objects.all()
+    if params.get('event'):
+        try:
+            events = events.filter(id=int(params['event']))
+        except ValueError:
+            return None, ({"detail": "Invalid event id"}, status.HTTP_400_BAD_REQUEST)
+
+    event = events.filter(is_active=True, start__lte=now, end__gt=now).order_by('-start', '-id').first()
+    if event:
+        return event, None
+    # past its end: being settled (still active) or settled recently
+    ended = events.filter(
+        Q(is_active=True, end__lte=now) | Q(ended_at__gte=now - EVENT_RESULTS_WINDOW)
+    ).select_related('winner').order_by('-end').first()
+    if not ended:
+        return None, ({"detail": "No active event"}, status.HTTP_404_NOT_FOUND)
+    return None, ({
+        "detail": "Event has ended",
+        "winner": ended.winner.username if ended.winner else None
+    }, status.HTTP_200_OK)
+
+
+def _around_param(params):
+    try:
+        return min(max(int(params.get('around', EVENT_AROUND_ME)), 0), EVENT_AROUND_ME_MAX)
+    except ValueError:
+        return EVENT_AROUND_ME
+
+
+# ---------------------------------------------------------------------------
+# Async variants, routed instead of the views above when settings.ASYNC_VIEWS is on (ASGI).
+# Same payloads; their independent queries run concurrently (motivatchi.async_queries).
+# ---------------------------------------------------------------------------
+
+@require_GET
+async def async_task_analytics(request):
+    """GET /api/tasks/analytics/ (TaskView.analytics)."""
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"detail": "Not authenticated."}, status=status.HTTP_403_FORBIDDEN)
+    # the account check runs alongside the analytics queries
+    exists, data = await asyncio.gather(
+        Account.objects.filter(id=user_id).aexists(),
+        TaskAnalytics.from_params(user_id, request.GET).adata(),
+    )
+    if not exists:
+        return JsonResponse({"detail": "Account does not exist."}, status=status.HTTP_403_FORBIDDEN)
+    return JsonResponse(data)
+
+
+@require_GET
+async def async_event_leaderboard(request):
+    """GET /api/events/leaderboard/ (EventLeaderboardView)."""
+    event, answer = await sync_to_async(_leaderboard_event)(request.GET)
+    if not event:
+        data, code = answer
+        return JsonResponse(data, status=code)
+    user_id = await request.session.aget("user_id")
+    return JsonResponse(await event.astandings(user_id, around=_around_param(request.GET)))
@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class UsersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'users'
+
+    def ready(self):
+        # ETag version tokens are bumped whenever a user's data is saved
+        from .versioning import connect_signals
+        connect_signals()
+        # unread notification counters follow single-row creates and deletes
+        from .models import connect_notification_counters
+        connect_notification_counters()
@@ -0,0 +1,117 @@
+"""
+Background jobs for the users app (see motivatchi.scheduler).
+"""
+from datetime import timedelta
+from importlib import import_module
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count
+from django.utils import timezone
+
+from .models import Notification
+from .versioning import bump_versions
+
+# Notifications older than this are deleted
+NOTIFICATION_MAX_AGE = timedelta(days=90)
+# Only each user's newest notifications are kept
+NOTIFICATION_MAX_PER_USER = 200
+# Rows deleted (or users coalesced) per transaction, to keep locks short
+NOTIFICATION_COMPACTION_BATCH_SIZE = 500
+
+
+def clear_expired_sessions():
+    """
+    Delete expired sessions, like `manage.py clearsessions`.
+    A no-op for the cache and signed-cookie engines, which expire sessions on their own.
+    """
+    engine = import_module(settings.SESSION_ENGINE)
+    try:
+        engine.SessionStore.clear_expired()
+    except NotImplementedError:
+        return False
+    return True
+
+
+def compact_notifications(max_age=NOTIFICATION_MAX_AGE, max_per_user=NOTIFICATION_MAX_PER_USER,
+                          batch_size=NOTIFICATION_COMPACTION_BATCH_SIZE):
+    """
+    Bound the notification table and every user's feed:
+      1. coalesce each user's unread notifications of a digest kind (Notification.DIGESTS) into
+         the newest one ("alice and 14 others started following you!");
+      2. delete notifications older than `max_age`;
+      3. delete each user's notifications beyond the newest `max_per_user`.
+    Every step works in batches of `batch_size` rows or users, one short transaction each.
+    Returns the number of notifications removed.
+    """
+    removed = 0
+    for kind in Notification.DIGESTS:
+        removed += _coalesce(kind, batch_size)
+
+    cutoff = timezone.now() - max_age
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Notification.objects.filter(created_at__lt=cutoff)
+                .order_by('id').values_list('id', flat=True)[:batch_size]
+            )
+            if not batch:
+                break
+            removed += Notification.purge(batch)
+
+    crowded = list(
+        Notification.objects.values('user_id').annotate(rows=Count('id'))
+        .filter(rows__gt=max_per_user).values_list('user_id', flat=True)
+    )
+    for user_id in crowded:
+        while True:
+            with transaction.atomic():
+                batch = list(
+                    Notification.objects.filter(user_id=user_id).order_by('-created_at', '-id')
+                    .values_list('id', flat=True)[max_per_user:max_per_user + batch_size]
+                )
+                if not batch:
+                    break
+                removed += Notification.purge(batch)
+
+    return removed
+
+
+def _coalesce(kind, batch_size):
+    """Fold every user's unread `kind` notifications into their newest one; returns rows removed."""
+    removed = 0
+    while True:
+        user_ids = list(
+            Notification.objects.filter(kind=kind, is_read=False)
+            .values('user_id').annotate(rows=Count('id')).filter(rows__gt=1)
+            .order_by('user_id').values_list('user_id', flat=True)[:batch_size]
+        )
+        if not user_ids:
+            return removed
+
+        with transaction.atomic():
+            rows = (
+                Notification.objects.select_for_update(of=('self',))
+                .filter(kind=kind, is_read=False, user_id__in=user_ids)
+                .order_by('user_id', '-created_at', '-id')
+                .values_list('id', 'user_id', 'actor__username', 'count')
+            )
+            newest = {}
+            folded = []
+            for notification_id, user_id, actor, count in rows:
+                if user_id not in newest:
+                    newest[user_id] = [notification_id, actor, count]
+                else:
+                    newest[user_id][2] += count
+                    folded.append(notification_id)
+            for notification_id, actor, total in newest.values():
+                others = total - 1
+                Notification.objects.filter(id=notification_id).update(
+                    count=total,
+                    message=Notification.DIGESTS[kind].format(
+                        actor=actor or "Someone", others=others, s="" if others == 1 else "s"
+                    ),
+                )
+            removed += Notification.purge(folded)
+            # queryset.update() sends no post_save
+            bump_versions(newest, 'notifications')
@@ -0,0 +1,82 @@
+import json
+import statistics
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import SimpleCookie
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_SERVERS = ["wsgi=http://localhost:8001", "asgi=http://localhost:8002"]
+DEFAULT_PATHS = ["/api/me/", "/api/tasks/analytics/?period=monthly", "/api/events/leaderboard/"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare latency of the multi-query endpoints on running deployments side by side, e.g. the "
+        "Dockerfile image started twice against the same database and cache: SERVER_MODE=wsgi on "
+        "port 8001 and SERVER_MODE=asgi on port 8002. Logs in over HTTP as an existing account."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", action="append", dest="servers", metavar="NAME=URL",
+                            help="Deployment to measure (repeatable).")
+        parser.add_argument("--username", required=True)
+        parser.add_argument("--password", required=True)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and server.")
+        parser.add_argument("--concurrency", type=int, default=8, help="Requests in flight at once.")
+        parser.add_argument("--path", action="append", dest="paths", help="Endpoint to measure (repeatable).")
+
+    def handle(self, *args, **options):
+        servers = [server.split("=", 1) for server in options["servers"] or DEFAULT_SERVERS]
+        paths = options["paths"] or DEFAULT_PATHS
+        self.stdout.write(f"{'server':<10}{'path':<40}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'req/s':>10}")
+        for name, base_url in servers:
+            cookie = self.login(base_url.rstrip("/"), options["username"], options["password"])
+            for path in paths:
+                url = base_url.rstrip("/") + path
+                self.report(name, path, *self.measure(url, cookie, options["requests"], options["concurrency"]))
+
+    def login(self, base_url, username, password):
+        request = urllib.request.Request(
+            f"{base_url}/api/login/",
+            data=json.dumps({"username": username, "password": password}).encode(),
+            headers={"Content-Type": "application/json"},
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                cookies = SimpleCookie()
+                for header in response.headers.get_all("Set-Cookie") or []:
+                    cookies.load(header)
+        except OSError as exc:
+            raise CommandError(f"Could not log in on {base_url}: {exc}")
+        return "; ".join(f"{key}={morsel.value}" for key, morsel in cookies.items())
+
+    def measure(self, url, cookie, count, concurrency):
+        def fetch(_):
+            request = urllib.request.Request(url, headers={"Cookie": cookie})
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request) as response:
+                    response.read()
+                    code = response.status
+            except urllib.error.HTTPError as exc:
+                exc.read()
+                code = exc.code
+            return (time.perf_counter() - start) * 1000, code
+
+        fetch(None)  # warm up connections and caches
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(count)))
+        elapsed = time.perf_counter() - started
+        timings = [ms for ms, _ in results]
+        codes = {code for _, code in results} - {200}
+        if codes:
+            self.stderr.write(f"{url} answered {', '.join(map(str, sorted(codes)))}")
+        quantiles = statistics.quantiles(timings, n=20) if len(timings) > 1 else timings * 19
+        return statistics.mean(timings), statistics.median(timings), quantiles[-1], count / elapsed
+
+    def report(self, name, path, mean, p50, p95, rate):
+        self.stdout.write(f"{name:<10}{path:<40}{mean:>10.2f}{p50:>10.2f}{p95:>10.2f}{rate:>10.1f}")
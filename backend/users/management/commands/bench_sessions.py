@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from tamagotchi.models import Tamagotchi
+from users.models import Account
+
+DEFAULT_PATHS = ["/api/tamagotchi/health/", "/api/tasks/?page_size=50"]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request latency of the polled endpoints under each SESSION_MODE. "
+        "Creates a throwaway account for the run and deletes it afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=200, help="Requests per endpoint and mode.")
+        parser.add_argument("--modes", nargs="+", default=list(settings.SESSION_ENGINES),
+                            choices=list(settings.SESSION_ENGINES))
+        parser.add_argument("--path", action="append", dest="paths", help="Endpoint to poll (repeatable).")
+
+    def handle(self, *args, **options):
+        paths = options["paths"] or DEFAULT_PATHS
+        account = Account.objects.create(username=f"bench-sessions-{time.time_ns()}", hashed_password="!")
+        Tamagotchi.objects.create(user=account)
+        try:
+            self.stdout.write(f"{'mode':<16}{'path':<32}{'mean ms':>10}{'p95 ms':>10}{'queries':>10}")
+            for mode in options["modes"]:
+                with override_settings(SESSION_ENGINE=settings.SESSION_ENGINES[mode]):
+                    client = self.login(account)
+                    for path in paths:
+                        self.report(mode, path, *self.measure(client, path, options["requests"]))
+        finally:
+            account.delete()
+
+    def login(self, account):
+        client = Client(HTTP_HOST="localhost")
+        session = client.session
+        session["user_id"] = account.id
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        return client
+
+    def measure(self, client, path, count):
+        client.get(path)  # warm up caches and connections
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for _ in range(count):
+                start = time.perf_counter()
+                response = client.get(path)
+                timings.append((time.perf_counter() - start) * 1000)
+        if response.status_code != 200:
+            self.stderr.write(f"{path} answered {response.status_code}")
+        p95 = statistics.quantiles(timings, n=20)[-1] if len(timings) > 1 else timings[0]
+        return statistics.mean(timings), p95, len(queries) / count
+
+    def report(self, mode, path, mean, p95, queries):
+        self.stdout.write(f"{mode:<16}{path:<32}{mean:>10.2f}{p95:>10.2f}{queries:>10.1f}")
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.jobs import compact_notifications
+
+
+class Command(BaseCommand):
+    help = "Coalesce repeated notifications into digests and delete notifications past the retention limits."
+
+    def handle(self, *args, **options):
+        count = compact_notifications()
+        self.stdout.write(self.style.SUCCESS(f"Removed {count} notification(s)."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.teams import rebuild_team_labels
+
+
+class Command(BaseCommand):
+    help = "Recompute every account's challenge team label from the Follow table."
+
+    def handle(self, *args, **options):
+        count = rebuild_team_labels()
+        self.stdout.write(self.style.SUCCESS(f"Relabelled {count} account(s)."))
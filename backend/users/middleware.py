@@ -0,0 +1,29 @@
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+
+from .models import Account
+
+
+def get_account(request):
+    """
+    Return the Account logged in on this request's session (with its tamagotchi), or None.
+    Resolved at most once per request.
+    """
+    if not hasattr(request, '_cached_account'):
+        user_id = request.session.get("user_id")
+        request._cached_account = (
+            Account.objects.select_related('tamagotchi').filter(id=user_id).first() if user_id else None
+        )
+    return request._cached_account
+
+
+class AccountMiddleware(MiddlewareMixin):
+    """
+    Set request.account to the session's Account, loaded lazily on first use so views that
+    never touch it (and 304 answers from conditional_get) cost no query.
+    request.account is falsy when nobody is logged in or the account no longer exists.
+    Sync and async capable (MiddlewareMixin), so async views under ASGI keep running on the
+    event loop; they must not touch request.account, which loads synchronously.
+    """
+    def process_request(self, request):
+        request.account = SimpleLazyObject(lambda: get_account(request))
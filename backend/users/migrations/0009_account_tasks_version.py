@@ -0,0 +1,23 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_notification'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='tasks_purged_version',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='account',
+            name='tasks_version',
+            field=models.BigIntegerField(default=0),
+        ),
+    ]
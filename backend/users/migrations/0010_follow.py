@@ -0,0 +1,78 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:12
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def lists_to_edges(apps, schema_editor):
+    """One Follow row per username found in either side's following / followers list."""
+    Account = apps.get_model('users', 'Account')
+    Follow = apps.get_model('users', 'Follow')
+    ids = dict(Account.objects.values_list('username', 'id'))
+
+    edges = set()
+    for account_id, following, followers in Account.objects.values_list('id', 'following', 'followers').iterator():
+        for username in following or []:
+            if username in ids and ids[username] != account_id:
+                edges.add((account_id, ids[username]))
+        for username in followers or []:
+            if username in ids and ids[username] != account_id:
+                edges.add((ids[username], account_id))
+
+    Follow.objects.bulk_create(
+        [Follow(follower_id=follower, followee_id=followee) for follower, followee in edges],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def edges_to_lists(apps, schema_editor):
+    Account = apps.get_model('users', 'Account')
+    Follow = apps.get_model('users', 'Follow')
+    usernames = dict(Account.objects.values_list('id', 'username'))
+
+    following = defaultdict(list)
+    followers = defaultdict(list)
+    for follower, followee in Follow.objects.order_by('id').values_list('follower_id', 'followee_id').iterator():
+        following[follower].append(usernames[followee])
+        followers[followee].append(usernames[follower])
+
+    accounts = list(Account.objects.filter(id__in=set(following) | set(followers)))
+    for account in accounts:
+        account.following = following[account.id]
+        account.followers = followers[account.id]
+    Account.objects.bulk_update(accounts, ['following', 'followers'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_account_tasks_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Follow',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('followee', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='follower_edges', to='users.account')),
+                ('follower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='following_edges', to='users.account')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['followee', 'follower'], name='follow_followee_idx')],
+                'constraints': [models.UniqueConstraint(fields=('follower', 'followee'), name='follow_unique_edge')],
+            },
+        ),
+        migrations.RunPython(lists_to_edges, edges_to_lists),
+        migrations.RemoveField(
+            model_name='account',
+            name='followers',
+        ),
+        migrations.RemoveField(
+            model_name='account',
+            name='following',
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:14
+
+from django.db import migrations, models
+
+
+def label_teams(apps, schema_editor):
+    """Label every mutual-follow component with its smallest account id (see users.teams)."""
+    Account = apps.get_model('users', 'Account')
+    Follow = apps.get_model('users', 'Follow')
+
+    edges = set(Follow.objects.values_list('follower_id', 'followee_id').iterator())
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in edges:
+        if a < b and (b, a) in edges:
+            root_a, root_b = find(a), find(b)
+            if root_a != root_b:
+                parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    teams = {}
+    for account_id in parent:
+        teams.setdefault(find(account_id), []).append(account_id)
+    for label, account_ids in teams.items():
+        for i in range(0, len(account_ids), 1000):
+            Account.objects.filter(id__in=account_ids[i:i + 1000]).update(team_label=label)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0010_follow'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='team_label',
+            field=models.BigIntegerField(blank=True, db_index=True, null=True),
+        ),
+        migrations.RunPython(label_teams, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:26
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_unread(apps, schema_editor):
+    Account = apps.get_model('users', 'Account')
+    Notification = apps.get_model('users', 'Notification')
+    counts = (
+        Notification.objects.filter(is_read=False)
+        .values('user_id').annotate(count=Count('id')).values_list('user_id', 'count')
+    )
+    for user_id, count in counts.iterator():
+        Account.objects.filter(id=user_id).update(unread_notifications=count)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_account_team_label'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='account',
+            name='unread_notifications',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', '-created_at', '-id'], name='notification_user_feed_idx'),
+        ),
+        migrations.RunPython(count_unread, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 5.2.7 on 2026-10-17 22:28
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+FOLLOW_SUFFIX = " started following you!"
+
+
+def tag_follow_notifications(apps, schema_editor):
+    """Existing follow notifications become kind 'follow', with the follower as actor."""
+    Account = apps.get_model('users', 'Account')
+    Notification = apps.get_model('users', 'Notification')
+    ids = dict(Account.objects.values_list('username', 'id'))
+    rows = Notification.objects.filter(message__endswith=FOLLOW_SUFFIX).values_list('id', 'message')
+    for notification_id, message in rows.iterator():
+        username = message[:-len(FOLLOW_SUFFIX)]
+        Notification.objects.filter(id=notification_id).update(kind='follow', actor_id=ids.get(username))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0012_notification_feed'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notification',
+            name='actor',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='users.account'),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='count',
+            field=models.IntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(blank=True, default='', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(condition=models.Q(('is_read', False)), fields=['kind', 'user'], name='notification_unread_kind_idx'),
+        ),
+        migrations.RunPython(tag_follow_notifications, migrations.RunPython.noop),
+    ]
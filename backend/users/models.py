@@ -1,4 +1,10 @@
-from django.db import models
+from collections import Counter, defaultdict
+
+from django.db import models, transaction
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete, post_save
+
+from .versioning import bump_version, bump_versions
 
 # Create your models here.
 
@@ -6,20 +12,184 @@ class Account(models.Model):
     username = models.CharField(max_length=200, unique=True)
     hashed_password = models.CharField(max_length=200)
     coins = models.IntegerField(default=0)
-    followers = models.JSONField(default=list) 
-    following = models.JSONField(default=list) 
+    # Per-user task change counter used by /api/tasks/changes/ (see Task.lock_and_bump_task_versions)
+    tasks_version = models.BigIntegerField(default=0)
+    # Task tombstones up to this version have been compacted away
+    tasks_purged_version = models.BigIntegerField(default=0)
+    # Challenge team (mutual-follow component) this account belongs to; NULL = a team of one.
+    # Maintained by users.teams.
+    team_label = models.BigIntegerField(null=True, blank=True, db_index=True)
+    # Unread notifications, kept in step by Notification.deliver() / mark_read() and the
+    # Notification save / delete signals (see Notification)
+    unread_notifications = models.IntegerField(default=0)
 
     def __str__(self):
         return self.username
     
+class Follow(models.Model):
+    """
+    One follow edge: `follower` follows `followee`.
+    The unique constraint doubles as the index for "who do I follow" and membership checks,
+    the second index serves "who follows me".
+    """
+    follower = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="following_edges")
+    followee = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="follower_edges")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["follower", "followee"], name="follow_unique_edge"),
+        ]
+        indexes = [
+            models.Index(fields=["followee", "follower"], name="follow_followee_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.follower_id} -> {self.followee_id}"
+
+    @staticmethod
+    def is_following(follower, followee):
+        return Follow.objects.filter(follower=follower, followee=followee).exists()
+
+    @staticmethod
+    def mutual_ids(user_ids):
+        """Ids of every account that mutually follows at least one of `user_ids`."""
+        back = Follow.objects.filter(follower_id=models.OuterRef("followee_id"), followee_id=models.OuterRef("follower_id"))
+        return set(
+            Follow.objects.filter(follower_id__in=user_ids)
+            .filter(models.Exists(back))
+            .values_list("followee_id", flat=True)
+        )
+
+    @staticmethod
+    def team_ids(user_id):
+        """
+        Ids of the user's team: everyone reachable through chains of mutual follows,
+        the user included. One query per hop.
+        """
+        team = {user_id}
+        frontier = {user_id}
+        while frontier:
+            frontier = Follow.mutual_ids(frontier) - team
+            team |= frontier
+        return team
+
+
 class Notification(models.Model):
     """
     A simple model for storing user notifications — e.g., when someone follows you.
+    Account.unread_notifications counts the unread rows: single creates and deletes update it
+    through signals, bulk paths go through deliver(), mark_read() and purge().
+    Notifications of a kind listed in DIGESTS are coalesced into one digest row per user by
+    users.jobs.compact_notifications; `count` is how many notifications a row stands for.
     """
+    FOLLOW = 'follow'
+    REMINDER = 'reminder'
+    # kind: digest message for (newest actor's username, number of others)
+    DIGESTS = {
+        FOLLOW: "{actor} and {others} other{s} started following you!",
+    }
+
     user = models.ForeignKey(Account, on_delete=models.CASCADE, related_name="notifications")
     message = models.CharField(max_length=255)
     created_at = models.DateTimeField(auto_now_add=True)
     is_read = models.BooleanField(default=False)
+    kind = models.CharField(max_length=20, blank=True, default='')
+    # the account whose action caused the notification (e.g. the new follower)
+    actor = models.ForeignKey(Account, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    count = models.IntegerField(default=1)
+
+    class Meta:
+        indexes = [
+            # a user's feed newest first (cursor pages) and mark-read ranges
+            models.Index(fields=['user', '-created_at', '-id'], name='notification_user_feed_idx'),
+            # unread rows the digest compaction looks for
+            models.Index(fields=['kind', 'user'], condition=models.Q(is_read=False), name='notification_unread_kind_idx'),
+        ]
 
     def __str__(self):
-        return f"{self.user.username}: {self.message}"
\ No newline at end of file
+        return f"{self.user.username}: {self.message}"
+
+    @staticmethod
+    def adjust_unread(deltas):
+        """Add {user_id: delta} to the unread counters, one UPDATE per distinct delta, never below 0."""
+        by_delta = defaultdict(list)
+        for user_id, delta in deltas.items():
+            if delta:
+                by_delta[delta].append(user_id)
+        for delta, user_ids in by_delta.items():
+            Account.objects.filter(id__in=user_ids).update(
+                unread_notifications=Greatest(models.F('unread_notifications') + delta, 0)
+            )
+
+    @classmethod
+    def deliver(cls, notifications):
+        """
+        Insert unsaved notifications with one bulk_create and add them to the recipients'
+        unread counters.
+        """
+        notifications = list(notifications)
+        if not notifications:
+            return []
+        created = cls.objects.bulk_create(notifications)
+        per_user = Counter(n.user_id for n in notifications if not n.is_read)
+        cls.adjust_unread(per_user)
+        # bulk_create() sends no post_save
+        bump_versions(per_user, 'notifications')
+        return created
+
+    @classmethod
+    def purge(cls, ids):
+        """
+        Delete notifications by id, taking the unread ones off their users' counters
+        (the rows are marked read first so the delete signal skips them).
+        The unread rows are locked before they are counted, so a concurrent mark_read() either
+        finishes first (and they are no longer unread) or waits; neither decrements twice.
+        """
+        with transaction.atomic():
+            unread = list(cls.objects.select_for_update().filter(id__in=ids, is_read=False).values_list('id', 'user_id'))
+            if unread:
+                cls.objects.filter(id__in=[notification_id for notification_id, _ in unread]).update(is_read=True)
+                per_user = Counter(user_id for _, user_id in unread)
+                cls.adjust_unread({user_id: -count for user_id, count in per_user.items()})
+            return cls.objects.filter(id__in=ids).delete()[0]
+
+    @classmethod
+    def mark_read(cls, user_id, ids=None, up_to=None):
+        """
+        Mark the user's notifications read with one UPDATE: the given `ids`, or every notification
+        up to and including notification `up_to` in feed order (it and everything older).
+        Returns the number of notifications that were unread.
+        """
+        unread = cls.objects.filter(user_id=user_id, is_read=False)
+        if ids is not None:
+            unread = unread.filter(id__in=ids)
+        elif up_to is not None:
+            anchor = cls.objects.filter(user_id=user_id, id=up_to).values('created_at')[:1]
+            unread = unread.filter(
+                models.Q(created_at__lt=models.Subquery(anchor))
+                | models.Q(created_at=models.Subquery(anchor), id__lte=up_to)
+            )
+        with transaction.atomic():
+            count = unread.update(is_read=True)
+            if count:
+                cls.adjust_unread({user_id: -count})
+                bump_version(user_id, 'notifications')
+        return count
+
+
+def _count_created(sender, instance, created, **kwargs):
+    if created and not instance.is_read:
+        Account.objects.filter(id=instance.user_id).update(unread_notifications=models.F('unread_notifications') + 1)
+
+
+def _count_deleted(sender, instance, **kwargs):
+    if not instance.is_read:
+        Account.objects.filter(id=instance.user_id).update(
+            unread_notifications=Greatest(models.F('unread_notifications') - 1, 0)
+        )
+
+
+def connect_notification_counters():
+    post_save.connect(_count_created, sender=Notification, dispatch_uid='notification-count-save')
+    post_delete.connect(_count_deleted, sender=Notification, dispatch_uid='notification-count-delete')
@@ -0,0 +1,8 @@
+from motivatchi.pagination import KeysetCursorPagination
+
+
+class NotificationCursorPagination(KeysetCursorPagination):
+    """A user's notifications newest first by (created_at, id), one range scan of notification_user_feed_idx."""
+    ordering = ('-created_at', '-id')
+    page_size = 20
+    max_page_size = 100
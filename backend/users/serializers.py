@@ -11,8 +11,16 @@ class AccountSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("This username is already taken.")
         return value
 
+    def update(self, instance, validated_data):
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # Write only the submitted columns: tasks_version, team_label, unread_notifications and
+        # coins paid through F() updates are maintained elsewhere and must not be reverted
+        instance.save(update_fields=list(validated_data))
+        return instance
+
 class NotificationSerializer(serializers.ModelSerializer):
     class Meta:
         model = Notification
-        fields = ['id', 'user', 'message', 'is_read', 'created_at']
-        read_only_fields = ['id', 'user', 'created_at']
\ No newline at end of file
+        fields = ['id', 'user', 'message', 'is_read', 'created_at', 'kind', 'count']
+        read_only_fields = ['id', 'user', 'created_at', 'kind', 'count']
\ No newline at end of file
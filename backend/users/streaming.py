@@ -0,0 +1,213 @@
+"""
+Push channel for GET /api/stream/ (Server-Sent Events).
+
+Every connected client holds one asyncio.Queue in this process's Hub. When a write commits,
+users.versioning.bump_versions() calls publish() with the users and scopes that changed; the
+configured backend (settings.STREAM_BACKEND) carries the message to every web process and each
+Hub wakes the matching connections, which send one SSE event per changed scope:
+
+    event: health
+    data: {"scope": "health"}
+
+Clients answer an event by re-fetching the matching endpoint with If-None-Match, so the stream
+carries no data and never needs the database. Scopes are the versioning ones plus
+"leaderboard", broadcast to everyone when event scores move and sent at most once every
+LEADERBOARD_INTERVAL seconds per connection.
+
+Backends:
+    LocalBackend  delivers inside this process only (tests, a single web process with the
+                  scheduler running in-process)
+    RedisBackend  publishes on a Redis channel that every process listens to (needs REDIS_URL)
+
+An idle connection is one parked coroutine: no thread, no query, a comment line every
+HEARTBEAT_INTERVAL seconds to keep proxies from closing it.
+"""
+import asyncio
+import contextlib
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "motivatchi:stream"
+
+HEARTBEAT_INTERVAL = 25
+LEADERBOARD_INTERVAL = 10
+# Scopes sent to every connection rather than to named users
+BROADCAST_SCOPES = ('leaderboard',)
+# Sent to everyone after the Redis listener reconnects (users.versioning.SCOPES + broadcasts)
+RESYNC_SCOPES = ('tasks', 'health', 'profile', 'notifications', 'connections') + BROADCAST_SCOPES
+# Seconds between Redis reconnect attempts, doubling up to the max
+RECONNECT_DELAY = 1
+RECONNECT_MAX_DELAY = 30
+
+
+class Hub:
+    """This process's open streams: user id -> queues, all owned by one event loop."""
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.loop = None
+        self.lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue()
+        with self.lock:
+            self.loop = asyncio.get_running_loop()
+            self.queues[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        with self.lock:
+            self.queues[user_id].discard(queue)
+            if not self.queues[user_id]:
+                del self.queues[user_id]
+
+    def dispatch(self, message):
+        """Hand a published message to the matching queues; safe to call from any thread."""
+        with self.lock:
+            if self.loop is None or not self.queues:
+                return
+            if message['users'] is None:
+                targets = [queue for queues in self.queues.values() for queue in queues]
+            else:
+                targets = [queue for user_id in message['users'] for queue in self.queues.get(user_id, ())]
+            loop = self.loop
+        scopes = frozenset(message['scopes'])
+        for queue in targets:
+            loop.call_soon_threadsafe(queue.put_nowait, scopes)
+
+
+hub = Hub()
+
+
+class LocalBackend:
+    """Delivers to this process's streams only."""
+
+    def publish(self, message):
+        hub.dispatch(message)
+
+    async def start(self):
+        pass
+
+
+class RedisBackend:
+    """Publishes on a Redis channel; one listener task per process feeds the local Hub."""
+
+    def __init__(self):
+        import redis
+
+        self.client = redis.Redis.from_url(settings.REDIS_URL)
+        self.listener = None
+
+    def publish(self, message):
+        self.client.publish(CHANNEL, json.dumps(message))
+
+    async def start(self):
+        if self.listener is None or self.listener.done():
+            self.listener = asyncio.create_task(self.listen())
+
+    async def subscribe(self):
+        import redis.asyncio
+
+        pubsub = redis.asyncio.Redis.from_url(settings.REDIS_URL).pubsub()
+        await pubsub.subscribe(CHANNEL)
+        return pubsub
+
+    async def listen(self):
+        """Feed the Hub until cancelled, reconnecting with backoff whenever Redis goes away."""
+        delay = RECONNECT_DELAY
+        reconnecting = False
+        while True:
+            pubsub = None
+            try:
+                pubsub = await self.subscribe()
+                delay = RECONNECT_DELAY
+                if reconnecting:
+                    # messages published while we were away are lost: have every client re-fetch
+                    hub.dispatch({'users': None, 'scopes': list(RESYNC_SCOPES)})
+                async for item in pubsub.listen():
+                    if item['type'] == 'message':
+                        hub.dispatch(json.loads(item['data']))
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.warning("Stream listener lost Redis, reconnecting in %ss", delay, exc_info=True)
+            finally:
+                if pubsub is not None:
+                    with contextlib.suppress(Exception):
+                        await pubsub.aclose()
+            reconnecting = True
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RECONNECT_MAX_DELAY)
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.STREAM_BACKEND)()
+    return _backend
+
+
+def publish(user_ids, scopes):
+    """
+    Tell the streams of `user_ids` (None: everyone) that `scopes` changed.
+    Called from on_commit callbacks, so a backend failure is logged rather than raised: the
+    write has committed, and a missed push only delays the clients' re-fetch.
+    """
+    users = None if user_ids is None else sorted(set(user_ids))
+    if users == []:
+        return
+    try:
+        get_backend().publish({'users': users, 'scopes': list(scopes)})
+    except Exception:
+        logger.exception("Could not publish %s changes for users %s", list(scopes), users)
+
+
+def _event(scope):
+    return f"event: {scope}\ndata: {json.dumps({'scope': scope})}\n\n"
+
+
+async def event_stream(user_id):
+    """Async iterator of SSE lines for one user's connection; ends when the client goes away."""
+    await get_backend().start()
+    queue = hub.subscribe(user_id)
+    try:
+        # clients reconnect after 5 s if the connection drops
+        yield "retry: 5000\n\n"
+        held = set()
+        next_leaderboard = 0.0
+        while True:
+            timeout = HEARTBEAT_INTERVAL
+            if held:
+                timeout = max(next_leaderboard - time.monotonic(), 0)
+            try:
+                scopes = set(await asyncio.wait_for(queue.get(), timeout))
+            except asyncio.TimeoutError:
+                scopes = set()
+                if not held:
+                    yield ": keepalive\n\n"
+                    continue
+            # a burst of writes becomes one event per scope
+            while not queue.empty():
+                scopes |= queue.get_nowait()
+
+            held |= scopes & set(BROADCAST_SCOPES)
+            scopes -= set(BROADCAST_SCOPES)
+            if held and time.monotonic() >= next_leaderboard:
+                scopes |= held
+                held = set()
+                next_leaderboard = time.monotonic() + LEADERBOARD_INTERVAL
+            if scopes:
+                yield "".join(_event(scope) for scope in sorted(scopes))
+    finally:
+        hub.unsubscribe(user_id, queue)
@@ -0,0 +1,127 @@
+"""
+Challenge teams: the connected components of the mutual-follow graph.
+
+Every account in a team of two or more carries the same Account.team_label (the id of one of
+its members); accounts without mutual follows keep team_label NULL and form a team of one.
+Labels are maintained incrementally when a mutual follow appears (link) or disappears (unlink),
+so looking a team up is one indexed query. Both lock every member row of the teams they touch
+before relabelling. rebuild_team_labels() recomputes every label from the Follow table and
+repairs any drift (e.g. after accounts are deleted); it is scheduled hourly.
+"""
+from django.db import transaction
+from django.db.models import Count, Exists, F, OuterRef, Q
+
+from .models import Account, Follow
+
+
+def team_member_ids(account):
+    """Ids of every account in `account`'s team, itself included."""
+    if account.team_label is None:
+        return {account.id}
+    return set(Account.objects.filter(team_label=account.team_label).values_list('id', flat=True))
+
+
+def _label(account_id):
+    """Current label of the account's team (its own id when it has none)."""
+    label = Account.objects.filter(id=account_id).values_list('team_label', flat=True).first()
+    return account_id if label is None else label
+
+
+def _members(label):
+    """Accounts labelled `label`, including the unlabelled account whose id it is."""
+    return Account.objects.filter(Q(team_label=label) | Q(id=label, team_label__isnull=True))
+
+
+def _lock_teams(*account_ids):
+    """
+    Lock every member of the accounts' teams (one statement, in id order) and return
+    {account_id: label} for `account_ids`. Whoever relabels a team holds all its rows, so two
+    links / unlinks touching the same team run one after the other.
+    """
+    while True:
+        labels = {account_id: _label(account_id) for account_id in account_ids}
+        rows = dict(
+            Account.objects.select_for_update()
+            .filter(Q(team_label__in=set(labels.values())) | Q(id__in=set(labels.values()) | set(account_ids)))
+            .order_by('id').values_list('id', 'team_label')
+        )
+        # a team relabelled between the read and the lock: lock the teams it became part of
+        locked = {account_id: account_id if rows.get(account_id) is None else rows[account_id] for account_id in account_ids}
+        if locked == labels:
+            return labels
+
+
+def link(a_id, b_id):
+    """a and b now follow each other: merge their teams, relabelling the smaller one."""
+    with transaction.atomic():
+        labels = _lock_teams(a_id, b_id)
+        label_a, label_b = labels[a_id], labels[b_id]
+        if label_a == label_b:
+            return
+        sizes = dict(
+            Account.objects.filter(team_label__in=[label_a, label_b])
+            .values_list('team_label').annotate(size=Count('id'))
+        )
+        if sizes.get(label_a, 1) < sizes.get(label_b, 1):
+            label_a, label_b = label_b, label_a
+        _members(label_b).update(team_label=label_a)
+        _members(label_a).update(team_label=label_a)
+
+
+def unlink(a_id, b_id):
+    """a and b no longer follow each other: split the team if that was its only connection."""
+    with transaction.atomic():
+        label = _lock_teams(a_id, b_id)[a_id]
+        part_b = Follow.team_ids(b_id)
+        if a_id in part_b:
+            return
+        # keep the old label on whichever side contains the account it names
+        if label in part_b:
+            part_b = Follow.team_ids(a_id)
+        _relabel(part_b)
+
+
+def _relabel(member_ids):
+    label = min(member_ids) if len(member_ids) > 1 else None
+    Account.objects.filter(id__in=member_ids).update(team_label=label)
+
+
+def rebuild_team_labels():
+    """
+    Recompute every team label from the Follow table with an in-memory union-find and write
+    only the labels that changed. Returns the number of accounts relabelled.
+    """
+    back = Follow.objects.filter(follower_id=OuterRef('followee_id'), followee_id=OuterRef('follower_id'))
+    edges = (
+        Follow.objects.filter(Exists(back), follower_id__lt=F('followee_id'))
+        .values_list('follower_id', 'followee_id')
+    )
+
+    parent = {}
+
+    def find(x):
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in edges.iterator():
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    desired = {account_id: find(account_id) for account_id in parent}
+    current = dict(Account.objects.filter(team_label__isnull=False).values_list('id', 'team_label'))
+
+    changes = {}
+    for account_id in set(desired) | set(current):
+        label = desired.get(account_id)
+        if current.get(account_id) != label:
+            changes.setdefault(label, []).append(account_id)
+
+    with transaction.atomic():
+        for label, account_ids in changes.items():
+            for i in range(0, len(account_ids), 1000):
+                Account.objects.filter(id__in=account_ids[i:i + 1000]).update(team_label=label)
+    return sum(len(ids) for ids in changes.values())
@@ -1,6 +1,26 @@
+import asyncio
+import json
+from unittest import mock
+
+from asgiref.sync import async_to_sync
+
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Account, Notification
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.contrib.sessions.models import Session
+from django.db import transaction
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from django.utils import timezone
+from datetime import timedelta
+from .models import Account, Follow, Notification
+from tamagotchi.models import Tamagotchi
+from tasks.models import Task
+from tasks.jobs import sweep_overdue_tasks
+from . import streaming, teams
+from .jobs import clear_expired_sessions, compact_notifications
+from .views import async_me
 
 class NotificationsViewTests(APITestCase):
     def setUp(self):
@@ -36,7 +56,7 @@ class NotificationsViewTests(APITestCase):
 
         response = self.client.get(self.notifications_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.json()["results"]
         self.assertEqual(len(data), 1)
         self.assertEqual(data[0]["message"], "User1 notif")
 
@@ -57,7 +77,7 @@ class NotificationsViewTests(APITestCase):
 
         response = self.client.get(self.notifications_url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        data = response.json()
+        data = response.json()["results"]
         self.assertEqual(data[0]["message"], "Second")
         self.assertEqual(data[1]["message"], "First")
 
@@ -69,3 +89,474 @@ class NotificationsViewTests(APITestCase):
         response = self.client.post(self.follow_url, {"username": self.other_user.username}, format="json")
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(Notification.objects.filter(user=self.other_user).count(), 1)
+
+
+    def test_cursor_pages(self):
+        """Pages follow each other newest first, without gaps or repeats"""
+        for i in range(5):
+            Notification.objects.create(user=self.user, message=f"n{i}")
+
+        seen = []
+        url = self.notifications_url + "?page_size=2"
+        while url:
+            data = self.client.get(url).json()
+            seen += [n["message"] for n in data["results"]]
+            url = data["next"]
+        self.assertEqual(seen, ["n4", "n3", "n2", "n1", "n0"])
+        self.assertEqual(self.client.get(self.notifications_url, {"cursor": "nope"}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_unread_count_and_mark_read(self):
+        """The unread counter follows creates, bulk deliveries, mark-read and deletes"""
+        notes = [Notification.objects.create(user=self.user, message=f"n{i}") for i in range(3)]
+        Notification.deliver([Notification(user=self.user, message="bulk"), Notification(user=self.other_user, message="other")])
+        unread_url = "/api/notifications/unread-count/"
+        mark_url = "/api/notifications/mark-read/"
+
+        with self.assertNumQueries(1):  # the account; no COUNT(*)
+            self.assertEqual(self.client.get(unread_url).json()["unread"], 4)
+
+        response = self.client.post(mark_url, {"ids": [notes[0].id]}, format="json")
+        self.assertEqual(response.json(), {"marked": 1, "unread": 3})
+
+        # notes[1] and everything older; notes[0] is already read
+        response = self.client.post(mark_url, {"up_to": notes[1].id}, format="json")
+        self.assertEqual(response.json(), {"marked": 1, "unread": 2})
+        self.assertFalse(Notification.objects.get(id=notes[2].id).is_read)
+
+        # other users' notifications are never touched
+        other = Notification.objects.get(user=self.other_user)
+        self.assertEqual(self.client.post(mark_url, {"ids": [other.id]}, format="json").json()["marked"], 0)
+        self.assertEqual(self.client.post(mark_url, {}, format="json").status_code, status.HTTP_400_BAD_REQUEST)
+
+        notes[2].delete()
+        self.assertEqual(self.client.get(unread_url).json()["unread"], 1)
+        self.other_user.refresh_from_db()
+        self.assertEqual(self.other_user.unread_notifications, 1)
+
+
+class NotificationCompactionTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="popular", hashed_password="pw")
+        self.fans = [Account.objects.create(username=f"fan{i}", hashed_password="pw") for i in range(4)]
+
+    def follow_notification(self, fan, **kwargs):
+        return Notification.objects.create(
+            user=self.user, actor=fan, kind=Notification.FOLLOW,
+            message=f"{fan.username} started following you!", **kwargs
+        )
+
+    def unread(self):
+        self.user.refresh_from_db()
+        return self.user.unread_notifications
+
+    def test_unread_follows_are_coalesced_into_a_digest(self):
+        read = self.follow_notification(self.fans[0], is_read=True)
+        for fan in self.fans:
+            self.follow_notification(fan)
+        other = Notification.objects.create(user=self.user, message="You won!")
+        self.assertEqual(self.unread(), 5)
+
+        self.assertEqual(compact_notifications(), 3)
+        digest = Notification.objects.get(user=self.user, kind=Notification.FOLLOW, is_read=False)
+        self.assertEqual(digest.message, "fan3 and 3 others started following you!")
+        self.assertEqual(digest.count, 4)
+        self.assertEqual(Notification.objects.filter(id__in=[read.id, other.id]).count(), 2)
+        self.assertEqual(self.unread(), 2)
+
+        # a later follow folds into the existing digest
+        newcomer = Account.objects.create(username="newcomer", hashed_password="pw")
+        self.follow_notification(newcomer)
+        self.assertEqual(compact_notifications(), 1)
+        digest = Notification.objects.get(user=self.user, kind=Notification.FOLLOW, is_read=False)
+        self.assertEqual(digest.message, "newcomer and 4 others started following you!")
+        self.assertEqual(self.unread(), 2)
+
+    def test_old_and_excess_notifications_are_deleted(self):
+        old = Notification.objects.create(user=self.user, message="old")
+        Notification.objects.filter(id=old.id).update(created_at=timezone.now() - timedelta(days=100))
+        for i in range(5):
+            Notification.objects.create(user=self.user, message=f"n{i}")
+        self.assertEqual(self.unread(), 6)
+
+        self.assertEqual(compact_notifications(max_per_user=3, batch_size=1), 3)
+        self.assertEqual(
+            list(Notification.objects.filter(user=self.user).order_by('-id').values_list('message', flat=True)),
+            ["n4", "n3", "n2"],
+        )
+        self.assertEqual(self.unread(), 3)
+        self.assertEqual(compact_notifications(max_per_user=3), 0)
+
+
+class FollowTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="fan", hashed_password="pw")
+        self.star = Account.objects.create(username="star", hashed_password="pw")
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+
+    def test_follow_unfollow_round_trip(self):
+        """Following creates one edge, connections list both sides, unfollowing removes it"""
+        self.assertEqual(self.client.post("/api/follow/", {"username": "star"}, format="json").status_code, 200)
+        self.assertEqual(self.client.post("/api/follow/", {"username": "star"}, format="json").status_code, 200)
+        self.assertEqual(Follow.objects.filter(follower=self.user, followee=self.star).count(), 1)
+
+        self.assertEqual(self.client.get("/api/connections/").json(), {"following": ["star"], "followers": []})
+        self.assertEqual(self.client.get("/api/following/star/coins/").status_code, 200)
+
+        self.assertEqual(self.client.post("/api/unfollow/", {"username": "star"}, format="json").status_code, 200)
+        self.assertEqual(self.client.post("/api/unfollow/", {"username": "star"}, format="json").status_code, 400)
+        self.assertFalse(Follow.objects.exists())
+        self.assertEqual(self.client.get("/api/following/star/coins/").status_code, 403)
+
+    def test_remove_follower(self):
+        Follow.objects.create(follower=self.star, followee=self.user)
+        response = self.client.post("/api/remove-follower/", {"username": "star"}, format="json")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(Follow.objects.exists())
+
+    def test_team_is_transitive_over_mutual_follows(self):
+        """Mutual follows chain into one team; one-way follows do not"""
+        third = Account.objects.create(username="third", hashed_password="pw")
+        loner = Account.objects.create(username="loner", hashed_password="pw")
+        for a, b in ((self.user, self.star), (self.star, third)):
+            Follow.objects.create(follower=a, followee=b)
+            Follow.objects.create(follower=b, followee=a)
+        Follow.objects.create(follower=loner, followee=self.user)
+
+        self.assertEqual(Follow.team_ids(self.user.id), {self.user.id, self.star.id, third.id})
+        self.assertEqual(Follow.team_ids(loner.id), {loner.id})
+
+
+class TeamLabelTests(APITestCase):
+    def setUp(self):
+        self.a, self.b, self.c, self.d = (
+            Account.objects.create(username=name, hashed_password="pw") for name in "abcd"
+        )
+
+    def as_user(self, account):
+        session = self.client.session
+        session["user_id"] = account.id
+        session.save()
+
+    def mutual(self, x, y):
+        self.as_user(x)
+        self.client.post("/api/follow/", {"username": y.username}, format="json")
+        self.as_user(y)
+        self.client.post("/api/follow/", {"username": x.username}, format="json")
+
+    def team(self, account):
+        account.refresh_from_db()
+        return teams.team_member_ids(account)
+
+    def test_follows_merge_and_unfollows_split_teams(self):
+        self.mutual(self.a, self.b)
+        self.mutual(self.c, self.d)
+        self.assertEqual(self.team(self.a), {self.a.id, self.b.id})
+        self.mutual(self.b, self.c)
+        everyone = {self.a.id, self.b.id, self.c.id, self.d.id}
+        self.assertEqual(self.team(self.d), everyone)
+
+        # b unfollows c: c still follows b, but one-way follows do not make a team
+        self.as_user(self.b)
+        self.client.post("/api/unfollow/", {"username": "c"}, format="json")
+        self.assertEqual(self.team(self.a), {self.a.id, self.b.id})
+        self.assertEqual(self.team(self.d), {self.c.id, self.d.id})
+
+        # a removes follower b: a is alone again
+        self.as_user(self.a)
+        self.client.post("/api/remove-follower/", {"username": "b"}, format="json")
+        self.assertEqual(self.team(self.a), {self.a.id})
+        self.assertEqual(self.team(self.b), {self.b.id})
+
+    def test_team_lookup_is_one_query(self):
+        self.mutual(self.a, self.b)
+        self.mutual(self.b, self.c)
+        self.a.refresh_from_db()
+        with self.assertNumQueries(1):
+            self.assertEqual(teams.team_member_ids(self.a), {self.a.id, self.b.id, self.c.id})
+
+    def test_team_lock_follows_a_concurrent_relabel(self):
+        """A team relabelled between reading the label and locking is locked under its new label"""
+        self.mutual(self.a, self.b)
+        self.mutual(self.c, self.d)
+        label = Account.objects.get(id=self.a.id).team_label
+        real_label = teams._label
+        stale = iter([self.c.id])  # c's label as read before its team merged into a's
+        with mock.patch.object(teams, "_label", side_effect=lambda account_id: next(stale, None) or real_label(account_id)):
+            Account.objects.filter(id__in=[self.c.id, self.d.id]).update(team_label=label)
+            self.assertEqual(teams._lock_teams(self.c.id, self.a.id), {self.c.id: label, self.a.id: label})
+
+    def test_rebuild_repairs_drift(self):
+        self.mutual(self.a, self.b)
+        for x, y in ((self.c, self.d), (self.d, self.c)):
+            Follow.objects.create(follower=x, followee=y)  # written behind the index's back
+        Account.objects.filter(id=self.a.id).update(team_label=None)
+
+        self.assertEqual(teams.rebuild_team_labels(), 4)
+        self.assertEqual(self.team(self.a), {self.a.id, self.b.id})
+        self.assertEqual(self.team(self.c), {self.c.id, self.d.id})
+        self.assertEqual(teams.rebuild_team_labels(), 0)
+
+@override_settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db")
+@override_settings(CONDITIONAL_GET=True)
+class ConditionalGetTests(APITestCase):
+    def setUp(self):
+        # tokens and cached bodies live in the cache, which outlives each test's transaction
+        cache.clear()
+        self.user = Account.objects.create(username="poller", hashed_password="pw")
+        self.tamagotchi = Tamagotchi.objects.create(user=self.user)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+
+    def test_unchanged_resource_returns_304_without_orm_queries(self):
+        """A matching If-None-Match is answered with 304 without any query"""
+        response = self.client.get("/api/me/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        etag = response["ETag"]
+
+        with self.assertNumQueries(0):  # the session is read from the cache
+            response = self.client.get("/api/me/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_write_changes_etag(self):
+        """Saving the account (e.g. new coins) invalidates the previous ETag once committed"""
+        etag = self.client.get("/api/me/")["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.coins = 50
+            self.user.save()
+
+        response = self.client.get("/api/me/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()["coins"], 50)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_scopes_are_independent(self):
+        """A new notification does not invalidate the health ETag, and the overdue sweeper does"""
+        health_etag = self.client.get("/api/tamagotchi/health/")["ETag"]
+        notifications_etag = self.client.get("/api/notifications/")["ETag"]
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Notification.objects.create(user=self.user, message="hi")
+        self.assertEqual(self.client.get("/api/notifications/", HTTP_IF_NONE_MATCH=notifications_etag).status_code, 200)
+        self.assertEqual(self.client.get("/api/tamagotchi/health/", HTTP_IF_NONE_MATCH=health_etag).status_code, 304)
+
+        Task.objects.bulk_create([Task(user=self.user, name="late", priority="Low",
+                                       deadline=timezone.localdate() - timedelta(days=1))])
+        with self.captureOnCommitCallbacks(execute=True):
+            sweep_overdue_tasks()
+        response = self.client.get("/api/tamagotchi/health/", HTTP_IF_NONE_MATCH=health_etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["health"], 4.0)
+
+    def test_account_and_tamagotchi_resolved_in_one_query(self):
+        """request.account loads the tamagotchi with the account"""
+        with self.assertNumQueries(1):  # account + tamagotchi
+            response = self.client.get("/api/tamagotchi/health/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_hot_read_served_from_cache_until_write(self):
+        """Without If-None-Match, a repeated health poll is answered from the cache"""
+        self.assertEqual(self.client.get("/api/tamagotchi/health/").json()["health"], 5.0)
+        with self.assertNumQueries(0):
+            response = self.client.get("/api/tamagotchi/health/")
+        self.assertEqual(response.json()["health"], 5.0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tamagotchi.health = 2.0
+            self.tamagotchi.save()
+        self.assertEqual(self.client.get("/api/tamagotchi/health/").json()["health"], 2.0)
+
+
+    def _async_me(self, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        request = AsyncRequestFactory().get("/api/me/", headers=headers)
+        request.session = self.client.session
+        return async_to_sync(async_me)(request)
+
+    def test_async_me_shares_etags_and_cached_bodies(self):
+        """The ASGI variant of /api/me/ answers with the same ETags and cached bodies"""
+        response = self.client.get("/api/me/")
+        etag, expected = response["ETag"], response.json()
+
+        response = self._async_me(etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response["ETag"], etag)
+        with self.assertNumQueries(0):
+            response = self._async_me()
+        self.assertEqual(json.loads(response.content), expected)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.coins = 50
+            self.user.save()
+        with self.assertNumQueries(1):  # account + tamagotchi
+            response = self._async_me(etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(json.loads(response.content)["coins"], 50)
+        self.assertNotEqual(response["ETag"], etag)
+        self.assertEqual(self.client.get("/api/me/", HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 304)
+
+    @override_settings(CONDITIONAL_GET=False)
+    def test_disabled_without_a_shared_cache(self):
+        """Without a shared cache every poll is answered from the database, with no ETag"""
+        response = self.client.get("/api/me/")
+        self.assertNotIn("ETag", response)
+        self.client.get("/api/me/")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.coins = 50
+            self.user.save(update_fields=['coins'])
+        self.assertEqual(self.client.get("/api/me/").json()["coins"], 50)
+
+    def test_run_scheduler_refuses_a_per_process_cache(self):
+        with override_settings(CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}}):
+            with self.assertRaises(CommandError):
+                call_command("run_scheduler", "--once")
+
+
+class StaleAccountWriteTests(APITestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="shopper", hashed_password="pw", coins=100)
+        Tamagotchi.objects.create(user=self.user)
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        # the row as a request loaded it, before other writers moved the counters and health
+        self.stale = Account.objects.select_related('tamagotchi').get(id=self.user.id)
+        Account.objects.filter(id=self.user.id).update(tasks_version=7, unread_notifications=3, team_label=5)
+        Tamagotchi.objects.filter(user=self.user).update(health=2.0, xp=40)
+
+    def assertCountersKept(self):
+        account = Account.objects.select_related('tamagotchi').get(id=self.user.id)
+        self.assertEqual((account.tasks_version, account.unread_notifications, account.team_label), (7, 3, 5))
+        self.assertEqual((account.tamagotchi.health, account.tamagotchi.xp), (2.0, 40))
+        return account
+
+    def test_purchase_writes_only_coins_and_outfits(self):
+        with mock.patch("users.middleware.get_account", return_value=self.stale):
+            response = self.client.post("/api/tamagotchi/purchase-outfit/", {"outfit_id": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        account = self.assertCountersKept()
+        self.assertEqual(account.coins, 50)
+        self.assertEqual(account.tamagotchi.unlocked_outfits, [1, 2])
+
+    def test_purchase_checks_fresh_coins(self):
+        Account.objects.filter(id=self.user.id).update(coins=10)
+        with mock.patch("users.middleware.get_account", return_value=self.stale):
+            response = self.client.post("/api/tamagotchi/purchase-outfit/", {"outfit_id": 2}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Account.objects.get(id=self.user.id).coins, 10)
+
+    def test_account_update_writes_only_submitted_fields(self):
+        response = self.client.patch(f"/api/users/{self.user.id}/", {"coins": 60}, format="json")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.assertCountersKept().coins, 60)
+
+
+class ClearExpiredSessionsTests(TestCase):
+    def test_expired_sessions_are_deleted(self):
+        """The scheduled purge removes expired database sessions and keeps live ones"""
+        now = timezone.now()
+        Session.objects.create(session_key="expired", session_data="", expire_date=now - timedelta(days=1))
+        Session.objects.create(session_key="live", session_data="", expire_date=now + timedelta(days=1))
+
+        with self.settings(SESSION_ENGINE="django.contrib.sessions.backends.cached_db"):
+            self.assertTrue(clear_expired_sessions())
+        self.assertEqual(list(Session.objects.values_list("session_key", flat=True)), ["live"])
+
+
+class StreamTests(TestCase):
+    def setUp(self):
+        self.user = Account.objects.create(username="watcher", hashed_password="pw")
+        session = self.client.session
+        session["user_id"] = self.user.id
+        session.save()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        # the test client does not close streams it leaves unfinished
+        self.addCleanup(streaming.hub.queues.clear)
+
+    async def test_pushes_changed_scopes_to_the_user(self):
+        response = await self.async_client.get("/api/stream/")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        events = aiter(response.streaming_content)
+        self.assertEqual(await anext(events), b"retry: 5000\n\n")
+
+        # another user's change is not delivered; the burst for this user is one event per scope
+        streaming.publish([self.user.id + 1], ["tasks"])
+        streaming.publish([self.user.id], ["health", "profile"])
+        streaming.publish([self.user.id], ["health"])
+        self.assertEqual(
+            await asyncio.wait_for(anext(events), 1),
+            b'event: health\ndata: {"scope": "health"}\n\n'
+            b'event: profile\ndata: {"scope": "profile"}\n\n',
+        )
+
+        # leaderboard broadcasts reach everyone, at most once per interval
+        with mock.patch.object(streaming, "LEADERBOARD_INTERVAL", 0.2):
+            streaming.publish(None, ["leaderboard"])
+            self.assertEqual(await asyncio.wait_for(anext(events), 1), b'event: leaderboard\ndata: {"scope": "leaderboard"}\n\n')
+            streaming.publish(None, ["leaderboard"])
+            streaming.publish([self.user.id], ["notifications"])
+            self.assertEqual(await asyncio.wait_for(anext(events), 1), b'event: notifications\ndata: {"scope": "notifications"}\n\n')
+            self.assertEqual(await asyncio.wait_for(anext(events), 1), b'event: leaderboard\ndata: {"scope": "leaderboard"}\n\n')
+
+    async def test_closing_the_stream_unsubscribes(self):
+        events = streaming.event_stream(self.user.id)
+        await anext(events)
+        self.assertIn(self.user.id, streaming.hub.queues)
+        await events.aclose()
+        self.assertNotIn(self.user.id, streaming.hub.queues)
+
+    async def test_requires_login(self):
+        self.async_client.cookies.clear()
+        response = await self.async_client.get("/api/stream/")
+        self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_refused_under_wsgi(self):
+        self.assertEqual(self.client.get("/api/stream/").status_code, 501)
+
+    async def test_redis_listener_reconnects_and_resyncs(self):
+        class PubSub:
+            async def listen(self):
+                yield {"type": "subscribe", "data": 1}
+                yield {"type": "message", "data": json.dumps({"users": [1], "scopes": ["tasks"]})}
+                await asyncio.Event().wait()
+
+            async def aclose(self):
+                pass
+
+        backend = streaming.RedisBackend.__new__(streaming.RedisBackend)
+        subscribe = mock.AsyncMock(side_effect=[ConnectionError("redis is down"), PubSub()])
+        queue = streaming.hub.subscribe(1)
+        with mock.patch.object(backend, "subscribe", subscribe), mock.patch.object(streaming, "RECONNECT_DELAY", 0), \
+                self.assertLogs("users.streaming", level="WARNING"):
+            listener = asyncio.create_task(backend.listen())
+            try:
+                # everyone re-fetches after the outage, then messages flow again
+                self.assertEqual(await asyncio.wait_for(queue.get(), 1), frozenset(streaming.RESYNC_SCOPES))
+                self.assertEqual(await asyncio.wait_for(queue.get(), 1), frozenset(["tasks"]))
+            finally:
+                listener.cancel()
+                streaming.hub.unsubscribe(1, queue)
+        self.assertEqual(subscribe.await_count, 2)
+
+    @override_settings(CONDITIONAL_GET=True)
+    def test_cache_and_stream_outages_do_not_fail_committed_writes(self):
+        after = mock.Mock()
+        failing_backend = mock.Mock(**{"publish.side_effect": ConnectionError("redis is down")})
+        with mock.patch("users.versioning.cache.set_many", side_effect=ConnectionError("redis is down")), \
+                mock.patch.object(streaming, "get_backend", return_value=failing_backend), \
+                self.assertLogs("users", level="ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(user=self.user, message="hi")
+                transaction.on_commit(after)
+        failing_backend.publish.assert_called_once()
+        after.assert_called_once()
+
+    def test_version_bumps_are_published_on_commit(self):
+        with mock.patch("users.versioning.publish") as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                Notification.objects.create(user=self.user, message="hi")
+        publish.assert_called_once_with({self.user.id}, ("notifications",))
@@ -0,0 +1,192 @@
+"""
+Per-user version tokens for conditional GETs (ETag / If-None-Match).
+
+Every user has one token per scope, kept in the cache:
+    tasks          the user's tasks
+    health         tamagotchi health
+    profile        coins, level, xp and outfits (the /api/me/ payload)
+    notifications  the user's notifications
+    connections    followers / following
+
+Writes replace the token after their transaction commits (model signals below, plus explicit
+bump_versions() calls for queryset.update() / bulk paths). Polled views wrapped in
+conditional_get() compare the client's If-None-Match against the current token and answer
+304 Not Modified before the view, and therefore the ORM, runs.
+
+Tokens are random, so a cache restart can only cause extra 200s, never a wrong 304.
+Each bump is also published to the users' open streams (users.streaming).
+A token is only correct if every process that writes sees the same cache, so conditional_get()
+does nothing unless settings.CONDITIONAL_GET is on (it is when a shared cache, REDIS_URL, is
+configured), and `run_scheduler` refuses to start on a per-process cache.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+from functools import wraps
+from uuid import uuid4
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.http import parse_etags
+from rest_framework.response import Response
+
+from .streaming import publish
+
+logger = logging.getLogger(__name__)
+
+SCOPES = ('tasks', 'health', 'profile', 'notifications', 'connections')
+
+
+def _key(user_id, scope):
+    return f"version:{scope}:{user_id}"
+
+
+def get_version(user_id, scope):
+    """Return the user's current token for `scope`, creating one if the cache has none."""
+    key = _key(user_id, scope)
+    version = cache.get(key)
+    if version is None:
+        version = uuid4().hex
+        # add() so that concurrent first readers all end up with the same token
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def bump_versions(user_ids, *scopes):
+    """Give each user a fresh token for every scope once the current transaction commits."""
+    user_ids = set(user_ids)
+    keys = [_key(user_id, scope) for user_id in user_ids for scope in scopes]
+    if keys:
+        def commit():
+            # the write has committed: a cache or Redis outage must not fail it (or the callbacks
+            # after this one), so errors are logged, not raised
+            if settings.CONDITIONAL_GET:
+                try:
+                    cache.set_many({key: uuid4().hex for key in keys}, timeout=None)
+                except Exception:
+                    logger.exception("Could not bump %s versions for users %s", scopes, sorted(user_ids))
+            # wake the users' open /api/stream/ connections (publish() logs its own failures)
+            publish(user_ids, scopes)
+        transaction.on_commit(commit)
+
+
+def bump_version(user_id, *scopes):
+    bump_versions([user_id], *scopes)
+
+
+def make_etag(user_id, scope, path):
+    """Strong ETag for one user, scope and request path (query string included)."""
+    digest = hashlib.sha1(f"{get_version(user_id, scope)}:{path}".encode()).hexdigest()[:20]
+    return f'"{scope}-{digest}"'
+
+
+def conditional_get(scope, cache_timeout=None):
+    """
+    View decorator: tag GET responses with the user's `scope` ETag and answer a matching
+    If-None-Match with 304 without running the view.
+    With `cache_timeout` (seconds), 200 bodies are also cached under their ETag, so a client
+    without a cached copy is answered without the view too. The ETag changes on every write,
+    so a cached body is never stale; the timeout only bounds how long it is kept.
+    Use on function views, or on class views through method_decorator; async function views
+    (returning JsonResponse) get an async wrapper.
+    """
+    def decorator(view_func):
+        if asyncio.iscoroutinefunction(view_func):
+            return _async_conditional_get(view_func, scope, cache_timeout)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            user_id = request.session.get("user_id")
+            if not settings.CONDITIONAL_GET or not user_id or request.method not in ('GET', 'HEAD'):
+                return view_func(request, *args, **kwargs)
+
+            # computed before the view runs: a write that races the view only costs an extra 200
+            etag = make_etag(user_id, scope, request.get_full_path())
+            body_key = f"response:{user_id}:{etag}"
+            if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+                response = Response(status=304)
+            elif cache_timeout and (data := cache.get(body_key)) is not None:
+                response = Response(data)
+            else:
+                response = view_func(request, *args, **kwargs)
+                if cache_timeout and response.status_code == 200:
+                    cache.set(body_key, response.data, cache_timeout)
+            return _tag(response, etag)
+        return wrapper
+    return decorator
+
+
+def _async_conditional_get(view_func, scope, cache_timeout):
+    """conditional_get() for async views; bodies are cached as the decoded JSON, as the sync wrapper does."""
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        user_id = await request.session.aget("user_id")
+        if not settings.CONDITIONAL_GET or not user_id or request.method not in ('GET', 'HEAD'):
+            return await view_func(request, *args, **kwargs)
+
+        etag = await sync_to_async(make_etag)(user_id, scope, request.get_full_path())
+        body_key = f"response:{user_id}:{etag}"
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        elif cache_timeout and (data := await cache.aget(body_key)) is not None:
+            response = JsonResponse(data, safe=False)
+        else:
+            response = await view_func(request, *args, **kwargs)
+            if cache_timeout and response.status_code == 200:
+                await cache.aset(body_key, json.loads(response.content), cache_timeout)
+        return _tag(response, etag)
+    return wrapper
+
+
+def _tag(response, etag):
+    if response.status_code in (200, 304):
+        response['ETag'] = etag
+        # browsers keep the body and revalidate with If-None-Match on every poll
+        response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+# ---------------------------------------------------------------------------
+# Signal receivers: any save / delete through the ORM bumps the owner's tokens.
+# Connected in UsersConfig.ready().
+# ---------------------------------------------------------------------------
+
+def _task_changed(sender, instance, **kwargs):
+    bump_version(instance.user_id, 'tasks')
+
+
+def _tamagotchi_changed(sender, instance, **kwargs):
+    bump_version(instance.user_id, 'health', 'profile')
+
+
+def _account_changed(sender, instance, **kwargs):
+    bump_version(instance.id, 'profile', 'connections')
+
+
+def _follow_changed(sender, instance, **kwargs):
+    bump_versions([instance.follower_id, instance.followee_id], 'connections')
+
+
+def _notification_changed(sender, instance, **kwargs):
+    bump_version(instance.user_id, 'notifications')
+
+
+RECEIVERS = {
+    'tasks.Task': _task_changed,
+    'tamagotchi.Tamagotchi': _tamagotchi_changed,
+    'users.Account': _account_changed,
+    'users.Follow': _follow_changed,
+    'users.Notification': _notification_changed,
+}
+
+
+def connect_signals():
+    for sender, receiver in RECEIVERS.items():
+        post_save.connect(receiver, sender=sender, dispatch_uid=f'versioning-save-{sender}')
+        post_delete.connect(receiver, sender=sender, dispatch_uid=f'versioning-delete-{sender}')
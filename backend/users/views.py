@@ -4,10 +4,19 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view 
 from django.contrib.auth.hashers import check_password, make_password
 from django.contrib.auth import logout  
+from django.conf import settings
+from django.db import transaction
 from .serializers import AccountSerializer, NotificationSerializer
 from .models import Account
 from tamagotchi.models import Tamagotchi
-from .models import Account, Notification
+from .models import Account, Follow, Notification
+from . import teams
+from .pagination import NotificationCursorPagination
+from .versioning import conditional_get
+from django.utils.decorators import method_decorator
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from .streaming import event_stream
 
 
 class UserView(viewsets.ModelViewSet):
@@ -51,33 +60,52 @@ class LoginView(APIView):
         }, status=status.HTTP_200_OK)
 
 @api_view(['GET'])
+@conditional_get('profile', cache_timeout=settings.READ_CACHE_TTL)
 def me(request):
     """Return currently logged-in user's info + tamagotchi summary."""
     user_id = request.session.get("user_id")
     if not user_id:
         return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
+    user = request.account
+    if not user:
+        return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
+    return Response(_profile(user))
+
+
+@require_GET
+@conditional_get('profile', cache_timeout=settings.READ_CACHE_TTL)
+async def async_me(request):
+    """Async variant of me(), routed instead of it when settings.ASYNC_VIEWS is on (ASGI)."""
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+    # account and tamagotchi come in one joined query, so there is nothing to run concurrently
+    user = await Account.objects.select_related('tamagotchi').filter(id=user_id).afirst()
+    if not user:
+        return JsonResponse({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
+    return JsonResponse(_profile(user))
+
+
+def _profile(user):
+    # attach tamagotchi info
     try:
-        user = Account.objects.get(id=user_id)
-        # attach tamagotchi info
-        try:
-            t = user.tamagotchi
-            tama = {
-                "level": t.level,
-                "outfit": t.outfit,
-                "unlocked_outfits": t.unlocked_outfits,
-                "xp": getattr(t, "xp", 0) if getattr(t, "xp", None) is not None else 0,
-            }
-        except Tamagotchi.DoesNotExist:
-            tama = {"level": 1, "outfit": 1, "unlocked_outfits": [1], "xp": 0}
+        t = user.tamagotchi
+        tama = {
+            "level": t.level,
+            "outfit": t.outfit,
+            "unlocked_outfits": t.unlocked_outfits,
+            "xp": getattr(t, "xp", 0) if getattr(t, "xp", None) is not None else 0,
+        }
+    except Tamagotchi.DoesNotExist:
+        tama = {"level": 1, "outfit": 1, "unlocked_outfits": [1], "xp": 0}
 
-        return Response({
-            "username": user.username,
-            "coins": user.coins,
-            **tama
-        })
-    except Account.DoesNotExist:
-        return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
+    return {
+        "username": user.username,
+        "coins": user.coins,
+        **tama
+    }
 
 class PurchaseOutfitView(APIView):
     """
@@ -113,36 +141,39 @@ class PurchaseOutfitView(APIView):
             9: 50000,  # strawberry
         }
 
-        try:
-            user = Account.objects.get(id=user_id)
-            tama = user.tamagotchi
-        except (Account.DoesNotExist, Tamagotchi.DoesNotExist):
+        user = request.account
+        if not user or getattr(user, "tamagotchi", None) is None:
             return Response({"error": "Account/Tamagotchi not found"}, status=status.HTTP_404_NOT_FOUND)
-
-        unlocked = list(tama.unlocked_outfits or [])
         price = price_map[outfit_id]
 
-        # Already unlocked? nothing to charge; return success
-        if outfit_id in unlocked:
-            return Response({
-                "coins": user.coins,
-                "unlocked_outfits": unlocked
-            }, status=status.HTTP_200_OK)
+        with transaction.atomic():
+            # Re-read both rows under lock (account first, same order as task writes) and write back
+            # only the changed columns, so counters and health maintained elsewhere are not reverted
+            account = Account.objects.select_for_update().get(id=user.id)
+            tama = Tamagotchi.objects.select_for_update().get(user=account)
+            unlocked = list(tama.unlocked_outfits or [])
+
+            # Already unlocked? nothing to charge; return success
+            if outfit_id in unlocked:
+                return Response({
+                    "coins": account.coins,
+                    "unlocked_outfits": unlocked
+                }, status=status.HTTP_200_OK)
 
-        # Check coins
-        if user.coins < price:
-            return Response({"error": "Not enough coins"}, status=status.HTTP_400_BAD_REQUEST)
+            # Check coins
+            if account.coins < price:
+                return Response({"error": "Not enough coins"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Deduct + unlock
-        user.coins -= price
-        user.save()
+            # Deduct + unlock
+            account.coins -= price
+            account.save(update_fields=['coins'])
 
-        unlocked.append(outfit_id)
-        tama.unlocked_outfits = unlocked
-        tama.save()
+            unlocked.append(outfit_id)
+            tama.unlocked_outfits = unlocked
+            tama.save(update_fields=['unlocked_outfits'])
 
         return Response({
-            "coins": user.coins,
+            "coins": account.coins,
             "unlocked_outfits": unlocked
         }, status=status.HTTP_200_OK)
 
@@ -167,10 +198,9 @@ class SetOutfitView(APIView):
         if outfit_id < 1 or outfit_id > 9:
             return Response({"error": "outfit_id must be 1..9"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            user = Account.objects.get(id=user_id)
-            tama = user.tamagotchi
-        except (Account.DoesNotExist, Tamagotchi.DoesNotExist):
+        user = request.account
+        tama = getattr(user, "tamagotchi", None) if user else None
+        if tama is None:
             return Response({"error": "Account/Tamagotchi not found"}, status=status.HTTP_404_NOT_FOUND)
 
         unlocked = set(tama.unlocked_outfits or [])
@@ -178,7 +208,7 @@ class SetOutfitView(APIView):
             return Response({"error": "Outfit not unlocked"}, status=status.HTTP_400_BAD_REQUEST)
 
         tama.outfit = outfit_id
-        tama.save()
+        tama.save(update_fields=['outfit'])
 
         return Response({"outfit": tama.outfit}, status=status.HTTP_200_OK)
 
@@ -190,6 +220,7 @@ class LogoutView(APIView):
         logout(request) 
         return Response({"message": "Logged out successfully"}, status=status.HTTP_200_OK)
 
+@method_decorator(conditional_get('connections'), name='get')
 class UserConnectionsView(APIView):
     """Return both followers and following lists for the current user."""
 
@@ -198,14 +229,15 @@ class UserConnectionsView(APIView):
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
+        following = Follow.objects.filter(follower=user).order_by('id').values_list('followee__username', flat=True)
+        followers = Follow.objects.filter(followee=user).order_by('id').values_list('follower__username', flat=True)
         return Response({
-            "following": user.following or [],
-            "followers": user.followers or [],
+            "following": list(following),
+            "followers": list(followers),
         }, status=status.HTTP_200_OK)
 
 class FollowUserView(APIView):
@@ -216,9 +248,8 @@ class FollowUserView(APIView):
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            current_user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        current_user = request.account
+        if not current_user:
             return Response({"error": "Your account was not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # target user
@@ -234,25 +265,24 @@ class FollowUserView(APIView):
         if target_user.username == current_user.username:
             return Response({"error": "You cannot follow yourself."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # check if already following
-        if target_user.username in (current_user.following or []):
-            return Response({"detail": "You already follow this user."}, status=status.HTTP_200_OK)
-
-        # update following / followers lists
-        current_user.following.append(target_user.username)
-        current_user.save()
-        target_user.followers.append(current_user.username)
-        target_user.save()
-
-        # create notification for user being followed
-        Notification.objects.create(
-            user=target_user,
-            message=f"{current_user.username} started following you!"
-        )
+        # one edge row; the unique constraint makes concurrent follows safe
+        with transaction.atomic():
+            _, created = Follow.objects.get_or_create(follower=current_user, followee=target_user)
+            if not created:
+                return Response({"detail": "You already follow this user."}, status=status.HTTP_200_OK)
+            if Follow.is_following(target_user, current_user):
+                teams.link(current_user.id, target_user.id)
+
+            # create notification for user being followed
+            Notification.objects.create(
+                user=target_user,
+                message=f"{current_user.username} started following you!",
+                kind=Notification.FOLLOW,
+                actor=current_user,
+            )
 
         return Response({
             "detail": f"You are now following {target_user.username}.",
-            "following": current_user.following,
         }, status=status.HTTP_200_OK)
 
 class UnfollowUserView(APIView):
@@ -263,9 +293,8 @@ class UnfollowUserView(APIView):
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            current_user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        current_user = request.account
+        if not current_user:
             return Response({"error": "Your account was not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # target user
@@ -277,17 +306,13 @@ class UnfollowUserView(APIView):
         except Account.DoesNotExist:
             return Response({"error": "That user does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
-        # check if following user
-        if target_username not in (current_user.following or []):
-            return Response({"detail": "You are not following this user."}, status=400)
-
-        # remove from following/followers
-        current_user.following.remove(target_username)
-        current_user.save()
-
-        if current_user.username in (target_user.followers or []):
-            target_user.followers.remove(current_user.username)
-            target_user.save()
+        # remove the edge; nothing deleted means we were not following
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=current_user, followee=target_user).delete()
+            if not deleted:
+                return Response({"detail": "You are not following this user."}, status=400)
+            if Follow.is_following(target_user, current_user):
+                teams.unlink(current_user.id, target_user.id)
 
         return Response({"detail": f"You have unfollowed {target_username}."}, status=200)
 
@@ -299,9 +324,8 @@ class RemoveFollowerView(APIView):
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Your account was not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # follower
@@ -314,12 +338,10 @@ class RemoveFollowerView(APIView):
             return Response({"error": "That user does not exist."}, status=status.HTTP_404_NOT_FOUND)
 
         # remove follower
-        if follower_username in (user.followers or []):
-            user.followers.remove(follower_username)
-            user.save()
-        if user.username in (follower.following or []):
-            follower.following.remove(user.username)
-            follower.save()
+        with transaction.atomic():
+            deleted, _ = Follow.objects.filter(follower=follower, followee=user).delete()
+            if deleted and Follow.is_following(user, follower):
+                teams.unlink(user.id, follower.id)
 
         return Response({"detail": f"{follower_username} removed from your followers."}, status=200)
 
@@ -329,9 +351,8 @@ class FollowingCoinsView(APIView):
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
             return Response({"error": "Account not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # check that target exists
@@ -341,27 +362,92 @@ class FollowingCoinsView(APIView):
             return Response({"error": "Target user not found"}, status=status.HTTP_404_NOT_FOUND)
 
         # check that target is followed by current user
-        following_list = user.following or []
-        if target.username not in following_list:
+        if not Follow.is_following(user, target):
             return Response({"detail": "You are not following this user."},
                             status=status.HTTP_403_FORBIDDEN)
 
         # return the target user's coins
         return Response({"username": target.username, "coins": target.coins}, status=status.HTTP_200_OK)
 
+@method_decorator(conditional_get('notifications'), name='get')
 class NotificationsView(APIView):
-    """Return all notifications for the current logged-in user."""
+    """Return the current user's notifications, newest first, one cursor page at a time."""
 
     def get(self, request):
         user_id = request.session.get("user_id")
         if not user_id:
             return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
 
-        try:
-            user = Account.objects.get(id=user_id)
-        except Account.DoesNotExist:
+        user = request.account
+        if not user:
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        paginator = NotificationCursorPagination()
+        page = paginator.paginate_queryset(Notification.objects.filter(user=user), request, view=self)
+        serializer = NotificationSerializer(page, many=True)
+        return paginator.get_paginated_response(serializer.data)
+
+@method_decorator(conditional_get('notifications'), name='get')
+class UnreadNotificationsCountView(APIView):
+    """Return the number of unread notifications, from the account's counter."""
+
+    def get(self, request):
+        user_id = request.session.get("user_id")
+        if not user_id:
+            return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        user = request.account
+        if not user:
+            return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({"unread": user.unread_notifications}, status=status.HTTP_200_OK)
+
+class MarkNotificationsReadView(APIView):
+    """
+    POST { ids: [int, ...] }  mark these notifications read
+    POST { up_to: int }       mark this notification and every older one read
+    """
+
+    def post(self, request):
+        user_id = request.session.get("user_id")
+        if not user_id:
+            return Response({"error": "Not authenticated"}, status=status.HTTP_401_UNAUTHORIZED)
+
+        user = request.account
+        if not user:
             return Response({"error": "User not found"}, status=status.HTTP_404_NOT_FOUND)
 
-        notifications = Notification.objects.filter(user=user).order_by('-created_at')
-        serializer = NotificationSerializer(notifications, many=True)
-        return Response(serializer.data, status=status.HTTP_200_OK)
\ No newline at end of file
+        ids = request.data.get("ids")
+        up_to = request.data.get("up_to")
+        if ids is not None:
+            if not isinstance(ids, list) or not all(isinstance(i, int) for i in ids):
+                return Response({"error": "ids must be a list of notification ids."}, status=status.HTTP_400_BAD_REQUEST)
+            marked = Notification.mark_read(user.id, ids=ids)
+        elif isinstance(up_to, int):
+            marked = Notification.mark_read(user.id, up_to=up_to)
+        else:
+            return Response({"error": "Provide ids or up_to."}, status=status.HTTP_400_BAD_REQUEST)
+
+        user.refresh_from_db(fields=['unread_notifications'])
+        return Response({"marked": marked, "unread": user.unread_notifications}, status=status.HTTP_200_OK)
+
+@require_GET
+async def stream(request):
+    """
+    Server-Sent Events: one event per changed scope (tasks, health, profile, notifications,
+    connections, leaderboard) for the logged-in user; see users.streaming.
+    Needs an ASGI server; the connection stays open until the client closes it.
+    """
+    if 'wsgi.version' in request.META:
+        # a WSGI worker would be held (and the stream buffered) for as long as the client stays
+        return JsonResponse({"error": "Streaming needs the ASGI server"}, status=501)
+
+    user_id = await request.session.aget("user_id")
+    if not user_id:
+        return JsonResponse({"error": "Not authenticated"}, status=401)
+
+    response = StreamingHttpResponse(event_stream(user_id), content_type="text/event-stream")
+    response['Cache-Control'] = 'no-cache'
+    # tell nginx-style proxies not to buffer the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
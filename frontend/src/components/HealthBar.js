@@ -1,6 +1,7 @@
 import React, { useState, useEffect, useImperativeHandle, forwardRef } from "react";
 import heartIcon from "../assets/heart.png";
 import axios from "axios";
+import { subscribe, isStreaming } from "../utils/stream";
 
 const HealthBar = forwardRef(({ health: healthProp }, ref) => {
   const [health, setHealth] = useState(5);
@@ -18,8 +19,15 @@ const HealthBar = forwardRef(({ health: healthProp }, ref) => {
 
   useEffect(() => {
     fetchHealth();
-    const interval = setInterval(fetchHealth, 3000);
-    return () => clearInterval(interval);
+    const unsubscribe = subscribe("health", fetchHealth);
+    // polling only while the stream is down
+    const interval = setInterval(() => {
+      if (!isStreaming()) fetchHealth();
+    }, 3000);
+    return () => {
+      clearInterval(interval);
+      unsubscribe();
+    };
   }, []);
 
   useEffect(() => {
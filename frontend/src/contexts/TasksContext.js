@@ -1,4 +1,5 @@
-import React, { createContext, useState, useContext, useEffect } from 'react';
+import React, { createContext, useState, useContext, useEffect, useRef } from 'react';
+import { subscribe, isStreaming } from '../utils/stream';
 
 const TasksContext = createContext(null);
 
@@ -24,24 +25,41 @@ export const TasksProvider = ({ children }) => {
     }));
   }
 
-  // Retrieves the user's tasks from django
-  const fetchTasks = async () => {
-    try {
-      // get tasks from backend
-      const response = await fetch("https://backend-purple-field-5089.fly.dev/api/tasks/", {
+  // Follows the cursor pages of /api/tasks/ and returns every task
+  const fetchAllTasks = async () => {
+    let url = "https://backend-purple-field-5089.fly.dev/api/tasks/?page_size=200";
+    const allTasks = [];
+    while (url) {
+      const response = await fetch(url, {
         credentials: "include", // sends Django session cookie
       });
       const data = await response.json();
-
       if (!response.ok) {
-        apiCallError(data, "Failed to fetch tasks");
+        const error = new Error(`Failed to fetch tasks: ${response.status}`);
+        error.data = data;
+        throw error;
       }
+      allTasks.push(...data.results);
+      url = data.next;
+    }
+    return allTasks;
+  };
+
+  // Retrieves the user's tasks from django
+  const fetchTasks = async () => {
+    try {
+      // get tasks from backend
+      const data = await fetchAllTasks();
 
       // display tasks
       console.log("Fetched tasks:", data);
       setTasks(data);
     } catch (error) {
-      networkError(error);
+      if (error.data) {
+        apiCallError(error.data, "Failed to fetch tasks");
+      } else {
+        networkError(error);
+      }
     }
   };
 
@@ -181,87 +199,59 @@ export const TasksProvider = ({ children }) => {
   };
 
 
-  // Polling: check for overdue tasks every interval
+  // Polling: fetch only the tasks that changed since the last poll.
+  // Overdue tasks are marked (and hearts removed) by the backend sweeper job.
+  const syncToken = useRef(null);
   useEffect(() => {
     const POLL_INTERVAL = 5000; // 5 seconds
 
-    const pollOverdueTasks = async () => {
-      try {
-        // fetch all tasks from backend
-        const res = await fetch("https://backend-purple-field-5089.fly.dev/api/tasks/", {
-          credentials: "include",
-        });
-        if (!res.ok) {
-          const text = await res.text();
-          throw new Error(`Failed to fetch tasks: ${res.status} ${text}`);
-        }
-        const allTasks = await res.json();
-
-        const now = new Date();
-
-        // find tasks that are overdue but not completed/overdue yet
-        const overdueTasks = allTasks.filter(task => 
-          task.deadline && new Date(task.deadline) < now &&
-          task.status !== "completed" && task.status !== "overdue"
-        );
+    const pollTasks = async () => {
+      const query = syncToken.current ? `?since=${syncToken.current}` : "";
+      const res = await fetch(`https://backend-purple-field-5089.fly.dev/api/tasks/changes/${query}`, {
+        credentials: "include",
+      });
+      if (!res.ok) {
+        const text = await res.text();
+        throw new Error(`Failed to fetch task changes: ${res.status} ${text}`);
+      }
+      const changes = await res.json();
+      syncToken.current = changes.token;
 
-        await Promise.all(overdueTasks.map(async (task) => {
-          try {
-            // mark task overdue in backend
-            const resp1 = await fetch(`https://backend-purple-field-5089.fly.dev/api/tasks/${task.id}/`, {
-              method: "PATCH",
-              credentials: "include",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify({ status: "overdue" }),
-            });
-            if (!resp1.ok) {
-              const text = await resp1.text();
-              throw new Error(`Failed to mark task overdue: ${resp1.status} ${text}`);
-            }
+      if (changes.reset) {
+        setTasks(changes.tasks);
+        return;
+      }
+      if (changes.tasks.length === 0 && changes.deleted.length === 0) return;
 
-            // decrease Tamagotchi health
-            const resp2 = await fetch("https://backend-purple-field-5089.fly.dev/api/tamagotchi/health/", {
-              method: "POST",
-              credentials: "include",
-              headers: { "Content-Type": "application/json" },
-              body: JSON.stringify({ action: "task_missed" }),
-            });
-            if (!resp2.ok) {
-              const text = await resp2.text();
-              throw new Error(`Failed to decrease health: ${resp2.status} ${text}`);
-            }
-          } catch (err) {
-            if (err instanceof Error) {
-              console.error(`Failed to process overdue task ${task.id}:`, err.message, err.stack);
-            } else {
-              console.error(`Failed to process overdue task ${task.id}:`, err);
-            }
-          }
-        }));
+      // merge the changed tasks into the current list
+      setTasks((prev) => {
+        const changed = new Map(changes.tasks.map((t) => [t.id, t]));
+        const merged = prev
+          .filter((t) => !changes.deleted.includes(t.id))
+          .map((t) => changed.get(t.id) || t);
+        const known = new Set(prev.map((t) => t.id));
+        return [...merged, ...changes.tasks.filter((t) => !known.has(t.id))];
+      });
+    };
 
-        // update frontend state with fresh tasks
-        setTasks(allTasks.map(t => 
-          overdueTasks.find(ot => ot.id === t.id) ? { ...t, status: "overdue" } : t
-        ));
-      } catch (err) {
+    const refresh = () => {
+      pollTasks().catch((err) => {
         if (err instanceof Error) {
           console.error("Failed to poll tasks:", err.message, err.stack);
         } else {
           console.error("Failed to poll tasks:", err);
         }
-      }
+      });
     };
-
+    const unsubscribe = subscribe("tasks", refresh);
+    // polling only while the stream is down
     const interval = setInterval(() => {
-      pollOverdueTasks().catch((err) => {
-        if (err instanceof Error) {
-          console.error("Polling interval error:", err.message, err.stack);
-        } else {
-          console.error("Polling interval error:", err);
-        }
-      });
+      if (!isStreaming()) refresh();
     }, POLL_INTERVAL);
-    return () => clearInterval(interval);
+    return () => {
+      clearInterval(interval);
+      unsubscribe();
+    };
   }, []);
 
   // Global unhandledrejection handler for dev/debug
@@ -96,97 +96,42 @@ function Community() {
 
 
   useEffect(() => {
-    // initialize user following and followers list
-    const fetchConnections = async () => {
+    // Load connections, the weekly challenge, team progress and the global event in one request
+    const fetchCommunitySummary = async () => {
       try {
-        const response = await fetch("https://backend-purple-field-5089.fly.dev/api/connections/", {
+        const response = await fetch("https://backend-purple-field-5089.fly.dev/api/community/summary/", {
           credentials: "include", // include session cookie for authentication
         });
 
-        if (response.ok) {
-          const data = await response.json();
-          setFollowing((data.following || []).map(username => ({ username }))); // convert to objects as expected by frontend code
-          setFollowers((data.followers || []).map(username => ({ username })));
-        } else {
-          console.error("Failed to fetch user connections");
-        }
-      } catch (error) {
-        console.error("Error fetching connections:", error);
-      }
-    };
-
-    fetchConnections();
-
-    // Fetch the weekly challenge from backend
-    const fetchWeeklyChallenge = async () => {
-      try {
-        const response = await fetch("https://backend-purple-field-5089.fly.dev/api/challenges/weekly/", {
-          credentials: "include",
-        });
-
-        if (response.ok) {
-          const data = await response.json();
-          // Transform backend response to match frontend format
-          const challengeObject = {
-            taskCount: data.task_count,
-            priority: data.priority,
-            description: data.description,
-            start: data.start_date,
-            deadline: data.deadline
-          };
-          setWeeklyChallenge(challengeObject);
-        } else {
-          console.error("Failed to fetch weekly challenge");
-        }
-      } catch (error) {
-        console.error("Error fetching weekly challenge:", error);
-      }
-    };
-
-    fetchWeeklyChallenge();
-
-    // Check if user has already joined the challenge
-    const checkChallengeStatus = async () => {
-      try {
-        const response = await fetch("https://backend-purple-field-5089.fly.dev/api/challenges/status/", {
-          credentials: "include",
-        });
-
-        if (response.ok) {
-          const data = await response.json();
-          setHasJoinedChallenge(data.has_joined);
-          
-          // If user has joined, fetch team members and progress
-          if (data.has_joined) {
-            fetchTeamMembers();
-            fetchTeamProgress();
-          }
+        if (!response.ok) {
+          console.error("Failed to fetch community summary");
+          return;
         }
-      } catch (error) {
-        console.error("Error checking challenge status:", error);
-      }
-    };
+        const data = await response.json();
 
-    checkChallengeStatus();
+        setFollowing((data.following || []).map(username => ({ username }))); // convert to objects as expected by frontend code
+        setFollowers((data.followers || []).map(username => ({ username })));
 
-    const fetchGlobalEvent = async () => {
-      try {
-
-        // Get leaderboard for current event -> must happen before current event call in case an event just ended
-        const resLeaderboard = await fetch("https://backend-purple-field-5089.fly.dev/api/events/leaderboard/", {
-          credentials: "include"
+        // Transform backend response to match frontend format
+        setWeeklyChallenge({
+          taskCount: data.challenge.task_count,
+          priority: data.challenge.priority,
+          description: data.challenge.description,
+          start: data.challenge.start_date,
+          deadline: data.challenge.deadline
         });
-        const dataLeaderboard = await resLeaderboard.json();
 
-        if (resLeaderboard.status === 404 || dataLeaderboard.detail === "No active event") {
-          setGlobalEvent(null);
-          setLeaderboard([]);
-          setCurrentUserRank(null);
-          setNoSeasonalEventsActive(true);
-          return;
+        setHasJoinedChallenge(data.has_joined);
+        if (data.has_joined) {
+          setTeamMembers(data.team_members || []);
+          setChallengeProgress({
+            completed: data.team_progress.completed,
+            total: data.team_progress.total
+          });
         }
 
-        if (dataLeaderboard.detail === "Event has ended") {
+        // No running event
+        if (!data.event) {
           setGlobalEvent(null);
           setLeaderboard([]);
           setCurrentUserRank(null);
@@ -195,29 +140,16 @@ function Community() {
         }
 
         setNoSeasonalEventsActive(false);
-
-        // Get current event
-        const resEvent = await fetch("https://backend-purple-field-5089.fly.dev/api/events/current/", {
-          credentials: "include"
-        });
-        const dataEvent = await resEvent.json();
-
-        if (!dataEvent) {
-          setGlobalEvent(null);
-          return;
-        }
-        setGlobalEvent(dataEvent);
-
-        setLeaderboard(dataLeaderboard.leaderboard || []);
-        setCurrentUserRank(dataLeaderboard.your_rank);
-        setCurrentUserCompleted(dataLeaderboard.your_completed_tasks);
-
-      } catch (err) {
-        console.error("Failed to fetch global event data:", err);
+        setGlobalEvent(data.event);
+        setLeaderboard(data.leaderboard.leaderboard || []);
+        setCurrentUserRank(data.leaderboard.your_rank);
+        setCurrentUserCompleted(data.leaderboard.your_completed_tasks);
+      } catch (error) {
+        console.error("Error fetching community summary:", error);
       }
     };
 
-    fetchGlobalEvent();
+    fetchCommunitySummary();
   }, []);
 
   // Fetch team members for the current challenge
@@ -812,7 +744,7 @@ function Community() {
                         </span>
                       </div>
                       <div className="team-member-tasks">
-                        {user.tasks_completed} tasks finished
+                        {user.completed_count} tasks finished
                       </div>
                     </div>
                   ))}
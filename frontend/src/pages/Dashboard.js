@@ -9,6 +9,7 @@ import coinIcon from '../assets/coin-icon.png';
 import UserMenu from '../components/UserMenu';
 import InfoMenu from '../components/InfoMenu';
 import HealthBar from '../components/HealthBar';
+import { subscribe, isStreaming } from '../utils/stream';
 
 // Outfit images
 import bubbleFrog from '../assets/frog-outfits/bubble_frog.png';
@@ -135,9 +136,10 @@ function Dashboard() {
     fetchTasks();
   }, [fetchTasks]);
 
-  // Poll for health every second to reactively update death/revive state
+  // Refresh health when the stream says it changed to reactively update death/revive state;
+  // poll every second only while the stream is down
   useEffect(() => {
-    const interval = setInterval(async () => {
+    const refreshHealth = async () => {
       try {
         const res = await fetch("https://backend-purple-field-5089.fly.dev/api/tamagotchi/health/", {
           credentials: "include",
@@ -149,9 +151,16 @@ function Dashboard() {
       } catch (err) {
         console.error("Health polling failed:", err);
       }
-    }, 1000); 
-
-    return () => clearInterval(interval);
+    };
+    const unsubscribe = subscribe("health", refreshHealth);
+    const interval = setInterval(() => {
+      if (!isStreaming()) refreshHealth();
+    }, 1000);
+
+    return () => {
+      clearInterval(interval);
+      unsubscribe();
+    };
   }, []);
 
   if (loading) {
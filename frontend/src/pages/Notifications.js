@@ -37,7 +37,7 @@ export default function Notifications() {
   const [communityNotifs, setCommunityNotifs] = React.useState([]);
   const RECENT_THRESHOLD = 7;
 
-  // fetch all user notifications
+  // fetch the newest page of user notifications
   useEffect(() => {
     async function fetchCommunityNotifications() {
       try {
@@ -46,7 +46,18 @@ export default function Notifications() {
         });
         if (!response.ok) throw new Error('Failed to fetch notifications');
         const data = await response.json();
-        setCommunityNotifs(data);
+        const notifs = data.results || [];
+        setCommunityNotifs(notifs);
+
+        // everything on the first page has now been seen: mark it (and anything older) read
+        if (notifs.some(n => !n.is_read)) {
+          await fetch('https://backend-purple-field-5089.fly.dev/api/notifications/mark-read/', {
+            method: 'POST',
+            headers: { 'Content-Type': 'application/json' },
+            credentials: 'include',
+            body: JSON.stringify({ up_to: notifs[0].id }),
+          });
+        }
       } catch (err) {
         console.error('Error fetching community notifications:', err);
       }
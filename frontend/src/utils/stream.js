@@ -0,0 +1,38 @@
+// One EventSource per tab on /api/stream/, shared by every component that listens.
+// Events only name what changed (health, tasks, notifications, leaderboard, ...);
+// listeners re-fetch the matching endpoint themselves.
+const STREAM_URL = "https://backend-purple-field-5089.fly.dev/api/stream/";
+
+let source = null;
+const listeners = new Map(); // scope -> Set of callbacks
+
+const open = () => {
+  if (source || typeof EventSource === "undefined") return;
+  source = new EventSource(STREAM_URL, { withCredentials: true });
+  listeners.forEach((callbacks, scope) => {
+    source.addEventListener(scope, () => callbacks.forEach((cb) => cb()));
+  });
+};
+
+export const isStreaming = () => source !== null && source.readyState === EventSource.OPEN;
+
+// Call `callback` whenever `scope` changes; returns the unsubscribe function.
+export const subscribe = (scope, callback) => {
+  if (!listeners.has(scope)) {
+    listeners.set(scope, new Set());
+    if (source) {
+      source.addEventListener(scope, () => listeners.get(scope).forEach((cb) => cb()));
+    }
+  }
+  listeners.get(scope).add(callback);
+  open();
+
+  return () => {
+    listeners.get(scope).delete(callback);
+    if ([...listeners.values()].every((callbacks) => callbacks.size === 0) && source) {
+      source.close();
+      source = null;
+      listeners.clear();
+    }
+  };
+};